@@ -0,0 +1,21 @@
+"""
+Micro-benchmarks for the in-memory store.
+
+Each module can be run directly from the project root, e.g.:
+
+    python -m benchmarks.discount_codes
+"""
+
+# Standard library imports
+import os
+
+
+def setup_django() -> None:
+    """
+    Configure Django so store modules can be imported outside manage.py.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+
+    import django
+
+    django.setup()
@@ -0,0 +1,168 @@
+"""
+Hot API endpoints under WSGI (sync views) vs. ASGI (async views).
+
+Drives the Django WSGI and ASGI applications in-process, without sockets:
+WSGI requests run on a pool of `concurrency` threads, as a threaded WSGI
+server would run them; ASGI requests run as `concurrency` concurrent tasks
+on one event loop. The request mix covers health, a product page, a
+search, an add-to-cart and a cart read across many users. Each mode runs
+in its own subprocess (ASYNC_VIEWS is read when the URLconf loads) and
+reports requests/sec and latency percentiles.
+
+    python -m benchmarks.asgi [--requests N] [--concurrency N] [--users N]
+                              [--bare-middleware]
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Local application/library specific imports
+from benchmarks import setup_django
+from benchmarks.loadtest import ASGITransport, percentile, WSGITransport
+
+ADD_BODY = json.dumps({"product_id": 1, "quantity": 1}).encode()
+
+
+def request_mix(n: int, users: int):
+    """
+    (method, path, query, user, body) for request i of the run.
+    """
+    for i in range(n):
+        user = f"bench-{i % users}"
+        kind = i % 5
+        if kind == 0:
+            yield "GET", "/api/health/", "", user, b""
+        elif kind == 1:
+            yield "GET", "/api/products/", "limit=20", user, b""
+        elif kind == 2:
+            yield "GET", "/api/products/search/", "q=alm", user, b""
+        elif kind == 3:
+            yield "POST", "/api/cart/items/", "", user, ADD_BODY
+        else:
+            yield "GET", "/api/cart/", "", user, b""
+
+
+def run_wsgi(requests, concurrency: int):
+    from django.core.wsgi import get_wsgi_application
+
+    call = WSGITransport(get_wsgi_application())
+
+    def timed(req):
+        method, path, query, user, body = req
+        start = time.perf_counter()
+        status, _ = call(method, path, query, [("X-User-Id", user)], body)
+        elapsed = time.perf_counter() - start
+        assert 200 <= status < 300, status
+        return elapsed
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(timed, requests))
+
+
+def run_asgi(requests, concurrency: int):
+    from django.core.asgi import get_asgi_application
+
+    call = ASGITransport(get_asgi_application())
+
+    async def timed(req):
+        method, path, query, user, body = req
+        start = time.perf_counter()
+        status, _ = await call(method, path, query, [("X-User-Id", user)], body)
+        elapsed = time.perf_counter() - start
+        assert 200 <= status < 300, status
+        return elapsed
+
+    async def main():
+        queue = iter(requests)
+        latencies = []
+
+        async def worker():
+            for req in queue:
+                latencies.append(await timed(req))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies
+
+    return asyncio.run(main())
+
+
+def run_mode(args) -> None:
+    """
+    Child process: time one mode and print its figures as JSON.
+    """
+    os.environ["ASYNC_VIEWS"] = "true" if args.mode == "asgi" else "false"
+    setup_django()
+    if args.bare_middleware:
+        from django.conf import settings
+
+        settings.MIDDLEWARE = ["corsheaders.middleware.CorsMiddleware"]
+    runner = run_asgi if args.mode == "asgi" else run_wsgi
+
+    runner(list(request_mix(args.warmup, args.users)), args.concurrency)
+    requests = list(request_mix(args.requests, args.users))
+    start = time.perf_counter()
+    latencies = runner(requests, args.concurrency)
+    wall = time.perf_counter() - start
+
+    ms = sorted(x * 1000 for x in latencies)
+    print(
+        json.dumps(
+            {
+                "rps": len(ms) / wall,
+                "p50": percentile(ms, 0.50),
+                "p99": percentile(ms, 0.99),
+            }
+        )
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=1000)
+    parser.add_argument(
+        "--bare-middleware",
+        action="store_true",
+        help="only CorsMiddleware, to separate the cost of the sync-only "
+        "Django middleware (a thread hop each under ASGI) from the views",
+    )
+    parser.add_argument("--mode", choices=["wsgi", "asgi"], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    print(
+        f"requests: {args.requests:,}, concurrency: {args.concurrency}, "
+        f"users: {args.users:,}"
+    )
+    print(f"{'mode':>6} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for mode in ("wsgi", "asgi"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.asgi", "--mode", mode]
+            + [f"--{k}={getattr(args, k)}" for k in ("requests", "concurrency")]
+            + [f"--users={args.users}", f"--warmup={args.warmup}"]
+            + (["--bare-middleware"] if args.bare_middleware else []),
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        figures = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:>6} {figures['rps']:10.0f} {figures['p50']:10.2f} "
+            f"{figures['p99']:10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
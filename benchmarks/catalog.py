@@ -0,0 +1,84 @@
+"""
+Catalog loading and product listing: dict of Products vs. ProductCatalog.
+
+Writes a CSV catalog of N products to a temp file, loads it into a plain
+dict of Product objects (the previous layout) and through the streaming
+loader into a ProductCatalog, and reports load time and peak traced
+memory. Then times one listing page: the full-catalog listing the view
+used to build vs. a `page(cursor, limit)` call.
+
+    python -m benchmarks.catalog [--products N] [--limit N]
+"""
+
+# Standard library imports
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+def write_csv(path: str, n: int) -> None:
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "price"])
+        for pid in range(1, n + 1):
+            writer.writerow([pid, f"Product {pid:07d}", f"{pid % 100_000}.99"])
+
+
+def load_dict(path: str):
+    from store.catalog import iter_catalog_file, Product
+
+    return {pid: Product(pid, name, c) for pid, name, c in iter_catalog_file(path)}
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.catalog import load_catalog
+
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_csv(path, args.products)
+        as_dict, dict_s, dict_peak = measure(load_dict, path)
+        catalog, cat_s, cat_peak = measure(load_catalog, path)
+    finally:
+        os.remove(path)
+
+    print(f"{'products':>12}: {args.products:,}")
+    print(f"{'dict load':>12}: {dict_s:8.2f} s, peak {dict_peak / 2**20:8.1f} MiB")
+    print(f"{'catalog load':>12}: {cat_s:8.2f} s, peak {cat_peak / 2**20:8.1f} MiB")
+
+    cursor = args.products // 2
+    start = time.perf_counter()
+    [{"id": p.id, "name": p.name, "price": p.price} for p in as_dict.values()]
+    full_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    page = catalog.page(cursor, args.limit)
+    [{"id": p.id, "name": p.name, "price": p.price} for p in page]
+    page_ms = (time.perf_counter() - start) * 1000
+    print(f"{'full list':>12}: {full_ms:10.3f} ms")
+    print(f"{'one page':>12}: {page_ms:10.3f} ms ({args.limit} items)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Discount code generation: per-character secrets.choice vs. batched base32.
+
+Times generating `count` codes one `secrets.choice` per character (the
+previous generator) and in batches from `secrets.token_bytes`, then issuing
+them as campaign codes with the pool empty (generated on demand) and
+with it filled ahead of time.
+
+    python -m benchmarks.codepool [--count N] [--batch N]
+"""
+
+# Standard library imports
+import argparse
+import secrets
+import string
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+def choice_codes(count: int) -> list:
+    alphabet = string.ascii_uppercase + string.digits
+    return ["".join(secrets.choice(alphabet) for _ in range(8)) for _ in range(count)]
+
+
+def issue(store, count: int, batch: int) -> float:
+    """
+    Seconds to issue `count` campaign codes, `batch` per call.
+    """
+    start = time.perf_counter()
+    for _ in range(count // batch):
+        store.issue_codes(batch)
+    return time.perf_counter() - start
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.codepool import random_codes
+    from store.inmemory import InMemoryStore
+
+    print(f"codes: {args.count:,}")
+    print(f"{'mode':>20} {'codes/s':>12}")
+    for label, generate in (
+        ("secrets.choice", choice_codes),
+        ("token_bytes+base32", random_codes),
+    ):
+        start = time.perf_counter()
+        generate(args.count)
+        print(f"{label:>20} {args.count / (time.perf_counter() - start):12,.0f}")
+
+    on_demand = InMemoryStore(code_pool_size=0)
+    seconds = issue(on_demand, args.count, args.batch)
+    print(f"{'issue, on demand':>20} {args.count / seconds:12,.0f}")
+
+    pooled = InMemoryStore(code_pool_size=args.count)
+    pooled._code_pool._add(random_codes(args.count))  # as if refilled idle
+    pooled._code_pool.refill_at = 0  # time the takes, not a refill
+    seconds = issue(pooled, args.count, args.batch)
+    print(f"{'issue, pooled':>20} {args.count / seconds:12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checkout latency versus number of issued discount codes.
+
+Seeds a fresh store with N already-redeemed codes, then times full
+checkouts (add to cart, validate code, place order) where every Nth order
+redeems a freshly generated code. With the code index, latency should stay
+flat from 10 to 1,000,000 issued codes.
+
+    python -m benchmarks.discount_codes [--sizes 10 1000 ...] [--checkouts N]
+"""
+
+# Standard library imports
+import argparse
+import statistics
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+
+def seed_codes(store, count: int) -> None:
+    """
+    Register `count` synthetic, already-used codes without going through
+    generate_code (which only allows one active code at a time).
+    """
+    from django.utils import timezone
+
+    from store.inmemory import DiscountCode
+
+    now = timezone.now()
+    with store._lock:
+        for i in range(count):
+            store._register_code(
+                DiscountCode(code=f"SEED{i:08d}", created_at=now, used=True)
+            )
+
+
+def time_checkouts(store, checkouts: int) -> list:
+    """
+    Return per-checkout latencies in microseconds.
+    """
+    samples = []
+    for i in range(checkouts):
+        uid = f"bench{i}"
+        start = time.perf_counter()
+        store.add_to_cart(uid, 1, 1)
+        if store.eligible_now() and not store.has_active_code():
+            store.generate_code()
+        code = store.active_code
+        if code and not store.validate_discount(code):
+            code = None
+        store.place_order(uid, discount_code=code)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--checkouts", type=int, default=5_000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.inmemory import InMemoryStore
+
+    print(f"{'codes':>10} {'median us':>10} {'p99 us':>10}")
+    for size in args.sizes:
+        store = InMemoryStore()
+        seed_codes(store, size)
+        samples = sorted(time_checkouts(store, args.checkouts))
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"{size:>10} {statistics.median(samples):>10.1f} {p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,520 @@
+"""
+End-to-end HTTP load against the store API.
+
+Each synthetic shopper (its own X-User-Id) runs one session through the
+real URLconf: a product page, sometimes a search, one to three cart adds,
+a cart read, then a checkout or an abandoned cart. A small share of
+sessions also calls an admin endpoint (discount generation or stats).
+Sessions run `concurrency` at a time and the report gives throughput plus
+p50/p95/p99 latency per endpoint.
+
+Targets:
+  wsgi  the Django WSGI application in-process, on `concurrency` threads
+  asgi  the ASGI application in-process, as `concurrency` asyncio tasks
+        (async views unless the URLconf was already loaded with sync ones)
+  http  a running server at --url, on `concurrency` threads with one
+        keep-alive connection each
+
+    python manage.py loadtest [--target wsgi|asgi|http] [--url URL]
+                              [--sessions N] [--concurrency N] ...
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import http.client
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+class Step:
+    """
+    One request of a session, and the statuses that count as success.
+    """
+
+    __slots__ = ("endpoint", "method", "path", "query", "headers", "body", "ok")
+
+    def __init__(self, endpoint, method, path, query, headers, body=b"", ok=(200,)):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.query = query
+        self.headers = headers
+        self.body = body
+        self.ok = ok
+
+
+# Transports -----
+class WSGITransport:
+    """
+    Call a WSGI application directly with a synthetic environ.
+    """
+
+    def __init__(self, app, host: str = "localhost"):
+        self.app = app
+        self.host = host
+
+    def __call__(
+        self, method: str, path: str, query: str = "", headers=(), body=b""
+    ) -> Tuple[int, bytes]:
+        environ = {
+            "REQUEST_METHOD": method,
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": self.host,
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": self.host,
+            "CONTENT_TYPE": "application/json",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": BytesIO(body),
+            "wsgi.url_scheme": "http",
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+            "wsgi.version": (1, 0),
+        }
+        for name, value in headers:
+            environ["HTTP_" + name.upper().replace("-", "_")] = value
+        statuses = []
+        result = self.app(environ, lambda status, _headers: statuses.append(status))
+        try:
+            content = b"".join(result)
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        return int(statuses[0].split()[0]), content
+
+
+class ASGITransport:
+    """
+    Call an ASGI application directly with a synthetic HTTP scope.
+    """
+
+    def __init__(self, app, host: str = "localhost"):
+        self.app = app
+        self.host = host
+
+    async def __call__(
+        self, method: str, path: str, query: str = "", headers=(), body=b""
+    ) -> Tuple[int, bytes]:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [
+                (b"host", self.host.encode()),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+            + [(name.lower().encode(), value.encode()) for name, value in headers],
+            "client": ("127.0.0.1", 50000),
+            "server": (self.host, 80),
+        }
+        status = 0
+        chunks = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return status, b"".join(chunks)
+
+
+class HTTPTransport:
+    """
+    Send requests to a running server, one keep-alive connection per thread.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 30):
+        url = urlsplit(base_url)
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise ValueError(f"Not an http(s) URL: {base_url!r}")
+        self.scheme = url.scheme
+        self.netloc = url.netloc
+        self.prefix = url.path.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = (
+                http.client.HTTPSConnection
+                if self.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            conn = self._local.conn = cls(self.netloc, timeout=self.timeout)
+        return conn
+
+    def __call__(
+        self, method: str, path: str, query: str = "", headers=(), body=b""
+    ) -> Tuple[int, bytes]:
+        target = self.prefix + path + (f"?{query}" if query else "")
+        all_headers = {"Content-Type": "application/json", **dict(headers)}
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                conn.request(method, target, body=body or None, headers=all_headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed a kept-alive connection; reconnect once
+                conn.close()
+                self._local.conn = None
+                if attempt == 2:
+                    raise
+
+
+# Traffic -----
+def catalog_sample(status: int, body: bytes) -> List[Dict]:
+    """
+    The products of a GET /api/products/ response, to pick ids and search
+    words from.
+    """
+    if status != 200:
+        raise ValueError(f"GET /api/products/ returned {status}")
+    products = json.loads(body)
+    if not products:
+        raise ValueError("The catalog is empty")
+    return products
+
+
+def session(
+    n: int,
+    rng: random.Random,
+    products: List[Dict],
+    checkout_rate: float,
+    admin_rate: float,
+    admin_key: str,
+) -> List[Step]:
+    """
+    The requests of shopper `n`'s visit.
+    """
+    user = [("X-User-Id", f"load-{n}")]
+    steps = []
+    cursor = rng.choice(products)["id"] if rng.random() < 0.5 else None
+    steps.append(
+        Step(
+            "GET /api/products/",
+            "GET",
+            "/api/products/",
+            "limit=20" + (f"&cursor={cursor}" if cursor is not None else ""),
+            user,
+        )
+    )
+    if rng.random() < 0.5:
+        word = rng.choice(rng.choice(products)["name"].split())
+        query = word[: rng.randint(1, len(word))]
+        steps.append(
+            Step(
+                "GET /api/products/search/",
+                "GET",
+                "/api/products/search/",
+                f"q={query}",
+                user,
+            )
+        )
+    for _ in range(rng.randint(1, 3)):
+        body = {"product_id": rng.choice(products)["id"], "quantity": rng.randint(1, 2)}
+        steps.append(
+            Step(
+                "POST /api/cart/items/",
+                "POST",
+                "/api/cart/items/",
+                "",
+                user,
+                json.dumps(body).encode(),
+                ok=(201,),
+            )
+        )
+    steps.append(Step("GET /api/cart/", "GET", "/api/cart/", "", user))
+    if rng.random() < checkout_rate:
+        key = [("Idempotency-Key", uuid.UUID(int=rng.getrandbits(128)).hex)]
+        steps.append(
+            Step(
+                "POST /api/checkout/",
+                "POST",
+                "/api/checkout/",
+                "",
+                user + key,
+                b"{}",
+                ok=(201,),
+            )
+        )
+    if admin_key and rng.random() < admin_rate:
+        admin = [("X-Admin-Key", admin_key)]
+        if rng.random() < 0.5:
+            # 400 while the next order is not the nth one or a code is open
+            steps.append(
+                Step(
+                    "POST /api/admin/generate-discount/",
+                    "POST",
+                    "/api/admin/generate-discount/",
+                    "",
+                    admin,
+                    b"{}",
+                    ok=(201, 400),
+                )
+            )
+        else:
+            steps.append(
+                Step("GET /api/admin/stats/", "GET", "/api/admin/stats/", "", admin)
+            )
+    return steps
+
+
+class Recorder:
+    """
+    Latencies and failures per endpoint.
+    """
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+        self.failures: Counter = Counter()  # "<endpoint> -> <status or error>"
+
+    def record(self, step: Step, elapsed: float, status: Optional[int], error=None):
+        self.latencies[step.endpoint].append(elapsed)
+        if status not in step.ok:
+            self.errors[step.endpoint] += 1
+            outcome = status if error is None else type(error).__name__
+            self.failures[f"{step.endpoint} -> {outcome}"] += 1
+
+
+def run_threads(call, sessions: Iterable[List[Step]], concurrency: int, rec):
+    queue = iter(sessions)
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            with lock:
+                steps = next(queue, None)
+            if steps is None:
+                return
+            for step in steps:
+                start = time.perf_counter()
+                status, error = None, None
+                try:
+                    status, _ = call(
+                        step.method, step.path, step.query, step.headers, step.body
+                    )
+                except Exception as e:  # counted, and the run goes on
+                    error = e
+                rec.record(step, time.perf_counter() - start, status, error)
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        for future in [pool.submit(worker) for _ in range(concurrency)]:
+            future.result()
+
+
+def run_tasks(call, sessions: Iterable[List[Step]], concurrency: int, rec):
+    queue = iter(sessions)
+
+    async def worker():
+        for steps in queue:
+            for step in steps:
+                start = time.perf_counter()
+                status, error = None, None
+                try:
+                    status, _ = await call(
+                        step.method, step.path, step.query, step.headers, step.body
+                    )
+                except Exception as e:  # counted, and the run goes on
+                    error = e
+                rec.record(step, time.perf_counter() - start, status, error)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    asyncio.run(main())
+
+
+def percentile(sorted_ms: List[float], p: float) -> float:
+    return sorted_ms[min(len(sorted_ms) - 1, int(len(sorted_ms) * p))]
+
+
+def report(rec: Recorder, wall: float, write: Callable[[str], None]) -> None:
+    write(
+        f"{'endpoint':<36} {'count':>7} {'req/s':>8} {'p50 ms':>8} "
+        f"{'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+    )
+    rows = sorted(rec.latencies.items()) + [
+        ("total", [x for xs in rec.latencies.values() for x in xs])
+    ]
+    for endpoint, latencies in rows:
+        ms = sorted(x * 1000 for x in latencies)
+        errors = (
+            sum(rec.errors.values()) if endpoint == "total" else rec.errors[endpoint]
+        )
+        write(
+            f"{endpoint:<36} {len(ms):7,} {len(ms) / wall:8,.0f} "
+            f"{percentile(ms, 0.50):8.2f} {percentile(ms, 0.95):8.2f} "
+            f"{percentile(ms, 0.99):8.2f} {errors:7,}"
+        )
+    for failure, count in rec.failures.most_common(10):
+        write(f"  failed: {failure} (x{count})")
+
+
+def local_host() -> str:
+    """
+    A Host header the in-process application accepts.
+    """
+    from django.conf import settings
+
+    for host in settings.ALLOWED_HOSTS:
+        if host != "*":
+            return host.lstrip(".")
+    return "localhost"
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Options shared by `python -m benchmarks.loadtest` and `loadtest`.
+    """
+    parser.add_argument("--target", choices=["wsgi", "asgi", "http"], default="wsgi")
+    parser.add_argument(
+        "--url",
+        default="http://127.0.0.1:8000",
+        help="server root for --target http",
+    )
+    parser.add_argument("--sessions", type=int, default=2_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--warmup", type=int, default=100, help="untimed sessions")
+    parser.add_argument(
+        "--checkout-rate", type=float, default=0.5, help="share of carts checked out"
+    )
+    parser.add_argument(
+        "--admin-rate",
+        type=float,
+        default=0.02,
+        help="share of sessions with an admin call",
+    )
+    parser.add_argument(
+        "--admin-key", help="X-Admin-Key (default: settings.ADMIN_API_KEY)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def run(options: Dict[str, object], write: Callable[[str], None]) -> int:
+    """
+    Run the load with parsed `options`, printing through `write`.
+    Returns the number of failed requests.
+    """
+    from django.conf import settings
+
+    if options["sessions"] < 1 or options["concurrency"] < 1:
+        raise ValueError("--sessions and --concurrency must be positive")
+    for rate in ("checkout_rate", "admin_rate"):
+        if not 0 <= options[rate] <= 1:
+            raise ValueError(f"--{rate.replace('_', '-')} must be in [0, 1]")
+    admin_key = options["admin_key"]
+    if admin_key is None:
+        admin_key = settings.ADMIN_API_KEY
+
+    target = options["target"]
+    if target == "http":
+        call = HTTPTransport(options["url"])
+        runner = run_threads
+    elif target == "asgi":
+        from django.core.asgi import get_asgi_application
+
+        if not settings.ASYNC_VIEWS:
+            if "store.urls" in sys.modules:
+                write("note: URLconf already loaded with sync views")
+            else:
+                settings.ASYNC_VIEWS = True
+        call = ASGITransport(get_asgi_application(), local_host())
+        runner = run_tasks
+    else:
+        from django.core.wsgi import get_wsgi_application
+
+        call = WSGITransport(get_wsgi_application(), local_host())
+        runner = run_threads
+
+    first_page = call("GET", "/api/products/", "limit=200")
+    if target == "asgi":
+        first_page = asyncio.run(first_page)
+    products = catalog_sample(*first_page)
+    rng = random.Random(options["seed"])
+
+    def sessions(first: int, count: int):
+        return [
+            session(
+                n,
+                rng,
+                products,
+                options["checkout_rate"],
+                options["admin_rate"],
+                admin_key,
+            )
+            for n in range(first, first + count)
+        ]
+
+    warmup = sessions(0, options["warmup"])
+    timed = sessions(options["warmup"], options["sessions"])
+    # In-process, Django would log every expected 4xx; keep server errors
+    request_log = logging.getLogger("django.request")
+    level = request_log.level
+    request_log.setLevel(logging.ERROR)
+    try:
+        runner(call, warmup, options["concurrency"], Recorder())
+        rec = Recorder()
+        start = time.perf_counter()
+        runner(call, timed, options["concurrency"], rec)
+        wall = time.perf_counter() - start
+    finally:
+        request_log.setLevel(level)
+
+    requests = sum(len(xs) for xs in rec.latencies.values())
+    write(
+        f"target: {target}, sessions: {options['sessions']:,}, concurrency: "
+        f"{options['concurrency']}, {requests:,} requests in {wall:.2f} s "
+        f"({requests / wall:,.0f} req/s)"
+    )
+    report(rec, wall, write)
+    return sum(rec.errors.values())
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    try:
+        failed = run(vars(args), print)
+    except ValueError as e:
+        parser.error(str(e))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Checkout pricing: Decimal arithmetic vs. the integer-cents engine.
+
+Prices the same random carts with the original Decimal code path
+(D()/money() on every line, subtotal, discount and total) and with the
+integer-cents path used by place_order, and reports carts/second.
+
+    python -m benchmarks.money [--carts N] [--lines N]
+"""
+
+# Standard library imports
+import argparse
+import random
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+def price_decimal(lines, pct):
+    """
+    The pre-cents pricing code, kept verbatim as the reference.
+    """
+    from store.inmemory import D, money
+
+    subtotal = D("0.00")
+    for price, qty in lines:
+        subtotal += money(price * D(qty))
+    subtotal = money(subtotal)
+    discount = money(subtotal * (D(pct) / D(100)))
+    return subtotal, discount, money(subtotal - discount)
+
+
+def price_cents(lines, pct):
+    from store.inmemory import percent_of
+
+    subtotal = 0
+    for price_cents, qty in lines:
+        subtotal += price_cents * qty
+    discount = percent_of(subtotal, pct)
+    return subtotal, discount, subtotal - discount
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--carts", type=int, default=100_000)
+    parser.add_argument("--lines", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.inmemory import from_cents
+
+    rng = random.Random(7)
+    carts = [
+        (
+            [(rng.randint(1, 500_000), rng.randint(1, 20)) for _ in range(args.lines)],
+            rng.randint(1, 100),
+        )
+        for _ in range(args.carts)
+    ]
+    decimal_carts = [
+        ([(from_cents(p), q) for p, q in lines], pct) for lines, pct in carts
+    ]
+
+    results = {}
+    for name, fn, data in (
+        ("Decimal", price_decimal, decimal_carts),
+        ("cents", price_cents, carts),
+    ):
+        start = time.perf_counter()
+        for lines, pct in data:
+            fn(lines, pct)
+        results[name] = args.carts / (time.perf_counter() - start)
+        print(f"{name:>8}: {results[name]:12,.0f} carts/s")
+    print(f"{'speedup':>8}: {results['cents'] / results['Decimal']:12.1f}x")
+
+
+if __name__ == "__main__":
+    main()
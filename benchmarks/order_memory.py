@@ -0,0 +1,151 @@
+"""
+Order-history memory: list of Order dataclasses vs. the columnar ledger.
+
+Generates the same synthetic orders (1-3 lines each, fresh Decimals and
+timestamps) both as the pre-ledger list of Decimal dataclasses and into
+an OrderLedger, and reports the traced allocation size of each.
+
+    python -m benchmarks.order_memory [--orders N]
+"""
+
+# Standard library imports
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import List, Optional
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+@dataclass(frozen=True)
+class DecimalOrderItem:
+    """
+    The pre-ledger OrderItem layout: one object per line, Decimal amounts.
+    """
+
+    product_id: int
+    name: str
+    price: Decimal
+    quantity: int
+    line_total: Decimal
+
+
+@dataclass
+class DecimalOrder:
+    """
+    The pre-ledger Order layout.
+    """
+
+    id: int
+    user_id: str
+    items: List[DecimalOrderItem]
+    subtotal: Decimal
+    discount: Decimal
+    total: Decimal
+    created_at: datetime
+    discount_code: Optional[str] = None
+
+
+CATALOG = [
+    (1, "Almonds 500g", 75000),
+    (2, "Cashews 500g", 35000),
+    (3, "Pistachios 500g", 90000),
+]
+
+
+def make_rows(count: int):
+    """
+    Yield (id, user_id, created_at, [(pid, name, price_c, qty)]) tuples for
+    `count` orders of 1-3 lines each.
+    """
+    from django.utils import timezone
+
+    start = timezone.now()
+    for i in range(count):
+        lines = []
+        for k in range(1 + i % 3):
+            pid, name, price = CATALOG[(i + k) % 3]
+            # names are copied per order, as they are after recovery/replay
+            lines.append((pid, "".join(name), price, 1 + (i + k) % 4))
+        yield i + 1, f"user{i % 50_000}", start + timedelta(microseconds=i), lines
+
+
+def decimal_order(order_id, user_id, created_at, lines) -> DecimalOrder:
+    from store.inmemory import from_cents
+
+    items = [
+        DecimalOrderItem(pid, name, from_cents(p), qty, from_cents(p * qty))
+        for pid, name, p, qty in lines
+    ]
+    subtotal = sum(p * qty for _, _, p, qty in lines)
+    return DecimalOrder(
+        order_id,
+        user_id,
+        items,
+        from_cents(subtotal),
+        from_cents(0),
+        from_cents(subtotal),
+        created_at,
+    )
+
+
+def ledger_order(order_id, user_id, created_at, lines):
+    from store.inmemory import Order, OrderItem
+
+    subtotal = sum(p * qty for _, _, p, qty in lines)
+    return Order(
+        id=order_id,
+        user_id=user_id,
+        items=[OrderItem(pid, name, p, qty, p * qty) for pid, name, p, qty in lines],
+        subtotal_cents=subtotal,
+        discount_cents=0,
+        total_cents=subtotal,
+        created_at=created_at,
+    )
+
+
+def traced(build) -> int:
+    """
+    Return the bytes still allocated by the object `build()` returns.
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.inmemory import OrderLedger
+
+    def build_list():
+        return [decimal_order(*row) for row in make_rows(args.orders)]
+
+    def build_ledger():
+        ledger = OrderLedger()
+        for row in make_rows(args.orders):
+            ledger.append(ledger_order(*row))
+        return ledger
+
+    legacy = traced(build_list)
+    columnar = traced(build_ledger)
+    print(f"orders           : {args.orders}")
+    print(f"list[Order]      : {legacy / 1e6:10.1f} MB")
+    print(f"OrderLedger      : {columnar / 1e6:10.1f} MB")
+    print(f"reduction        : {legacy / columnar:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
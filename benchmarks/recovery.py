@@ -0,0 +1,60 @@
+"""
+Durable-store recovery time: snapshot load and WAL tail replay.
+
+Places N orders in a durable store, snapshots, places a WAL tail of
+--tail more orders, then times InMemoryStore.open on the same directory.
+
+    python -m benchmarks.recovery [--orders N] [--tail N]
+"""
+
+# Standard library imports
+import argparse
+import os
+import tempfile
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+def populate(store, prefix: str, orders: int) -> None:
+    for i in range(orders):
+        uid = f"{prefix}{i}"
+        store.add_to_cart(uid, 1 + i % 3, 1 + i % 4)
+        store.place_order(uid)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--tail", type=int, default=10_000)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.inmemory import InMemoryStore
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = InMemoryStore.open(data_dir, snapshot_every=0)
+        populate(store, "snap", args.orders)
+
+        start = time.perf_counter()
+        store.snapshot()
+        snap_s = time.perf_counter() - start
+
+        populate(store, "tail", args.tail)
+        store.close()
+
+        size_mb = os.path.getsize(os.path.join(data_dir, "snapshot.bin")) / 1e6
+        start = time.perf_counter()
+        recovered = InMemoryStore.open(data_dir, snapshot_every=0)
+        recover_s = time.perf_counter() - start
+        recovered.close()
+
+    total = args.orders + args.tail
+    print(f"snapshot write : {snap_s:8.2f} s ({size_mb:.1f} MB)")
+    print(f"recovery       : {recover_s:8.2f} s for {total} orders")
+    print(f"               : {total / recover_s:8.0f} orders/s")
+
+
+if __name__ == "__main__":
+    main()
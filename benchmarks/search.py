@@ -0,0 +1,84 @@
+"""
+Product name search: token index vs. a linear scan of the catalog.
+
+Builds a catalog of N products with generated names, then answers the
+same typeahead queries with ProductCatalog.search and with a naive scan
+that re-tokenizes every name, and reports per-query latency.
+
+    python -m benchmarks.search [--products N] [--limit N]
+"""
+
+# Standard library imports
+import argparse
+import random
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+WORDS = [
+    "almonds", "cashews", "pistachios", "walnuts", "pecans", "hazelnuts",
+    "macadamia", "brazil", "peanuts", "dates", "figs", "apricots", "raisins",
+    "cranberries", "roasted", "salted", "unsalted", "raw", "organic", "honey",
+    "smoked", "chilli", "mixed", "premium", "butter", "flour", "trail", "mix",
+]  # fmt: skip
+SIZES = ["100g", "250g", "500g", "1kg", "2kg"]
+QUERIES = ["a", "alm", "roasted alm", "organic cashews 500g", "smoked wal", "zzz"]
+
+
+def make_rows(n: int, rng: random.Random):
+    for pid in range(1, n + 1):
+        words = rng.sample(WORDS, 3)
+        yield pid, f"{' '.join(words).title()} {rng.choice(SIZES)} #{pid}", 100
+
+
+def linear_search(names, query: str, limit: int):
+    from store.search import tokenize
+
+    tokens = tokenize(query)
+    *whole, prefix = tokens
+    hits = []
+    for pid, name in names:
+        name_tokens = tokenize(name)
+        if all(t in name_tokens for t in whole) and any(
+            t.startswith(prefix) for t in name_tokens
+        ):
+            hits.append(pid)
+            if len(hits) == limit:
+                break
+    return hits
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--products", type=int, default=500_000)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.catalog import ProductCatalog
+
+    rows = list(make_rows(args.products, random.Random(11)))
+    start = time.perf_counter()
+    catalog = ProductCatalog(rows)
+    print(
+        f"products: {args.products:,}, index build {time.perf_counter() - start:.2f} s"
+    )
+    names = [(pid, name) for pid, name, _ in rows]
+
+    print(f"{'query':>22} {'index ms':>10} {'scan ms':>10}")
+    for query in QUERIES:
+        index_ms = timed(lambda: catalog.search(query, args.limit), 50)
+        scan_ms = timed(lambda: linear_search(names, query, args.limit), 1)
+        print(f"{query!r:>22} {index_ms:10.3f} {scan_ms:10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Checkout throughput: global order lock vs. the single-writer sequencer.
+
+Runs `clients` threads that each repeatedly fill a cart and check out
+against one store, first with order commits under the global lock, then
+through the order sequencer, and reports checkouts/sec and latency
+percentiles. With --durable both stores write a WAL to a temp directory.
+
+    python -m benchmarks.sequencer [--clients 64] [--checkouts N] [--durable]
+"""
+
+# Standard library imports
+import argparse
+import tempfile
+import threading
+import time
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+
+def run(store, clients: int, checkouts: int):
+    """
+    Return (wall seconds, sorted per-checkout latencies in ms).
+    """
+    per_client = checkouts // clients
+    barrier = threading.Barrier(clients + 1)
+    latencies = [[] for _ in range(clients)]
+
+    def client(i: int) -> None:
+        user = f"client{i}"
+        out = latencies[i]
+        barrier.wait()
+        for _ in range(per_client):
+            store.add_to_cart(user, 1 + i % 3, 1)
+            start = time.perf_counter()
+            store.place_order(user)
+            out.append((time.perf_counter() - start) * 1000)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - start
+    return wall, sorted(x for xs in latencies for x in xs)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--checkouts", type=int, default=64_000)
+    parser.add_argument("--durable", action="store_true", help="with a WAL")
+    args = parser.parse_args(argv)
+
+    setup_django()
+    from store.inmemory import InMemoryStore
+
+    print(f"clients: {args.clients}, checkouts: {args.checkouts:,}")
+    print(f"{'mode':>12} {'orders/s':>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for label, sequencer in (("global lock", False), ("sequencer", True)):
+        with tempfile.TemporaryDirectory() as data_dir:
+            if args.durable:
+                store = InMemoryStore.open(data_dir, order_sequencer=sequencer)
+            else:
+                store = InMemoryStore(order_sequencer=sequencer)
+            wall, ms = run(store, args.clients, args.checkouts)
+            store.close()
+        print(
+            f"{label:>12} {len(ms) / wall:10,.0f} {ms[len(ms) // 2]:8.3f} "
+            f"{ms[int(len(ms) * 0.99)]:8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
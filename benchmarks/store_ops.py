@@ -0,0 +1,343 @@
+"""
+InMemoryStore operation throughput, with saved baselines.
+
+Seeds a store per size profile (carts, orders, issued discount codes and
+catalog SKUs), then times `add_to_cart`, `priced_cart`, `place_order`,
+`validate_discount` and `stats` in repeated batches. Each result is the mean ops/sec over the
+batches with a 95% confidence interval. Results can be saved as a JSON
+baseline, and a later run compared against one: an operation is a
+regression, and the run exits non-zero, when even the top of its confidence
+interval falls more than `--threshold` below the baseline mean (so batch
+noise alone does not fail a run).
+
+    python -m benchmarks.store_ops [--profiles small medium] [--cases ...]
+                                   [--repeat N] [--save PATH]
+                                   [--baseline PATH] [--threshold 0.15]
+
+Also available as `python manage.py benchstore` with the same options.
+"""
+
+# Standard library imports
+import argparse
+import gc
+import json
+import math
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Callable, Dict, List, Optional
+
+# Local application/library specific imports
+from benchmarks import setup_django
+
+# carts, orders, issued codes and catalog SKUs seeded before timing
+PROFILES: Dict[str, Dict[str, int]] = {
+    "small": {"carts": 1_000, "orders": 1_000, "codes": 100, "skus": 1_000},
+    "medium": {"carts": 10_000, "orders": 100_000, "codes": 10_000, "skus": 100_000},
+    "large": {
+        "carts": 100_000,
+        "orders": 1_000_000,
+        "codes": 100_000,
+        "skus": 1_000_000,
+    },
+}
+DEFAULT_PROFILES = ["small", "medium"]
+
+# Two-sided 95% Student t quantiles by degrees of freedom (normal beyond)
+_T95 = {1: 12.71, 2: 4.30, 3: 3.18, 4: 2.78, 5: 2.57, 6: 2.45, 7: 2.36, 8: 2.31}
+_T95.update({9: 2.26, 10: 2.23, 12: 2.18, 15: 2.13, 20: 2.09, 30: 2.04})
+
+
+def t95(df: int) -> float:
+    """
+    The t quantile for `df`, rounded toward the next tabulated (larger) one.
+    """
+    for known in sorted(_T95):
+        if df <= known:
+            return _T95[known]
+    return 1.96
+
+
+def build_store(profile: Dict[str, int], seed: int = 0):
+    """
+    A store holding the profile's catalog, open carts, past orders and
+    redeemed discount codes. Orders are restored directly, as WAL replay
+    does, rather than checked out one by one.
+    """
+    from django.utils import timezone
+
+    from benchmarks.discount_codes import seed_codes
+    from benchmarks.order_memory import ledger_order
+    from store.catalog import ProductCatalog
+    from store.inmemory import InMemoryStore
+
+    rng = random.Random(seed)
+    skus = profile["skus"]
+    catalog = ProductCatalog(
+        (pid, f"Product {pid:07d}", 100 + pid % 10_000) for pid in range(1, skus + 1)
+    )
+    store = InMemoryStore(catalog=catalog)
+    for i in range(profile["carts"]):
+        store.add_to_cart(f"cart{i}", rng.randint(1, skus), 1 + i % 3)
+    now = timezone.now()
+    with store._lock:
+        for i in range(profile["orders"]):
+            pid = rng.randint(1, skus)
+            line = (pid, catalog[pid].name, catalog[pid].price_cents, 1 + i % 4)
+            store._restore_order(ledger_order(i + 1, f"user{i}", now, [line]))
+    seed_codes(store, profile["codes"])
+    return store
+
+
+# Each case runs `n` operations against `store` and returns the seconds they
+# took; any per-batch preparation happens before the clock starts.
+Case = Callable[[object, int, random.Random], float]
+
+
+def case_add_to_cart(store, n: int, rng: random.Random) -> float:
+    carts = max(1, len(store.carts))
+    skus = len(store.products)
+    ops = [(f"cart{rng.randrange(carts)}", rng.randint(1, skus)) for _ in range(n)]
+    add = store.add_to_cart
+    start = time.perf_counter()
+    for user, pid in ops:
+        add(user, pid, 1)
+    return time.perf_counter() - start
+
+
+def case_priced_cart(store, n: int, rng: random.Random) -> float:
+    carts = max(1, len(store.carts))
+    users = [f"cart{rng.randrange(carts)}" for _ in range(n)]
+    priced = store.priced_cart
+    start = time.perf_counter()
+    for user in users:
+        priced(user)
+    return time.perf_counter() - start
+
+
+def case_place_order(store, n: int, rng: random.Random) -> float:
+    skus = len(store.products)
+    users = [f"buyer{rng.getrandbits(64):x}" for _ in range(n)]
+    for user in users:
+        store.add_to_cart(user, rng.randint(1, skus), 1 + rng.randrange(3))
+    place = store.place_order
+    start = time.perf_counter()
+    for user in users:
+        place(user)
+    return time.perf_counter() - start
+
+
+def case_validate_discount(store, n: int, rng: random.Random) -> float:
+    # Mostly issued (redeemed) codes, some unknown ones, as checkout sees them
+    pool = [dc.code for dc in store.discount_codes] or ["NONE"]
+    codes = [rng.choice(pool) if i % 4 else f"MISS{i:08d}" for i in range(n)]
+    validate = store.validate_discount
+    start = time.perf_counter()
+    for code in codes:
+        validate(code)
+    return time.perf_counter() - start
+
+
+def case_stats(store, n: int, rng: random.Random) -> float:
+    stats = store.stats
+    start = time.perf_counter()
+    for _ in range(n):
+        stats()
+    return time.perf_counter() - start
+
+
+CASES: Dict[str, Case] = {
+    "add_to_cart": case_add_to_cart,
+    "priced_cart": case_priced_cart,
+    "place_order": case_place_order,
+    "validate_discount": case_validate_discount,
+    "stats": case_stats,
+}
+
+
+def timed(case: Case, store, n: int, rng: random.Random) -> float:
+    """
+    One batch with the garbage collector paused, as timeit does.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return case(store, n, rng)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def measure(
+    case: Case, store, repeat: int, min_time: float, rng: random.Random
+) -> Dict[str, float]:
+    """
+    Size a batch to take at least `min_time` seconds, then time `repeat`
+    batches and summarize their ops/sec.
+    """
+    n = 1
+    while True:
+        elapsed = timed(case, store, n, rng)
+        if elapsed >= min_time or n >= 1 << 24:
+            break
+        n *= 2 if elapsed <= 0 else max(2, min(10, math.ceil(min_time / elapsed)))
+    rates = [n / max(timed(case, store, n, rng), 1e-9) for _ in range(repeat)]
+    mean = statistics.fmean(rates)
+    sd = statistics.stdev(rates) if len(rates) > 1 else 0.0
+    return {
+        "ops_per_sec": mean,
+        "ci95": t95(len(rates) - 1) * sd / math.sqrt(len(rates)),
+        "batch": n,
+        "batches": len(rates),
+    }
+
+
+def run_suite(
+    profiles: Dict[str, Dict[str, int]],
+    cases: List[str],
+    repeat: int = 10,
+    min_time: float = 0.05,
+    seed: int = 0,
+    progress: Optional[Callable[[str, Dict[str, float]], None]] = None,
+) -> Dict[str, object]:
+    """
+    Time every case against a freshly seeded store of every profile.
+    Results are keyed "<profile>/<case>".
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for pname, profile in profiles.items():
+        for cname in cases:
+            # A fresh store per case, so place_order cannot grow the order
+            # history another case then runs against
+            store = build_store(profile, seed)
+            result = measure(CASES[cname], store, repeat, min_time, random.Random(seed))
+            results[f"{pname}/{cname}"] = result
+            if progress is not None:
+                progress(f"{pname}/{cname}", result)
+    return {
+        "created_at": datetime.now(dt_timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "profiles": profiles,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def regressions(
+    current: Dict[str, object], baseline: Dict[str, object], threshold: float
+) -> List[Dict[str, object]]:
+    """
+    Results present in both runs that are slower than the baseline mean by
+    more than `threshold` (a fraction), even at the upper end of their 95%
+    confidence interval.
+    """
+    found = []
+    base_results = baseline["results"]
+    for name, result in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            continue
+        change = result["ops_per_sec"] / base["ops_per_sec"] - 1
+        best = result["ops_per_sec"] + result["ci95"]
+        if best < base["ops_per_sec"] * (1 - threshold):
+            found.append(
+                {
+                    "name": name,
+                    "baseline": base["ops_per_sec"],
+                    "current": result["ops_per_sec"],
+                    "change": change,
+                }
+            )
+    return found
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Options shared by `python -m benchmarks.store_ops` and `benchstore`.
+    """
+    parser.add_argument(
+        "--profiles", nargs="+", choices=sorted(PROFILES), default=DEFAULT_PROFILES
+    )
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeat", type=int, default=10, help="timed batches")
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="seconds per batch (at least)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="PATH", help="write results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare with a baseline")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.15,
+        help="allowed drop in ops/sec vs. the baseline, as a fraction",
+    )
+
+
+def run(options: Dict[str, object], write: Callable[[str], None]) -> int:
+    """
+    Run the suite with parsed `options`, printing through `write`.
+    Returns the number of regressions against `--baseline` (0 without one).
+    """
+    if options["repeat"] < 2:
+        raise ValueError("--repeat must be at least 2 for a confidence interval")
+    if not 0 <= options["threshold"] < 1:
+        raise ValueError("--threshold must be a fraction in [0, 1)")
+    baseline = None
+    if options["baseline"]:
+        with open(options["baseline"], encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    write(f"{'benchmark':<28} {'ops/sec':>12} {'95% CI':>12} {'batch':>8}")
+
+    def progress(name, result):
+        write(
+            f"{name:<28} {result['ops_per_sec']:12,.0f} "
+            f"{'±' + format(result['ci95'], ',.0f'):>12} {result['batch']:8,}"
+        )
+
+    current = run_suite(
+        {name: PROFILES[name] for name in options["profiles"]},
+        options["cases"],
+        repeat=options["repeat"],
+        min_time=options["min_time"],
+        seed=options["seed"],
+        progress=progress,
+    )
+    if options["save"]:
+        with open(options["save"], "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        write(f"saved baseline to {options['save']}")
+    if baseline is None:
+        return 0
+
+    found = regressions(current, baseline, options["threshold"])
+    for r in found:
+        write(
+            f"REGRESSION {r['name']}: {r['current']:,.0f} ops/sec vs. "
+            f"{r['baseline']:,.0f} baseline ({r['change']:+.1%})"
+        )
+    if not found:
+        write(f"no regressions beyond {options['threshold']:.0%} of the baseline")
+    return len(found)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    setup_django()
+    try:
+        regressed = run(vars(args), print)
+    except ValueError as e:
+        parser.error(str(e))
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
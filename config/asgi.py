@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+# Serve the hot API endpoints with async views on the event loop
+os.environ.setdefault('ASYNC_VIEWS', 'true')
 
 application = get_asgi_application()
@@ -23,6 +23,24 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 env = environ.Env(
     NTH_ORDER_FOR_DISCOUNT=(int, 3),
     DISCOUNT_PERCENT=(int, 10),
+    DISCOUNT_CODE_POOL_SIZE=(int, 100_000),
+    STORE_DATA_DIR=(str, ""),
+    STORE_WAL_FSYNC_BATCH=(int, 64),
+    STORE_WAL_FSYNC_INTERVAL=(float, 0.05),
+    STORE_SNAPSHOT_EVERY=(int, 100_000),
+    STORE_BACKEND=(str, "memory"),
+    STORE_SHM_NAME=(str, "ecom_store"),
+    STORE_SHM_CAPACITY=(int, 256 * 1024 * 1024),
+    STORE_CATALOG_PATH=(str, ""),
+    STORE_CART_TTL=(float, 7 * 24 * 3600),
+    STORE_MAX_CARTS=(int, 1_000_000),
+    STORE_ORDER_SEQUENCER=(bool, False),
+    STORE_VERIFY_CART_TOTALS=(bool, False),
+    CHECKOUT_IDEMPOTENCY_TTL=(float, 24 * 3600),
+    CHECKOUT_IDEMPOTENCY_MAX_KEYS=(int, 100_000),
+    CHECKOUT_QUOTE_TTL=(float, 15 * 60),
+    CHECKOUT_QUOTE_MAX=(int, 100_000),
+    ASYNC_VIEWS=(bool, False),
 )
 
 # Read env file
@@ -57,6 +75,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Outermost, so request timings include every other middleware
+    "store.metrics.RequestMetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -176,6 +196,53 @@ ADMIN_API_KEY = os.environ.get("ADMIN_API_KEY", "")
 NTH_ORDER_FOR_DISCOUNT = env("NTH_ORDER_FOR_DISCOUNT")
 DISCOUNT_PERCENT = env("DISCOUNT_PERCENT")
 
+# Discount codes generated ahead of time (store/codepool.py); refilled in
+# the background below a quarter of this (0 = generate on demand)
+DISCOUNT_CODE_POOL_SIZE = env("DISCOUNT_CODE_POOL_SIZE")
+
+# Optional durability for the in-memory store (empty = memory only)
+STORE_DATA_DIR = env("STORE_DATA_DIR")
+STORE_WAL_FSYNC_BATCH = env("STORE_WAL_FSYNC_BATCH")
+STORE_WAL_FSYNC_INTERVAL = env("STORE_WAL_FSYNC_INTERVAL")
+STORE_SNAPSHOT_EVERY = env("STORE_SNAPSHOT_EVERY")
+
+# Store backend: "memory" (per process) or "shared" (one state per host,
+# shared by all worker processes through multiprocessing.shared_memory)
+STORE_BACKEND = env("STORE_BACKEND")
+STORE_SHM_NAME = env("STORE_SHM_NAME")
+STORE_SHM_CAPACITY = env("STORE_SHM_CAPACITY")
+
+# Product catalog file (.csv with id,name,price or .jsonl) loaded at
+# startup; empty = the built-in demo catalog
+STORE_CATALOG_PATH = env("STORE_CATALOG_PATH")
+
+# Cart eviction: carts idle longer than STORE_CART_TTL seconds, or beyond
+# the STORE_MAX_CARTS most recently used, are dropped (0 = no limit)
+STORE_CART_TTL = env("STORE_CART_TTL")
+STORE_MAX_CARTS = env("STORE_MAX_CARTS")
+
+# Commit orders on a single writer thread in micro-batches instead of
+# under the global store lock (store/sequencer.py); memory backend only
+STORE_ORDER_SEQUENCER = env("STORE_ORDER_SEQUENCER")
+
+# Cross-check the kept cart totals against a full reprice on every priced
+# cart read, raising on a mismatch (costs what the kept totals save)
+STORE_VERIFY_CART_TOTALS = env("STORE_VERIFY_CART_TOTALS")
+
+# Checkout Idempotency-Key replay cache (per process): how long a response
+# is replayable and how many keys are kept
+CHECKOUT_IDEMPOTENCY_TTL = env("CHECKOUT_IDEMPOTENCY_TTL")
+CHECKOUT_IDEMPOTENCY_MAX_KEYS = env("CHECKOUT_IDEMPOTENCY_MAX_KEYS")
+
+# Checkout quote tokens (per process): how long a quote can be checked out
+# and how many priced snapshots are kept
+CHECKOUT_QUOTE_TTL = env("CHECKOUT_QUOTE_TTL")
+CHECKOUT_QUOTE_MAX = env("CHECKOUT_QUOTE_MAX")
+
+# Route the cart, catalog, checkout and health endpoints to their async
+# views (store/aio.py). config/asgi.py turns this on; WSGI keeps sync views.
+ASYNC_VIEWS = env("ASYNC_VIEWS")
+
 # Guard rails with errors
 if NTH_ORDER_FOR_DISCOUNT < 1:
     raise ImproperlyConfigured("NTH_ORDER_FOR_DISCOUNT must be >= 1.")
@@ -183,9 +250,31 @@ if NTH_ORDER_FOR_DISCOUNT < 1:
 if not (1 <= DISCOUNT_PERCENT <= 100):
     raise ImproperlyConfigured("DISCOUNT_PERCENT must be between 1 and 100.")
 
+if DISCOUNT_CODE_POOL_SIZE < 0:
+    raise ImproperlyConfigured("DISCOUNT_CODE_POOL_SIZE must be >= 0.")
+
+if STORE_CART_TTL < 0 or STORE_MAX_CARTS < 0:
+    raise ImproperlyConfigured("STORE_CART_TTL and STORE_MAX_CARTS must be >= 0.")
+
+if STORE_BACKEND not in ("memory", "shared"):
+    raise ImproperlyConfigured("STORE_BACKEND must be 'memory' or 'shared'.")
+
+if STORE_BACKEND == "shared" and STORE_DATA_DIR:
+    raise ImproperlyConfigured(
+        "STORE_DATA_DIR is not supported with STORE_BACKEND=shared."
+    )
+
+if STORE_BACKEND == "shared" and STORE_ORDER_SEQUENCER:
+    raise ImproperlyConfigured(
+        "STORE_ORDER_SEQUENCER is not supported with STORE_BACKEND=shared."
+    )
+
 
 CORS_ALLOWED_ORIGINS = ["http://localhost:5173"]
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-user-id",
     "x-admin-key",
+    "idempotency-key",
 ]
+# Let the browser client read pagination and replay headers
+CORS_EXPOSE_HEADERS = ["x-next-cursor", "link", "idempotent-replayed"]
@@ -0,0 +1,93 @@
+"""
+Async request handling for the hot API endpoints.
+
+``AsyncAPIView`` is an APIView whose handlers are coroutines, so under
+ASGI Django calls them on the event loop instead of handing each request
+to a worker thread.
+
+The store's locks are thread locks, and threads hold them too: sync views
+such as the admin endpoints (Django runs them in threads under ASGI), the
+background cart reprice, the order sequencer's writer and snapshots.
+Waiting for one of them on the loop would stall every request. So
+``run_store`` first tries to take the locks a cart, quote or checkout
+handler needs without waiting (see InMemoryStore.hold_uncontended), and
+runs the handler inline while holding them; only when one is held
+elsewhere, or the call can wait on I/O or the order sequencer, does the
+handler go to a worker thread. Catalog reads take no store lock, so
+``run_catalog`` runs them on the loop unless the store can block (a WAL,
+or the shared backend's cross-process lock).
+"""
+
+# Standard library imports
+import asyncio
+import inspect
+
+# Related third-party imports
+from django.http import HttpResponse
+from rest_framework.permissions import AllowAny
+from rest_framework.views import APIView
+
+
+async def run_store(hold, fn, *args, **kwargs):
+    """
+    Call `fn`, a handler whose store calls take the locks that `hold` (a
+    store's ``hold_uncontended(...)``) tries to take: inline on the event
+    loop if it got them, else in a worker thread.
+    """
+    with hold as held:
+        if held:
+            return fn(*args, **kwargs)
+    return await asyncio.to_thread(fn, *args, **kwargs)
+
+
+async def run_catalog(store, fn, *args, **kwargs):
+    """
+    Call `fn` (a handler that only reads the catalog) from the event loop:
+    inline, or in a worker thread when the store's operations can block.
+    """
+    if store.may_block:
+        return await asyncio.to_thread(fn, *args, **kwargs)
+    return fn(*args, **kwargs)
+
+
+class AsyncAPIView(APIView):
+    """
+    An APIView with ``async def`` handlers.
+
+    Mirrors ``APIView.dispatch`` but awaits the handler and returns the
+    rendered response as a plain HttpResponse. Callers are
+    identified by the X-User-Id header, so there is no session or basic
+    authentication: both would read the session table, which Django does
+    not allow from async code.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+            handler = self.http_method_not_allowed
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), handler)
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        if not hasattr(self.response, "render"):
+            return self.response
+        # Render here, on the loop: Django would call render() in a thread
+        self.response.render()
+        rendered = HttpResponse(self.response.content, status=self.response.status_code)
+        for header, value in self.response.items():
+            rendered[header] = value
+        return rendered
@@ -0,0 +1,420 @@
+"""
+Pluggable store backends.
+
+``StoreBackend`` describes the API the views rely on. ``InMemoryStore`` is
+the default, process-local implementation; ``SharedMemoryStore`` lets every
+worker process on one host share a single order sequence, cart set and
+discount state.
+"""
+
+# Standard library imports
+import json
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from itertools import groupby, islice
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, List, Optional, Protocol, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+# Local application/library specific imports
+from .inmemory import (
+    _to_us,
+    DiscountCode,
+    InMemoryStore,
+    Order,
+    ProductCatalog,
+    Quote,
+)
+
+# Shared segment layout: header (generation, used bytes), then records of
+# u32 length + JSON payload in the WAL record format.
+_HEADER = struct.Struct("<QQ")
+_RECORD_LEN = struct.Struct("<I")
+# Campaign codes per "codes" record written by compaction
+_CODES_PER_RECORD = 10_000
+
+
+class StoreBackend(Protocol):
+    """
+    The store API used by the views. Any backend must provide these.
+    """
+
+    def add_to_cart(self, user_id: str, product_id: int, quantity: int) -> None: ...
+
+    def set_cart_item(self, user_id: str, product_id: int, quantity: int) -> None: ...
+
+    def remove_cart_item(self, user_id: str, product_id: int) -> None: ...
+
+    def cart_snapshot(self, user_id: str) -> Dict[int, int]: ...
+
+    def priced_cart(self, user_id: str) -> Tuple[List[Tuple[int, int]], int]: ...
+
+    def apply_cart_ops(
+        self, user_id: str, ops: List[Tuple[str, int, int]]
+    ) -> Dict[int, int]: ...
+
+    def catalog(self) -> ProductCatalog: ...
+
+    def set_price(
+        self, product_id: int, price_cents: int, background: bool = True
+    ) -> int: ...
+
+    def quote(self, user_id: str, discount_code: Optional[str] = None) -> Quote: ...
+
+    def place_order(
+        self,
+        user_id: str,
+        discount_code: Optional[str] = None,
+        quote: Optional[Quote] = None,
+    ) -> Order: ...
+
+    def get_order(self, order_id: int) -> Optional[Order]: ...
+
+    def user_orders(
+        self, user_id: str, before: Optional[int] = None, limit: int = 20
+    ) -> List[Order]: ...
+
+    def eligible_now(self) -> bool: ...
+
+    def has_active_code(self) -> bool: ...
+
+    def generate_code(self) -> DiscountCode: ...
+
+    def issue_codes(
+        self, count: int, discount_pct: Optional[int] = None
+    ) -> List[DiscountCode]: ...
+
+    def validate_discount(self, code: Optional[str]) -> bool: ...
+
+    def stats(self) -> Dict[str, object]: ...
+
+    def gauges(self) -> Dict[str, int]: ...
+
+    @property
+    def may_block(self) -> bool: ...
+
+    def hold_uncontended(self, user_id: str, orders: bool = False): ...
+
+
+def _segment(**kwargs) -> shared_memory.SharedMemory:
+    """
+    Open a shared memory segment without resource-tracker registration:
+    the segment must outlive any one worker process.
+    """
+    try:
+        return shared_memory.SharedMemory(track=False, **kwargs)
+    except TypeError:  # Python < 3.13 has no `track`; unregister by hand
+        shm = shared_memory.SharedMemory(**kwargs)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def _open_segment(name: str, size: int) -> shared_memory.SharedMemory:
+    """
+    Attach to the named segment, creating it (zero-filled) if absent.
+    """
+    try:
+        return _segment(name=name)
+    except FileNotFoundError:
+        return _segment(name=name, create=True, size=size)
+
+
+class SharedMemoryStore(InMemoryStore):
+    """
+    A store whose state is shared by every process attached to `name`.
+
+    Every mutation is appended, in the WAL record format, to a journal in
+    a ``multiprocessing.shared_memory`` segment. Each process keeps a local
+    replica and, under a cross-process ``flock``, replays records written
+    by other processes before every operation. Order numbers, the Nth-order
+    rule and code redemption are therefore consistent host-wide.
+
+    When the journal fills up it is compacted in place to the minimal set
+    of records that rebuild the current state; other processes notice the
+    new generation and rebuild their replicas from it.
+    """
+
+    def __init__(self, name: str, capacity: int = 256 * 1024 * 1024, **kwargs):
+        if fcntl is None:
+            raise RuntimeError("SharedMemoryStore requires POSIX file locking")
+        if kwargs.get("order_sequencer"):
+            # The writer thread would need the host-wide lock its submitter holds
+            raise ValueError("SharedMemoryStore does not support the order sequencer")
+        super().__init__(**kwargs)
+        self.name = name
+        self._process_lock = threading.RLock()
+        self._depth = 0
+        self._generation = 0
+        self._offset = 0
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._lock_file = open(self._lock_path, "a+b")
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            self._shm = _open_segment(name, _HEADER.size + capacity)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+        self.capacity = self._shm.size - _HEADER.size
+
+    # Cross-process critical section -----
+
+    @contextmanager
+    def _shared(self):
+        """
+        Hold the process and host-wide locks with the replica caught up.
+        Re-entrant: nested calls from the base class reuse the outer hold.
+        """
+        with self._process_lock:
+            self._depth += 1
+            try:
+                if self._depth > 1:
+                    yield
+                    return
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+                try:
+                    self._catch_up()
+                    yield
+                finally:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            finally:
+                self._depth -= 1
+
+    @property
+    def may_block(self) -> bool:
+        # Every operation can wait for other processes on the flock
+        return True
+
+    def _catch_up(self) -> None:
+        """
+        Apply journal records written since this replica last looked.
+        """
+        buf = self._shm.buf
+        generation, used = _HEADER.unpack_from(buf, 0)
+        if generation != self._generation:
+            self._reset_state()
+            self._generation = generation
+            self._offset = 0
+
+        pos = self._offset
+        while pos < used:
+            (size,) = _RECORD_LEN.unpack_from(buf, _HEADER.size + pos)
+            start = _HEADER.size + pos + _RECORD_LEN.size
+            self._apply(json.loads(bytes(buf[start : start + size])))
+            pos += _RECORD_LEN.size + size
+        self._offset = pos
+
+    def _apply(self, record: Dict[str, object]) -> None:
+        if record["op"] == "active":  # written by compaction only
+            self.active_code = record["code"]
+        else:
+            super()._apply(record)
+
+    def _log(self, record: Dict[str, object]) -> None:
+        """
+        Append a record to the shared journal (called with the lock held,
+        right after the local replica applied the mutation).
+        """
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        if self._offset + _RECORD_LEN.size + len(payload) > self.capacity:
+            # The local replica already includes this mutation, so a
+            # compacted journal covers it without appending the record.
+            self._compact()
+            return
+        self._write_records([payload], self._offset)
+        _HEADER.pack_into(self._shm.buf, 0, self._generation, self._offset)
+
+    def _write_records(self, payloads, pos: int) -> None:
+        buf = self._shm.buf
+        for payload in payloads:
+            _RECORD_LEN.pack_into(buf, _HEADER.size + pos, len(payload))
+            start = _HEADER.size + pos + _RECORD_LEN.size
+            buf[start : start + len(payload)] = payload
+            pos += _RECORD_LEN.size + len(payload)
+        self._offset = pos
+
+    def _compact(self) -> None:
+        """
+        Rewrite the journal as the minimal records rebuilding current state.
+        """
+        records = [
+            {"op": "price", "p": pid, "c": price_cents}
+            for pid, price_cents in self._price_overrides.items()
+        ]
+        records += [
+            {
+                "op": "code",
+                "code": dc.code,
+                "at": _to_us(dc.created_at),
+                "pct": dc.discount_pct,
+            }
+            for dc in self.discount_codes
+        ]
+        for (at, pct), group in groupby(
+            self.campaign_codes, key=lambda dc: (_to_us(dc.created_at), dc.discount_pct)
+        ):
+            while chunk := [dc.code for dc in islice(group, _CODES_PER_RECORD)]:
+                records.append({"op": "codes", "codes": chunk, "at": at, "pct": pct})
+        records.extend(self._order_record(o) for o in self.orders)
+        records.extend(
+            {"op": "set", "u": user_id, "p": pid, "q": qty}
+            for user_id, cart in self.carts.items()
+            for pid, qty in cart.items()
+        )
+        records.append({"op": "active", "code": self.active_code})
+        payloads = [json.dumps(r, separators=(",", ":")).encode() for r in records]
+
+        if sum(_RECORD_LEN.size + len(p) for p in payloads) > self.capacity:
+            self._generation = -1  # force a rebuild from the shared journal
+            raise ValueError("Shared store capacity exhausted")
+
+        self._generation += 1
+        self._write_records(payloads, 0)
+        _HEADER.pack_into(self._shm.buf, 0, self._generation, self._offset)
+
+    def sync(self) -> None:
+        """
+        Bring the local replica up to date (e.g. before reading `orders`).
+        """
+        with self._shared():
+            pass
+
+    def close(self) -> None:
+        self._shm.close()
+        self._lock_file.close()
+
+    def unlink(self) -> None:
+        """
+        Destroy the shared segment (all attached processes lose the state).
+        """
+        self._shm.unlink()
+        try:
+            os.remove(self._lock_path)
+        except FileNotFoundError:
+            pass
+
+    # Synchronized store API -----
+
+    def add_to_cart(self, user_id: str, product_id: int, quantity: int) -> None:
+        with self._shared():
+            super().add_to_cart(user_id, product_id, quantity)
+
+    def clear_cart(self, user_id: str) -> None:
+        with self._shared():
+            super().clear_cart(user_id)
+
+    def get_cart(self, user_id: str) -> Dict[int, int]:
+        with self._shared():
+            return super().get_cart(user_id)
+
+    def cart_snapshot(self, user_id: str) -> Dict[int, int]:
+        with self._shared():
+            return super().cart_snapshot(user_id)
+
+    def priced_cart(self, user_id: str) -> Tuple[List[Tuple[int, int]], int]:
+        with self._shared():
+            return super().priced_cart(user_id)
+
+    def apply_cart_ops(
+        self, user_id: str, ops: List[Tuple[str, int, int]]
+    ) -> Dict[int, int]:
+        with self._shared():
+            return super().apply_cart_ops(user_id, ops)
+
+    def remove_cart_item(self, user_id: str, product_id: int) -> None:
+        with self._shared():
+            super().remove_cart_item(user_id, product_id)
+
+    def set_cart_item(self, user_id: str, product_id: int, quantity: int) -> None:
+        with self._shared():
+            super().set_cart_item(user_id, product_id, quantity)
+
+    def catalog(self) -> ProductCatalog:
+        # Replay price changes made by other workers before the read
+        with self._shared():
+            return super().catalog()
+
+    def set_price(
+        self, product_id: int, price_cents: int, background: bool = True
+    ) -> int:
+        # Always inline: replayed journal records change carts without
+        # taking their stripes, so totals may only change under this lock
+        with self._shared():
+            return super().set_price(product_id, price_cents, background=False)
+
+    def quote(self, user_id: str, discount_code: Optional[str] = None) -> Quote:
+        with self._shared():
+            return super().quote(user_id, discount_code)
+
+    def place_order(
+        self,
+        user_id: str,
+        discount_code: Optional[str] = None,
+        quote: Optional[Quote] = None,
+    ) -> Order:
+        with self._shared():
+            return super().place_order(user_id, discount_code, quote)
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        with self._shared():
+            return super().get_order(order_id)
+
+    def user_orders(
+        self, user_id: str, before: Optional[int] = None, limit: int = 20
+    ) -> List[Order]:
+        with self._shared():
+            return super().user_orders(user_id, before, limit)
+
+    def next_order_number(self) -> int:
+        with self._shared():
+            return super().next_order_number()
+
+    def eligible_now(self) -> bool:
+        with self._shared():
+            return super().eligible_now()
+
+    def has_active_code(self) -> bool:
+        with self._shared():
+            return super().has_active_code()
+
+    def generate_code(self) -> DiscountCode:
+        with self._shared():
+            return super().generate_code()
+
+    def issue_codes(
+        self, count: int, discount_pct: Optional[int] = None
+    ) -> List[DiscountCode]:
+        with self._shared():
+            return super().issue_codes(count, discount_pct)
+
+    def validate_discount(self, code: Optional[str]) -> bool:
+        with self._shared():
+            return super().validate_discount(code)
+
+    def stats(self) -> Dict[str, object]:
+        with self._shared():
+            return super().stats()
+
+    def cart_stats(self) -> Dict[str, int]:
+        with self._shared():
+            return super().cart_stats()
+
+    def gauges(self) -> Dict[str, int]:
+        with self._shared():
+            return super().gauges()
+
+    def sales_window(
+        self, start: datetime, end: datetime, granularity: Optional[str] = None
+    ) -> Dict[str, object]:
+        with self._shared():
+            return super().sales_window(start, end, granularity)
+
+    def stats_consistent(self) -> bool:
+        with self._shared():
+            return super().stats_consistent()
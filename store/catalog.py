@@ -0,0 +1,261 @@
+"""
+Compact product catalog and a streaming catalog file loader.
+
+The catalog keeps products as id-sorted parallel columns (ids and prices
+in typed arrays, names in a list) rather than one object per SKU, so a
+large catalog costs a few dozen bytes per product. Lookups are a binary
+search over the id column and a page after a given id costs O(log n +
+limit).
+"""
+
+# Standard library imports
+import csv
+import itertools
+import json
+import os
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Local application/library specific imports
+from .money import from_cents
+from .search import ProductSearchIndex
+
+# (id, name, price_cents)
+ProductRow = Tuple[int, str, int]
+
+# Catalog versions, unique within the process across catalog instances
+_versions = itertools.count(1)
+
+
+@dataclass
+class Product:
+    """
+    Represents a simple, sellable product in our in-memory catalog.
+    Prices are held as integer cents; `price` is the Decimal view.
+    """
+
+    id: int
+    name: str
+    price_cents: int
+
+    @property
+    def price(self) -> Decimal:
+        return from_cents(self.price_cents)
+
+
+class ProductCatalog(Mapping):
+    """
+    Read-mostly mapping of product id -> Product, stored columnar.
+
+    Product objects are built on access; mutate prices and names through
+    `upsert` / `set_price`, not by assigning to a returned Product, so the
+    name search index and `version` stay in step.
+
+    `version` increases on every mutation and is never shared with another
+    catalog, so anything derived from the catalog can be cached under it.
+    The version of each product's last change is kept too, so something
+    derived from a few products can tell whether any of them changed.
+    """
+
+    def __init__(self, rows: Iterable[ProductRow] = ()):
+        self._ids = array("q")
+        self._prices = array("q")
+        self._names: List[str] = []
+        self._bulk_load(rows)
+        self._search = ProductSearchIndex(zip(self._ids, self._names))
+        self._changed: Dict[int, int] = {}  # pid -> version of its last change
+        self.version = next(_versions)
+
+    def _bulk_load(self, rows: Iterable[ProductRow]) -> None:
+        """
+        Append rows as they stream in; sort once at the end only if the
+        input was not already in id order.
+        """
+        ids, prices, names = self._ids, self._prices, self._names
+        in_order = True
+        for pid, name, price_cents in rows:
+            if ids and pid <= ids[-1]:
+                in_order = False
+            ids.append(pid)
+            prices.append(price_cents)
+            names.append(name)
+
+        if not in_order:
+            order = sorted(range(len(ids)), key=ids.__getitem__)
+            self._ids = array("q", (ids[i] for i in order))
+            self._prices = array("q", (prices[i] for i in order))
+            self._names = [names[i] for i in order]
+
+        for a, b in zip(self._ids, self._ids[1:]):
+            if a == b:
+                raise ValueError(f"Duplicate product id {a}")
+
+    def _index(self, pid: int) -> int:
+        """
+        Row index of pid, or -1.
+        """
+        i = bisect_left(self._ids, pid)
+        if i < len(self._ids) and self._ids[i] == pid:
+            return i
+        return -1
+
+    def _product(self, i: int) -> Product:
+        return Product(self._ids[i], self._names[i], self._prices[i])
+
+    # Mapping API -----
+
+    def __getitem__(self, pid):
+        i = self._index(pid) if isinstance(pid, int) else -1
+        if i < 0:
+            raise KeyError(pid)
+        return self._product(i)
+
+    def __contains__(self, pid) -> bool:
+        return isinstance(pid, int) and self._index(pid) >= 0
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # Mutation -----
+
+    def upsert(self, pid: int, name: str, price_cents: int) -> None:
+        """
+        Insert or replace a product (O(n) worst case for an insert).
+        """
+        i = self._index(pid)
+        if i >= 0:
+            if self._names[i] != name:
+                self._search.remove(pid, self._names[i])
+                self._search.add(pid, name)
+            self._names[i] = name
+            self._prices[i] = price_cents
+        else:
+            i = bisect_left(self._ids, pid)
+            self._ids.insert(i, pid)
+            self._prices.insert(i, price_cents)
+            self._names.insert(i, name)
+            self._search.add(pid, name)
+        # Bumped last: a reader that sees the new version sees the new data
+        version = self._changed[pid] = next(_versions)
+        self.version = version
+
+    def set_price(self, pid: int, price_cents: int) -> None:
+        i = self._index(pid)
+        if i < 0:
+            raise ValueError("Unknown product_id")
+        self._prices[i] = price_cents
+        version = self._changed[pid] = next(_versions)
+        self.version = version
+
+    def changed_since(self, version: int, pids: Iterable[int]) -> bool:
+        """
+        True if any of `pids` was changed after catalog `version`.
+        """
+        changed = self._changed
+        return any(changed.get(pid, 0) > version for pid in pids)
+
+    # Paging -----
+
+    def page(self, after: Optional[int], limit: int) -> List[Product]:
+        """
+        Up to `limit` products with id > after (from the start if None).
+        """
+        start = 0 if after is None else bisect_right(self._ids, after)
+        return [self._product(i) for i in range(start, min(start + limit, len(self)))]
+
+    def has_after(self, pid: int) -> bool:
+        return bool(self._ids) and self._ids[-1] > pid
+
+    # Search -----
+
+    def search(self, query: str, limit: int) -> List[Product]:
+        """
+        Products whose name matches `query` (see ProductSearchIndex).
+        """
+        ids = self._search.search(query, limit, self._name_of)
+        return [self._product(self._index(pid)) for pid in ids]
+
+    def _name_of(self, pid: int) -> str:
+        return self._names[self._index(pid)]
+
+
+def parse_price_cents(value) -> int:
+    """
+    Parse a non-negative price with at most two decimals into cents.
+    """
+    try:
+        price = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid price {value!r}")
+    if not price.is_finite() or price < 0:
+        raise ValueError(f"invalid price {value!r}")
+    if price.as_tuple().exponent < -2:
+        raise ValueError(f"price {value!r} has more than two decimals")
+    return int(price.scaleb(2))
+
+
+def _validated(pid, name, price, where: str) -> ProductRow:
+    try:
+        pid = int(pid)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: invalid id {pid!r}")
+    if pid <= 0:
+        raise ValueError(f"{where}: id must be positive")
+    if not isinstance(name, str) or not name.strip():
+        raise ValueError(f"{where}: name is required")
+    if "\0" in name:
+        raise ValueError(f"{where}: name contains a NUL character")
+    name = name.strip()
+    try:
+        return pid, name, parse_price_cents(price)
+    except ValueError as e:
+        raise ValueError(f"{where}: {e}")
+
+
+def iter_catalog_file(path: str) -> Iterator[ProductRow]:
+    """
+    Stream validated (id, name, price_cents) rows from a .csv (header:
+    id,name,price) or .jsonl file, one line at a time. Raises ValueError
+    naming the offending line.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8") as f:
+        if ext == ".csv":
+            reader = csv.DictReader(f)
+            missing = {"id", "name", "price"} - set(reader.fieldnames or ())
+            if missing:
+                raise ValueError(f"{path}: missing columns {sorted(missing)}")
+            for row in reader:
+                where = f"{path}:{reader.line_num}"
+                yield _validated(row["id"], row["name"], row["price"], where)
+        elif ext in (".jsonl", ".ndjson"):
+            for lineno, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                where = f"{path}:{lineno}"
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"{where}: {e.msg}")
+                if not isinstance(row, dict):
+                    raise ValueError(f"{where}: expected an object")
+                yield _validated(
+                    row.get("id"), row.get("name"), row.get("price"), where
+                )
+        else:
+            raise ValueError(f"{path}: unsupported catalog format {ext!r}")
+
+
+def load_catalog(path: str) -> ProductCatalog:
+    """
+    Build a ProductCatalog from a CSV/JSONL file without materializing
+    intermediate Product objects.
+    """
+    return ProductCatalog(iter_catalog_file(path))
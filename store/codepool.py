@@ -0,0 +1,108 @@
+"""
+Discount code generation.
+
+A code is 8 characters of RFC 4648 base32 (A-Z, 2-7) encoding 5 random
+bytes. A batch of codes comes from one ``secrets.token_bytes`` call and one
+``base64.b32encode`` call, rather than one ``secrets.choice`` call per
+character. ``CodePool`` generates codes ahead of time, so issuing a code is
+just a pop. It refills on a background thread once it runs below its low
+watermark.
+"""
+
+# Standard library imports
+import base64
+import secrets
+import threading
+from collections import deque
+from typing import Callable, Deque, List, Set
+
+# 40 random bits per code, encoded without padding
+CODE_BYTES = 5
+CODE_LENGTH = 8
+
+
+def random_codes(count: int) -> List[str]:
+    """
+    `count` random codes; they may repeat (see CodePool).
+    """
+    blob = base64.b32encode(secrets.token_bytes(CODE_BYTES * count)).decode("ascii")
+    return [blob[i : i + CODE_LENGTH] for i in range(0, len(blob), CODE_LENGTH)]
+
+
+class CodePool:
+    """
+    Up to `size` distinct codes, none of which was `taken` when pooled.
+
+    `take(n)` pops codes oldest first and generates any shortfall on the
+    spot. When fewer than `refill_at` remain, one background thread tops
+    the pool up to `size`, `chunk` codes at a time. `size=0` disables the
+    pool, and every code is then generated on demand.
+
+    A code can be taken elsewhere after it was pooled, e.g. by another
+    process sharing the store. The caller must therefore re-check what it
+    takes under its own lock before issuing it.
+    """
+
+    def __init__(
+        self,
+        taken: Callable[[str], bool],
+        size: int = 1_000,
+        refill_at: int = 250,
+        chunk: int = 4096,
+    ):
+        self.taken = taken
+        self.size = size
+        self.refill_at = refill_at
+        self.chunk = chunk
+        self._lock = threading.Lock()
+        self._ready: Deque[str] = deque()
+        self._pooled: Set[str] = set()
+        self._refilling = False
+        # Codes generated and discarded as duplicates, for monitoring
+        self.collisions = 0
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def take(self, count: int = 1) -> List[str]:
+        """
+        `count` distinct codes.
+        """
+        with self._lock:
+            while len(self._ready) < count:
+                self._add(random_codes(count - len(self._ready)))
+            codes = [self._ready.popleft() for _ in range(count)]
+            self._pooled.difference_update(codes)
+            refill = len(self._ready) < self.refill_at and not self._refilling
+            self._refilling = self._refilling or refill
+        if refill:
+            threading.Thread(
+                target=self._refill, name="code-pool-refill", daemon=True
+            ).start()
+        return codes
+
+    def _add(self, codes: List[str]) -> None:
+        """
+        Pool the codes not already pooled or taken. Caller holds the lock.
+        """
+        for code in codes:
+            if code in self._pooled or self.taken(code):
+                self.collisions += 1
+                continue
+            self._pooled.add(code)
+            self._ready.append(code)
+
+    def _refill(self) -> None:
+        try:
+            while True:
+                with self._lock:
+                    missing = self.size - len(self._ready)
+                if missing <= 0:
+                    return
+                # Generate outside the lock, so takers only wait for the merge
+                codes = random_codes(min(missing, self.chunk))
+                with self._lock:
+                    self._add(codes)
+        finally:
+            with self._lock:
+                self._refilling = False
@@ -0,0 +1,196 @@
+"""
+Compiled response encoders for output serializers.
+
+``compile_encoder(SomeSerializer)`` reads the serializer's declared fields
+once and generates a plain function that builds the same dict DRF's
+``to_representation`` would, without per-field method dispatch. Integer,
+char, decimal and ISO-8601 datetime fields and nested serializers are
+inlined. Any other field type calls the field's own ``to_representation``.
+An object the fast path cannot handle exactly (a missing attribute, which
+DRF may default or skip, or a callable attribute, which DRF calls) is
+handed to DRF as a whole.
+
+The serializer classes stay the source of truth (validation, OpenAPI
+schema). With ``VERIFY`` set, every encode is also run through DRF and
+must render to the same JSON bytes; the test suite runs this way.
+"""
+
+# Standard library imports
+import decimal
+import sys
+from collections.abc import Mapping
+from typing import Any, Callable, Dict
+
+# Related third-party imports
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.manager import BaseManager
+from django.utils import timezone
+from rest_framework import ISO_8601
+from rest_framework.fields import (
+    CharField,
+    DateTimeField,
+    DecimalField,
+    Field,
+    IntegerField,
+)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import BaseSerializer, ListSerializer
+from rest_framework.settings import api_settings
+
+# Compare every encode with DRF's output (raises AssertionError on mismatch)
+VERIFY = False
+
+Encoder = Callable[[Any], Any]
+
+
+def compile_encoder(serializer) -> Encoder:
+    """
+    Return a function equivalent to ``serializer.to_representation``.
+    `serializer` is a Serializer class or instance; ``many=True`` gives a
+    list encoder.
+    """
+    if isinstance(serializer, type):
+        serializer = serializer()
+    if isinstance(serializer, ListSerializer):
+        child = compile_encoder(serializer.child)
+        return lambda items: [child(item) for item in items]
+
+    fields = list(serializer._readable_fields)
+    slow = serializer.to_representation
+    if not all(_plain_source(field) for field in fields):
+        return slow
+
+    env: Dict[str, Any] = {
+        "encoders": sys.modules[__name__],
+        "BaseManager": BaseManager,
+        "Mapping": Mapping,
+        "missing": (KeyError, AttributeError, ObjectDoesNotExist),
+        "slow": slow,
+        "verify": _verifier(serializer),
+    }
+    lines = ["def encode(obj):", "    m = isinstance(obj, Mapping)", "    out = {}"]
+    for i, field in enumerate(fields):
+        attr = field.source_attrs[0]
+        getter = f"obj.{attr}" if attr.isidentifier() else f"getattr(obj, {attr!r})"
+        lines += [
+            "    try:",
+            f"        v = obj[{attr!r}] if m else {getter}",
+            "    except missing:",
+            "        return slow(obj)",
+            "    if callable(v):",
+            "        return slow(obj)",
+            f"    out[{field.field_name!r}] = None if v is None else "
+            + _conversion(field, f"f{i}", env),
+        ]
+    lines += ["    if encoders.VERIFY:", "        verify(obj, out)", "    return out"]
+
+    code = compile("\n".join(lines), f"<{type(serializer).__name__} encoder>", "exec")
+    exec(code, env)
+    return env["encode"]
+
+
+def _plain_source(field: Field) -> bool:
+    """
+    True if DRF would read `field` as one key or attribute of the object.
+    """
+    return (
+        len(field.source_attrs) == 1
+        and type(field).get_attribute is Field.get_attribute
+    )
+
+
+def _conversion(field: Field, name: str, env: Dict[str, Any]) -> str:
+    """
+    Source of an expression turning a non-None `v` into the field's
+    representation; helpers it needs are added to `env`.
+    """
+    kind = type(field)
+    if kind is IntegerField:
+        return "int(v)"
+    if kind is CharField:
+        return "str(v)"
+    if isinstance(field, ListSerializer):
+        env[name] = compile_encoder(field.child)
+        # As ListSerializer: a related manager is iterated via .all()
+        return f"[{name}(x) for x in (v.all() if isinstance(v, BaseManager) else v)]"
+    if isinstance(field, BaseSerializer):
+        env[name] = compile_encoder(field)
+        return f"{name}(v)"
+    if kind is DecimalField and _plain_decimal(field):
+        env[name] = _decimal_encoder(field)
+        return f"{name}(v)"
+    if kind is DateTimeField:
+        env[name] = _datetime_encoder(field)
+        return f"{name}(v)"
+    env[name] = field.to_representation
+    return f"{name}(v)"
+
+
+def _plain_decimal(field: DecimalField) -> bool:
+    coerce = getattr(field, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    return (
+        coerce
+        and not field.localize
+        and not field.normalize_output
+        and field.decimal_places is not None
+    )
+
+
+def _decimal_encoder(field: DecimalField) -> Encoder:
+    """
+    DecimalField.to_representation with the quantize context built once.
+    """
+    exponent = decimal.Decimal(".1") ** field.decimal_places
+    context = decimal.getcontext().copy()
+    if field.max_digits is not None:
+        context.prec = field.max_digits
+    rounding = field.rounding
+    Decimal = decimal.Decimal
+
+    def encode(value):
+        if type(value) is not Decimal:
+            value = Decimal(str(value).strip())
+        return f"{value.quantize(exponent, rounding=rounding, context=context):f}"
+
+    return encode
+
+
+def _datetime_encoder(field: DateTimeField) -> Encoder:
+    """
+    DateTimeField.to_representation for the common case (ISO-8601 output,
+    aware datetimes, current time zone); anything else goes to DRF.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if (
+        output_format is None
+        or output_format.lower() != ISO_8601
+        or hasattr(field, "timezone")
+        or not settings.USE_TZ
+    ):
+        return field.to_representation
+    slow = field.to_representation
+
+    def encode(value):
+        if not value or isinstance(value, str) or timezone.is_naive(value):
+            return slow(value)
+        text = value.astimezone(timezone.get_current_timezone()).isoformat()
+        if text.endswith("+00:00"):
+            text = text[:-6] + "Z"
+        return text
+
+    return encode
+
+
+def _verifier(serializer) -> Callable[[Any, dict], None]:
+    render = JSONRenderer().render
+
+    def verify(obj, out):
+        expected = render(serializer.to_representation(obj))
+        if render(out) != expected:
+            raise AssertionError(
+                f"{type(serializer).__name__} encoder differs from DRF: "
+                f"{render(out)!r} != {expected!r}"
+            )
+
+    return verify
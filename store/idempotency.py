@@ -0,0 +1,172 @@
+"""
+Idempotency-Key support: a bounded, TTL-evicting cache of responses.
+
+The first request for a key claims it and runs; its successful response
+body is stored and replayed byte-for-byte to retries. A duplicate that
+arrives while the first is still running waits for it instead of racing
+it. State is per process (like the default store backend).
+"""
+
+# Standard library imports
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional
+
+_IN_PROGRESS = "A request with this Idempotency-Key is still in progress."
+
+
+class IdempotencyKeyReused(ValueError):
+    """
+    The key was already used with a different request payload.
+    """
+
+
+class IdempotencyKeyInProgress(ValueError):
+    """
+    The request holding the key did not finish within the wait timeout.
+    """
+
+
+class CachedResponse:
+    """
+    One key's state: in flight until `done` is set with a body stored.
+    """
+
+    __slots__ = ("fingerprint", "done", "waiters", "status", "body", "expires")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        # Futures of duplicates awaiting this entry on an event loop
+        self.waiters: List[asyncio.Future] = []
+        self.status = 0
+        self.body: Optional[bytes] = None
+        self.expires = 0.0
+
+    def wake(self) -> None:
+        """
+        Release every waiting duplicate, thread or coroutine.
+        """
+        self.done.set()
+        for fut in self.waiters:
+            try:
+                fut.get_loop().call_soon_threadsafe(_resolve, fut)
+            except RuntimeError:
+                pass  # its loop is closed; nobody is left waiting
+        self.waiters.clear()
+
+
+def _resolve(fut: asyncio.Future) -> None:
+    if not fut.done():  # the waiter may have timed out already
+        fut.set_result(None)
+
+
+class IdempotencyCache:
+    """
+    At most `max_keys` completed responses, each kept for `ttl` seconds.
+
+    Completed entries sit in an OrderedDict oldest first, so expiry and
+    the size bound only ever look at the front. Keys still in flight are
+    kept apart until they complete: they are never evicted, and a slow one
+    does not hold back the eviction of those completed after it.
+    """
+
+    def __init__(self, max_keys: int = 100_000, ttl: float = 24 * 3600):
+        self.max_keys = max_keys
+        self.ttl = ttl
+        self._clock = time.monotonic
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._in_flight: Dict[Hashable, CachedResponse] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._in_flight)
+
+    def claim(
+        self, key: Hashable, fingerprint: str, timeout: float
+    ) -> Optional[CachedResponse]:
+        """
+        Return None if the caller now owns `key` and must run the request
+        (then call `complete` or `release`), or the stored response to
+        replay. Waits up to `timeout` seconds for an in-flight owner.
+        """
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                entry = self._lookup(key, fingerprint)
+                if entry is None or entry.body is not None:
+                    return entry
+            remaining = deadline - self._clock()
+            if remaining <= 0 or not entry.done.wait(remaining):
+                raise IdempotencyKeyInProgress(_IN_PROGRESS)
+            # Completed (replay it) or released (try to claim it) - re-check
+
+    async def aclaim(
+        self, key: Hashable, fingerprint: str, timeout: float
+    ) -> Optional[CachedResponse]:
+        """
+        `claim` for coroutines: a duplicate waits on a future, so the event
+        loop keeps serving other requests meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                entry = self._lookup(key, fingerprint)
+                if entry is None or entry.body is not None:
+                    return entry
+                fut = loop.create_future()
+                entry.waiters.append(fut)
+            remaining = deadline - self._clock()
+            try:
+                if remaining <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(fut, remaining)
+            except asyncio.TimeoutError:
+                raise IdempotencyKeyInProgress(_IN_PROGRESS)
+
+    def complete(self, key: Hashable, status: int, body: bytes) -> None:
+        """
+        Store the owner's response and wake any waiting duplicates.
+        """
+        with self._lock:
+            entry = self._entries[key] = self._in_flight.pop(key)
+            entry.status, entry.body = status, body
+            entry.expires = self._clock() + self.ttl
+            self._trim()
+            entry.wake()
+
+    def release(self, key: Hashable) -> None:
+        """
+        Forget an owned key without storing a response (the request
+        failed), letting a retry run again.
+        """
+        with self._lock:
+            entry = self._in_flight.pop(key, None)
+            if entry is not None:
+                entry.wake()
+
+    def _lookup(self, key: Hashable, fingerprint: str) -> Optional[CachedResponse]:
+        """
+        With the lock held: claim `key` (returning None) or return its entry.
+        """
+        self._trim()
+        entry = self._entries.get(key) or self._in_flight.get(key)
+        if entry is None:
+            self._in_flight[key] = CachedResponse(fingerprint)
+            return None
+        if entry.fingerprint != fingerprint:
+            raise IdempotencyKeyReused(
+                "Idempotency-Key was already used with a different request."
+            )
+        return entry
+
+    def _trim(self) -> None:
+        now = self._clock()
+        while self._entries:
+            entry = next(iter(self._entries.values()))
+            if entry.expires > now and len(self._entries) <= self.max_keys:
+                break
+            self._entries.popitem(last=False)
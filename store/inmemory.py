@@ -6,30 +6,50 @@ requirements.
 """
 
 # Standard library imports
-import secrets
-import string
+import itertools
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import contextmanager, ExitStack
 from dataclasses import dataclass
-from datetime import datetime
-from decimal import Decimal, ROUND_HALF_UP
-from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Set, Tuple
 
 # Related third-party imports
 from django.conf import settings
 from django.utils import timezone
 
+# Local application/library specific imports
+from .catalog import load_catalog, Product, ProductCatalog  # noqa: F401
+from .codepool import CodePool
+from .ledger import ColumnarLedger
+from .money import D, from_cents, money, percent_of, to_cents  # noqa: F401
+from .rollups import SalesRollup
+from .sequencer import OrderDraft, OrderSequencer
+from .persistence import (
+    list_segments,
+    pack_strings,
+    read_snapshot,
+    unpack_strings,
+    write_snapshot,
+    WriteAheadLog,
+)
 
-def D(x) -> Decimal:
-    """
-    Return a Decimal from any numeric/string value with safe coercion.
-    """
-    return Decimal(str(x))
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
 
 
-def money(x: Decimal) -> Decimal:
-    """
-    Two-decimal rounding suitable for currency display and arithmetic.
-    """
-    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+def _to_us(dt: datetime) -> int:
+    return (dt - _EPOCH) // _MICROSECOND
+
+
+def _from_us(us: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=us)
 
 
 def _isoz(dt: datetime) -> str:
@@ -40,18 +60,7 @@ def _isoz(dt: datetime) -> str:
     return dt.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
 
 
-@dataclass
-class Product:
-    """
-    Represents a simple, sellable product in our in-memory catalog.
-    """
-
-    id: int
-    name: str
-    price: Decimal
-
-
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class OrderItem:
     """
     Immutable snapshot of a purchased item.
@@ -60,12 +69,20 @@ class OrderItem:
 
     product_id: int
     name: str
-    price: Decimal
+    price_cents: int
     quantity: int
-    line_total: Decimal
+    line_total_cents: int
 
+    @property
+    def price(self) -> Decimal:
+        return from_cents(self.price_cents)
 
-@dataclass
+    @property
+    def line_total(self) -> Decimal:
+        return from_cents(self.line_total_cents)
+
+
+@dataclass(slots=True)
 class Order:
     """
     A completed order (cart -> order conversion).
@@ -74,17 +91,60 @@ class Order:
     id: int
     user_id: str
     items: List[OrderItem]
-    subtotal: Decimal
-    discount: Decimal
-    total: Decimal
+    subtotal_cents: int
+    discount_cents: int
+    total_cents: int
     created_at: datetime
     discount_code: Optional[str] = None
 
+    @property
+    def subtotal(self) -> Decimal:
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def discount(self) -> Decimal:
+        return from_cents(self.discount_cents)
+
+    @property
+    def total(self) -> Decimal:
+        return from_cents(self.total_cents)
+
+
+@dataclass(frozen=True, slots=True)
+class Quote:
+    """
+    A user's cart priced at checkout time (see InMemoryStore.quote).
+    Checkout can commit it as-is while the cart and the catalog are still
+    at the versions it was priced from.
+    """
+
+    user_id: str
+    items: List[OrderItem]
+    subtotal_cents: int
+    discount_cents: int
+    discount_code: Optional[str]
+    cart_version: int
+    catalog_version: int
+
+    @property
+    def subtotal(self) -> Decimal:
+        return from_cents(self.subtotal_cents)
+
+    @property
+    def discount(self) -> Decimal:
+        return from_cents(self.discount_cents)
+
+    @property
+    def total(self) -> Decimal:
+        return from_cents(self.subtotal_cents - self.discount_cents)
+
 
 @dataclass
 class DiscountCode:
     """
     Represents a single-use discount code that applies to the entire order.
+    Campaign codes are issued in bulk and redeemable on any order; the
+    others only on the Nth order, one active at a time.
     """
 
     code: str
@@ -92,38 +152,296 @@ class DiscountCode:
     used: bool = False
     redeemed_order_id: Optional[int] = None
     discount_pct: int = 10  # default 10%
+    campaign: bool = False
+
+
+def _campaign_codes(
+    codes: List[str], created_at: datetime, discount_pct: int
+) -> List[DiscountCode]:
+    return [
+        DiscountCode(
+            code=code, created_at=created_at, discount_pct=discount_pct, campaign=True
+        )
+        for code in codes
+    ]
+
+
+class CartTotals:
+    """
+    A cart's line totals and subtotal in cents, valid while the store's
+    totals `epoch` is unchanged. Only lines whose product is in the catalog
+    have a line total.
+    """
+
+    __slots__ = ("epoch", "lines", "subtotal_cents")
+
+    def __init__(self, epoch: int):
+        self.epoch = epoch
+        self.lines: Dict[int, int] = {}
+        self.subtotal_cents = 0
+
+    def set(self, product_id: int, product: Optional[Product], quantity: int) -> None:
+        """
+        Reprice one line (quantity <= 0 removes it) in O(1).
+        """
+        self.subtotal_cents -= self.lines.pop(product_id, 0)
+        if product is not None and quantity > 0:
+            line_total = product.price_cents * quantity
+            self.lines[product_id] = line_total
+            self.subtotal_cents += line_total
+
+
+class OrderLedger(ColumnarLedger):
+    """
+    Order history as a sequence of Order objects, stored columnar.
+    Orders are materialized only when accessed (e.g. to serialize them).
+    """
+
+    def append(self, order: Order) -> None:
+        self.append_row(
+            (
+                order.id,
+                order.user_id,
+                _to_us(order.created_at),
+                order.subtotal_cents,
+                order.discount_cents,
+                order.total_cents,
+                order.discount_code,
+                [
+                    (
+                        oi.product_id,
+                        oi.name,
+                        oi.price_cents,
+                        oi.quantity,
+                        oi.line_total_cents,
+                    )
+                    for oi in order.items
+                ],
+            )
+        )
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("order index out of range")
+
+        order_id, user_id, at_us, sub_c, disc_c, tot_c, code, items = self.row(i)
+        return Order(
+            id=order_id,
+            user_id=user_id,
+            items=[
+                OrderItem(
+                    product_id=pid,
+                    name=name,
+                    price_cents=price_c,
+                    quantity=qty,
+                    line_total_cents=line_c,
+                )
+                for pid, name, price_c, qty, line_c in items
+            ],
+            subtotal_cents=sub_c,
+            discount_cents=disc_c,
+            total_cents=tot_c,
+            created_at=_from_us(at_us),
+            discount_code=code,
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def by_id(self, order_id: int) -> Optional[Order]:
+        i = self.find_id(order_id)
+        return self[i] if i >= 0 else None
+
+    def for_user(self, user_id: str, before: Optional[int], limit: int) -> List[Order]:
+        """
+        Up to `limit` of the user's orders with id < before (all if None),
+        newest first. Costs O(log n + limit).
+        """
+        rows = self.user_rows(user_id)
+        end = len(rows)
+        if before is not None:
+            ids = self._cols["id"]
+            end = bisect_left(rows, bisect_left(ids, before))
+        return [self[rows[j]] for j in range(end - 1, max(end - limit, 0) - 1, -1)]
+
+
+# Cart versions, unique within the process (a recreated cart never reuses one)
+_cart_versions = itertools.count(1)
+
+# Number of lock stripes used to guard per-user carts.
+CART_LOCK_STRIPES = 64
+
+# Most carts a single cart write may evict (keeps eviction amortized)
+CART_EVICT_BATCH = 4
+
+# Most carts repriced per hold of a cart stripe after a price change
+REPRICE_BATCH = 256
+
+# Demo catalog used when no catalog file is configured: (id, name, cents)
+DEFAULT_PRODUCTS = [
+    (1, "Almonds 500g", 75000),
+    (2, "Cashews 500g", 35000),
+    (3, "Pistachios 500g", 90000),
+]
 
 
 class InMemoryStore:
     """
     An in-memory, process-local data store.
 
+    Thread-safety: carts are guarded by a fixed pool of striped locks keyed
+    by ``hash(user_id)``, so unrelated users never contend on cart writes.
+    Order placement and discount state share a single global lock. When
+    both are needed the cart stripe is always acquired first. With
+    `order_sequencer`, checkouts price their cart on the calling thread and
+    a single writer commits the resulting drafts in batches under that lock
+    (see store.sequencer). Both kinds of lock are re-entrant, so a caller
+    holding them (see hold_uncontended) can make store calls that take them
+    again without waiting.
+
+    Carts are bounded: empty carts are never stored, and carts idle for
+    longer than `cart_ttl` seconds, or beyond the `max_carts` least
+    recently used, are evicted a few at a time by later cart writes.
+
+    Each cart's totals are kept priced as lines change, so reading a priced
+    cart does not reprice it. A reverse index (product id -> users whose
+    cart holds it) lets `set_price` reprice just the carts holding that
+    product. Any other catalog change reprices every cart on its next read.
+    With `verify_cart_totals`, every such read also reprices the cart in
+    full and raises AssertionError if the kept totals differ.
+
     Attributes
     ----------
-    products : Dict[int, Product]
-        A tiny fixed catalog for the demo.
+    products : ProductCatalog
+        Product id -> Product (see store.catalog); the demo catalog unless
+        one is passed in, e.g. from settings.STORE_CATALOG_PATH.
 
-    carts : Dict[str, Dict[int, int]]
-        Per-user carts: user_id -> { product_id: quantity }
+    carts : OrderedDict[str, Dict[int, int]]
+        Per-user carts: user_id -> { product_id: quantity }, least
+        recently used first.
 
-    orders : list[Order]
-        All placed orders.
+    orders : OrderLedger
+        All placed orders (columnar; indexing yields Order objects).
     """
 
-    def __init__(self):
-        # A tiny product catalog;
-        self.products: Dict[int, Product] = {
-            1: Product(1, "Almonds 500g", D("750")),
-            2: Product(2, "Cashews 500g", D("350")),
-            3: Product(3, "Pistachios 500g", D("900")),
-        }
-        # user carts stored in-memory
-        self.carts: Dict[str, Dict[int, int]] = {}
+    def __init__(
+        self,
+        lock_stripes: int = CART_LOCK_STRIPES,
+        catalog: Optional[ProductCatalog] = None,
+        cart_ttl: float = 0,
+        max_carts: int = 0,
+        order_sequencer: bool = False,
+        verify_cart_totals: bool = False,
+        code_pool_size: int = 1_000,
+    ):
+        # The product catalog; a tiny fixed one unless a loaded one is given
+        if catalog is None:
+            catalog = ProductCatalog(DEFAULT_PRODUCTS)
+        self.products: ProductCatalog = catalog
+        self._reset_state()
+        # Synchronization: striped cart locks + one lock for orders/discounts
+        self._cart_locks = [threading.RLock() for _ in range(max(1, lock_stripes))]
+        self._lock = threading.RLock()
+        # Cart eviction (0 disables either bound); one sweeper at a time
+        self.cart_ttl = cart_ttl
+        self.max_carts = max_carts
+        self._clock = time.monotonic
+        self._evict_lock = threading.Lock()
+        self._evicted_idle = 0
+        self._evicted_lru = 0
+        self.verify_cart_totals = verify_cart_totals
+        # Kept cart totals are valid for one epoch, bumped when the catalog
+        # changes other than through set_price
+        self._totals_epoch = 0
+        self._catalog_version = catalog.version
+        # Price changes (guarded by _reprice_lock): product id -> background
+        # reprices still running, and the prices set since the catalog loaded
+        self._reprice_lock = threading.Lock()
+        self._repricing: Dict[int, int] = {}
+        self._price_overrides: Dict[int, int] = {}
+        # Discount codes generated ahead of time (see codepool.py)
+        self._code_pool = CodePool(
+            lambda code: code in self._codes_by_code,
+            size=code_pool_size,
+            refill_at=code_pool_size // 4,
+        )
+        # Optional single writer thread for order commits (see sequencer.py)
+        self._sequencer: Optional[OrderSequencer] = None
+        if order_sequencer:
+            self._sequencer = OrderSequencer(self._commit_orders, self._lock)
+        # Optional durability (see InMemoryStore.open)
+        self._wal: Optional[WriteAheadLog] = None
+        self._data_dir: Optional[str] = None
+        self._snapshot_every = 0
+        self._snapshot_lock = threading.Lock()
+
+    def _reset_state(self) -> None:
+        """
+        Empty carts, orders and discount state (the catalog is kept).
+        """
+        # user carts stored in-memory, LRU order, with last-touch times
+        self.carts: "OrderedDict[str, Dict[int, int]]" = OrderedDict()
+        self._cart_seen: Dict[str, float] = {}
+        self._cart_version: Dict[str, int] = {}  # bumped on every cart change
+        self._cart_totals: Dict[str, CartTotals] = {}
+        # product id -> users whose cart holds it (sets are kept once made)
+        self._carts_by_product: Dict[int, Set[str]] = {}
         # orders placed in-memory
-        self.orders: List[Order] = []
+        self.orders = OrderLedger()
         # Discount state
         self.discount_codes: List[DiscountCode] = []
+        self.campaign_codes: List[DiscountCode] = []  # kept apart: can be millions
+        self._codes_by_code: Dict[str, DiscountCode] = {}  # code -> latest instance
         self.active_code: Optional[str] = None  # currently-available single-use code
+        self._campaign_redeemed = 0
+        # Running aggregates (cents) maintained by place_order so stats() is O(1)
+        self._items_purchased = 0
+        self._gross = 0
+        self._discount_total = 0
+        self._net = 0
+        # Per-minute/hour/day buckets of the same figures for windowed stats
+        self.rollup = SalesRollup()
+
+    def _cart_lock(self, user_id: str) -> threading.RLock:
+        """
+        Return the stripe lock guarding the given user's cart.
+        """
+        return self._cart_locks[hash(user_id) % len(self._cart_locks)]
+
+    @contextmanager
+    def hold_uncontended(self, user_id: str, orders: bool = False):
+        """
+        Hold the user's cart stripe, and with `orders` the global lock, if
+        neither is held elsewhere; yields whether they are held. While they
+        are, this thread's cart, quote and (with `orders`) checkout calls
+        for the user never wait: they only take those locks again. Never
+        held with a WAL, or for orders with the order sequencer, which
+        those calls would still wait for.
+        """
+        if self.may_block or (orders and self._sequencer is not None):
+            yield False
+            return
+        stripe = self._cart_lock(user_id)
+        if not stripe.acquire(blocking=False):
+            yield False
+            return
+        try:
+            if not orders:
+                yield True
+            elif not self._lock.acquire(blocking=False):
+                yield False
+            else:
+                try:
+                    yield True
+                finally:
+                    self._lock.release()
+        finally:
+            stripe.release()
 
     # Cart helpers -----
 
@@ -137,104 +455,543 @@ class InMemoryStore:
         if quantity <= 0:
             raise ValueError("Quantity must be positive")
 
-        cart = self.get_cart(user_id)
-        qty = cart.get(product_id, 0) + quantity
-        cart[product_id] = qty
+        with self._cart_lock(user_id):
+            current = self._quantity(user_id, product_id)
+            self._set_line(user_id, product_id, current + quantity)
+            self._log({"op": "add", "u": user_id, "p": product_id, "q": quantity})
+        self._evict_carts()
 
     def clear_cart(self, user_id: str) -> None:
         """
         Remove all items in the user's cart.
         """
-        self.carts[user_id] = {}
+        with self._cart_lock(user_id):
+            self._drop_cart(user_id)
+            self._log({"op": "clear", "u": user_id})
 
     def get_cart(self, user_id: str) -> Dict[int, int]:
         """
-        Return the user's cart dict (creating it if absent).
+        Return the user's cart dict, or a new empty dict (not stored) if
+        the user has none. Treat the result as read-only.
+        """
+        return self.carts.get(user_id) or {}
+
+    def cart_snapshot(self, user_id: str) -> Dict[int, int]:
+        """
+        Return a point-in-time copy of the user's cart, safe to iterate
+        while other threads mutate it.
         """
-        return self.carts.setdefault(user_id, {})
+        with self._cart_lock(user_id):
+            cart = self.carts.get(user_id)
+            if cart is None:
+                return {}
+            self._touch_cart(user_id)
+            return dict(cart)
+
+    def priced_cart(self, user_id: str) -> Tuple[List[Tuple[int, int]], int]:
+        """
+        The user's cart lines, as (product_id, quantity) pairs for products
+        in the catalog, and their subtotal in cents. Served from the kept
+        totals: the cart is only repriced if the catalog has changed.
+        """
+        with self._cart_lock(user_id):
+            cart = self.carts.get(user_id)
+            if cart is None:
+                return [], 0
+            self._touch_cart(user_id)
+            totals = self._current_totals(user_id, cart)
+            lines = totals.lines
+            items = [(pid, qty) for pid, qty in cart.items() if pid in lines]
+            return items, totals.subtotal_cents
 
     def remove_cart_item(self, user_id: str, product_id: int) -> None:
         """
         Remove a product from the user's cart (no error if absent).
         """
-        self.get_cart(user_id).pop(product_id, None)
+        with self._cart_lock(user_id):
+            self._set_line(user_id, product_id, 0)
+            self._log({"op": "remove", "u": user_id, "p": product_id})
 
     def set_cart_item(self, user_id: str, product_id: int, quantity: int) -> None:
         """
         Set a product's quantity exactly. If quantity <= 0, remove the item.
         """
-        cart = self.get_cart(user_id)
+        if quantity > 0 and product_id not in self.products:
+            raise ValueError("Unknown product_id")
+
+        with self._cart_lock(user_id):
+            self._set_line(user_id, product_id, quantity)
+            self._log({"op": "set", "u": user_id, "p": product_id, "q": quantity})
+        self._evict_carts()
+
+    def apply_cart_ops(
+        self, user_id: str, ops: List[Tuple[str, int, int]]
+    ) -> Dict[int, int]:
+        """
+        Apply (op, product_id, quantity) cart operations all-or-nothing
+        under a single hold of the user's stripe, and return a copy of
+        the resulting cart. Ops are "add" (quantity > 0), "set" (quantity
+        <= 0 removes) and "remove" (quantity ignored). Every op is
+        validated before any is applied; a ValueError names the first bad
+        op by index.
+        """
+        for i, (op, product_id, quantity) in enumerate(ops):
+            if op not in ("add", "set", "remove"):
+                raise ValueError(f"ops[{i}]: unknown op {op!r}")
+            if op == "add" and quantity <= 0:
+                raise ValueError(f"ops[{i}]: Quantity must be positive")
+            if op != "remove" and quantity > 0 and product_id not in self.products:
+                raise ValueError(f"ops[{i}]: Unknown product_id")
+
+        with self._cart_lock(user_id):
+            self._apply_cart_ops(user_id, ops)
+            self._log({"op": "batch", "u": user_id, "ops": [list(o) for o in ops]})
+            cart = dict(self.carts.get(user_id) or {})
+        self._evict_carts()
+        return cart
+
+    def _apply_cart_ops(self, user_id: str, ops) -> None:
+        for op, product_id, quantity in ops:
+            if op == "add":
+                quantity += self._quantity(user_id, product_id)
+            elif op == "remove":
+                quantity = 0
+            self._set_line(user_id, product_id, quantity)
+
+    # Cart bookkeeping (callers hold the user's stripe) -----
+
+    def _quantity(self, user_id: str, product_id: int) -> int:
+        cart = self.carts.get(user_id)
+        return cart.get(product_id, 0) if cart else 0
+
+    def _set_line(self, user_id: str, product_id: int, quantity: int) -> None:
+        """
+        Set one line of the user's cart (quantity <= 0 removes it) and
+        reprice just that line in the cart's totals.
+        """
+        if quantity > 0:
+            cart = self._writable_cart(user_id)
+            if product_id not in cart:
+                # Indexed before the price is read (see set_price)
+                self._carts_by_product.setdefault(product_id, set()).add(user_id)
+            cart[product_id] = quantity
+        else:
+            cart = self.carts.get(user_id)
+            if cart is None:
+                return
+            if cart.pop(product_id, None) is not None:
+                self._carts_by_product[product_id].discard(user_id)
+        self._check_catalog()
+        totals = self._cart_totals.get(user_id)
+        if totals is not None:
+            if totals.epoch != self._totals_epoch:
+                del self._cart_totals[user_id]  # repriced in full when read
+            else:
+                totals.set(product_id, self.products.get(product_id), quantity)
         if quantity <= 0:
-            cart.pop(product_id, None)
+            self._settle_cart(user_id, cart)
+
+    def _check_catalog(self) -> None:
+        """
+        Start a new totals epoch if the catalog was changed other than by
+        set_price, which reprices the affected carts itself.
+        """
+        version = self.products.version
+        if version != self._catalog_version and not self._repricing:
+            self._catalog_version = version
+            self._totals_epoch += 1
+
+    def _price_totals(self, cart: Dict[int, int]) -> CartTotals:
+        """
+        Price every line of the cart at current catalog prices.
+        """
+        # Checked before pricing: a catalog change from here on is noticed
+        self._check_catalog()
+        totals = CartTotals(self._totals_epoch)
+        for pid, qty in cart.items():
+            totals.set(pid, self.products.get(pid), qty)
+        return totals
+
+    def _current_totals(self, user_id: str, cart: Dict[int, int]) -> CartTotals:
+        """
+        The cart's kept totals, repriced first if they are stale or a price
+        change is still being applied to one of its products (and checked,
+        with verify_cart_totals).
+        """
+        self._check_catalog()
+        totals = self._cart_totals.get(user_id)
+        if (
+            totals is None
+            or totals.epoch != self._totals_epoch
+            or (self._repricing and not self._repricing.keys().isdisjoint(cart))
+        ):
+            totals = self._cart_totals[user_id] = self._price_totals(cart)
+        elif self.verify_cart_totals:
+            expected = self._price_totals(cart)
+            if expected.epoch == totals.epoch and (
+                expected.lines != totals.lines
+                or expected.subtotal_cents != totals.subtotal_cents
+            ):
+                raise AssertionError(
+                    f"Kept totals of cart {user_id!r} differ from a reprice: "
+                    f"{totals.subtotal_cents} != {expected.subtotal_cents}"
+                )
+        return totals
+
+    def _writable_cart(self, user_id: str) -> Dict[int, int]:
+        """
+        Return the user's stored cart, creating it, and mark it used.
+        """
+        cart = self.carts.get(user_id)
+        if cart is None:
+            cart = self.carts[user_id] = {}
+            self._cart_totals[user_id] = CartTotals(self._totals_epoch)
+        self._touch_cart(user_id)
+        self._cart_version[user_id] = next(_cart_versions)
+        return cart
+
+    def _touch_cart(self, user_id: str) -> None:
+        self._cart_seen[user_id] = self._clock()
+        self.carts.move_to_end(user_id)
+
+    def _settle_cart(self, user_id: str, cart: Dict[int, int]) -> None:
+        """
+        Drop the cart once it is empty; otherwise mark it used.
+        """
+        if cart:
+            self._touch_cart(user_id)
+            self._cart_version[user_id] = next(_cart_versions)
+        else:
+            self._drop_cart(user_id)
+
+    def _drop_cart(self, user_id: str) -> None:
+        for pid in self.carts.pop(user_id, None) or ():
+            self._carts_by_product[pid].discard(user_id)
+        self._cart_seen.pop(user_id, None)
+        self._cart_version.pop(user_id, None)
+        self._cart_totals.pop(user_id, None)
+
+    def _evict_carts(self) -> None:
+        """
+        Evict up to CART_EVICT_BATCH carts from the LRU end that are idle
+        past cart_ttl or beyond max_carts. Called after cart writes;
+        skipped if another thread is already sweeping, and stopped at a cart
+        whose stripe is busy, so a cart write never waits for another's.
+        """
+        if not (self.cart_ttl or self.max_carts):
             return
+        if not self._evict_lock.acquire(blocking=False):
+            return
+        try:
+            for _ in range(CART_EVICT_BATCH):
+                try:
+                    user_id = next(iter(self.carts))
+                except (StopIteration, RuntimeError):
+                    return
+                stripe = self._cart_lock(user_id)
+                if not stripe.acquire(blocking=False):
+                    return
+                try:
+                    # Re-check under the stripe: the cart may have been used
+                    if not self.carts or next(iter(self.carts)) != user_id:
+                        continue
+                    idle = self._clock() - self._cart_seen.get(user_id, 0)
+                    if self.cart_ttl and idle > self.cart_ttl:
+                        self._evicted_idle += 1
+                    elif self.max_carts and len(self.carts) > self.max_carts:
+                        self._evicted_lru += 1
+                    else:
+                        return
+                    self._drop_cart(user_id)
+                    self._log({"op": "clear", "u": user_id})
+                finally:
+                    stripe.release()
+        finally:
+            self._evict_lock.release()
+
+    def cart_stats(self) -> Dict[str, int]:
+        """
+        Live cart count and eviction counters, for monitoring.
+        """
+        return {
+            "active": len(self.carts),
+            "evicted_idle": self._evicted_idle,
+            "evicted_lru": self._evicted_lru,
+        }
+
+    def gauges(self) -> Dict[str, int]:
+        """
+        Current sizes of the store's collections, for monitoring.
+        """
+        return {
+            "carts": len(self.carts),
+            "orders": len(self.orders),
+            "discount_codes": len(self.discount_codes) + len(self.campaign_codes),
+            "discount_code_pool": len(self._code_pool),
+            "products": len(self.products),
+        }
 
+    # Pricing -----
+
+    def catalog(self) -> ProductCatalog:
+        """
+        The product catalog, for reads outside the store API (listings,
+        search). Prices changed through `set_price`, by any worker, are
+        already applied.
+        """
+        return self.products
+
+    def set_price(
+        self, product_id: int, price_cents: int, background: bool = True
+    ) -> int:
+        """
+        Change a product's price and return how many carts hold it.
+
+        Only those carts' kept totals are repriced, one line each, holding
+        each cart stripe once per REPRICE_BATCH carts: on a background
+        thread unless `background` is False. Until then a read of one of
+        them reprices it in full. Quotes of carts holding the product stop
+        being honoured at checkout.
+        """
+        if price_cents < 0:
+            raise ValueError("Price must not be negative")
         if product_id not in self.products:
             raise ValueError("Unknown product_id")
 
-        cart[product_id] = quantity
+        with self._reprice_lock:
+            users = self._change_price(product_id, price_cents)
+            self._log({"op": "price", "p": product_id, "c": price_cents})
+        if background:
+            threading.Thread(
+                target=self._reprice_carts,
+                args=(product_id, users),
+                name="cart-reprice",
+                daemon=True,
+            ).start()
+        else:
+            self._reprice_carts(product_id, users)
+        return len(users)
+
+    def _change_price(self, product_id: int, price_cents: int) -> List[str]:
+        """
+        Set the catalog price and return the users whose carts hold the
+        product, which must then be passed to _reprice_carts.
+        Caller must hold the reprice lock.
+        """
+        # A direct catalog change not yet noticed starts its epoch first
+        self._check_catalog()
+        # Marked first, so no read trusts these carts' totals meanwhile
+        self._repricing[product_id] = self._repricing.get(product_id, 0) + 1
+        seen = self._catalog_version == self.products.version
+        self.products.set_price(product_id, price_cents)
+        if seen:  # else still unnoticed, once no reprice is in progress
+            self._catalog_version = self.products.version
+        self._price_overrides[product_id] = price_cents
+        # Taken after the change: a cart indexed later reads the new price
+        return list(self._carts_by_product.get(product_id, ()))
+
+    def _reprice_carts(self, product_id: int, users: List[str]) -> None:
+        """
+        Reprice `product_id`'s line in the kept totals of `users`' carts,
+        grouped by cart stripe, then clear its in-progress mark.
+        """
+        try:
+            by_stripe: Dict[int, List[str]] = {}
+            for user_id in users:
+                stripe = hash(user_id) % len(self._cart_locks)
+                by_stripe.setdefault(stripe, []).append(user_id)
+            product = self.products.get(product_id)
+            for stripe, group in by_stripe.items():
+                for i in range(0, len(group), REPRICE_BATCH):
+                    with self._cart_locks[stripe]:
+                        for user_id in group[i : i + REPRICE_BATCH]:
+                            self._reprice_line(user_id, product_id, product)
+        finally:
+            with self._reprice_lock:
+                pending = self._repricing.pop(product_id) - 1
+                if pending:
+                    self._repricing[product_id] = pending
+
+    def _reprice_line(
+        self, user_id: str, product_id: int, product: Optional[Product]
+    ) -> None:
+        totals = self._cart_totals.get(user_id)
+        if totals is not None and totals.epoch == self._totals_epoch:
+            totals.set(product_id, product, self._quantity(user_id, product_id))
 
     # Order creation/Checkout Helpers -----
 
-    def place_order(self, user_id: str, discount_code: Optional[str] = None) -> Order:
+    def quote(self, user_id: str, discount_code: Optional[str] = None) -> Quote:
         """
-        Convert the current cart into an Order and clear the cart.
-        Applies discount if a valid code is provided.
+        Price the user's cart, and the discount `discount_code` would give
+        if the order were placed now, without placing it. Pass the result
+        to `place_order` to skip repricing the cart.
         """
-        cart = self.get_cart(user_id)
-        if not cart:
-            raise ValueError("Cart is empty")
+        with self._cart_lock(user_id):
+            cart = self.carts.get(user_id)
+            if not cart:
+                raise ValueError("Cart is empty")
+            # Read before pricing: a price change from here on bumps it
+            catalog_version = self.products.version
+            items, subtotal = self._price_cart(cart)
+            cart_version = self._cart_version.get(user_id, 0)
 
+        discount = 0
+        with self._lock:
+            dc = self._valid_code(discount_code)
+            if dc is not None:
+                discount = percent_of(subtotal, dc.discount_pct)
+        return Quote(
+            user_id=user_id,
+            items=items,
+            subtotal_cents=subtotal,
+            discount_cents=discount,
+            discount_code=dc.code if dc is not None else None,
+            cart_version=cart_version,
+            catalog_version=catalog_version,
+        )
+
+    def _price_cart(self, cart: Dict[int, int]) -> Tuple[List[OrderItem], int]:
+        """
+        The cart's order lines at current prices and their subtotal (cents).
+        Products no longer in the catalog are skipped.
+        """
+        # All money math is in integer cents (exact for 2dp prices)
         items: List[OrderItem] = []
-        subtotal = D("0.00")
+        subtotal = 0
         for pid, qty in cart.items():
             product = self.products.get(pid)
             if not product:
                 continue
-            line_total = money(product.price * D(qty))
+            line_total = product.price_cents * qty
             items.append(
                 OrderItem(
                     product_id=pid,
                     name=product.name,
-                    price=product.price,
+                    price_cents=product.price_cents,
                     quantity=qty,
-                    line_total=line_total,
+                    line_total_cents=line_total,
                 )
             )
             subtotal += line_total
-        subtotal = money(subtotal)
+        return items, subtotal
+
+    def place_order(
+        self,
+        user_id: str,
+        discount_code: Optional[str] = None,
+        quote: Optional[Quote] = None,
+    ) -> Order:
+        """
+        Convert the current cart into an Order and clear the cart.
+        Applies discount if a valid code is provided.
+
+        The user's cart stripe is held for the whole call. The cart is priced
+        under the stripe only; order numbering and discount consumption then
+        happen atomically under the global lock, or on the order sequencer's
+        writer thread when one is enabled. A `quote` of this user's cart is
+        used instead of repricing if neither the cart nor any of its
+        products has changed since it was made; the discount is always
+        checked again.
+        """
+        with self._cart_lock(user_id):
+            cart = self.carts.get(user_id)
+            if not cart:
+                raise ValueError("Cart is empty")
 
-        discount = D("0.00")
-        applied_code = None
-        if discount_code and self.validate_discount(discount_code):
-            applied_code = discount_code
-            pct = D(self._find_code(discount_code).discount_pct)
-            discount = money(subtotal * (pct / D(100)))
+            if (
+                quote is not None
+                and quote.user_id == user_id
+                and quote.cart_version == self._cart_version.get(user_id, 0)
+                and not self.products.changed_since(quote.catalog_version, cart)
+            ):
+                items, subtotal = quote.items, quote.subtotal_cents
+            else:
+                items, subtotal = self._price_cart(cart)
+
+            draft = OrderDraft(user_id, items, subtotal, discount_code)
+            if self._sequencer is not None:
+                order = self._sequencer.submit(draft)
+            else:
+                with self._lock:
+                    self._commit_orders([draft])
+                if draft.error is not None:
+                    raise draft.error
+                order = draft.order
+
+            self._drop_cart(user_id)
+
+        return order
+
+    def _commit_orders(self, drafts: List[OrderDraft]) -> None:
+        """
+        Number, discount, append and log priced carts in turn, setting each
+        draft's `order` or `error`. The drafts share one timestamp, so the
+        running totals and rollups are updated once for all of them.
+        Caller must hold the global lock.
+        """
+        now = timezone.now()
+        placed = []
+        for draft in drafts:
+            try:
+                draft.order = self._commit_order(draft, now)
+            except ValueError as e:
+                draft.error = e
+            else:
+                placed.append(draft.order)
+        if placed:
+            self._tally(placed, _to_us(now))
+        for order in placed:
+            self._log(self._order_record(order))
+
+    def _commit_order(self, draft: OrderDraft, now: datetime) -> Order:
+        """
+        Number, discount and append one priced cart (see _commit_orders).
+        """
+        discount = 0
+        dc = self._valid_code(draft.discount_code)
+        if dc is not None:
+            discount = percent_of(draft.subtotal_cents, dc.discount_pct)
 
-        total = money(subtotal - discount)
+        total = draft.subtotal_cents - discount
 
         order = Order(
             id=len(self.orders) + 1,
-            user_id=user_id,
-            items=items,
-            subtotal=subtotal,
-            discount=discount,
-            total=total,
-            created_at=timezone.now(),
-            discount_code=applied_code,
+            user_id=draft.user_id,
+            items=draft.items,
+            subtotal_cents=draft.subtotal_cents,
+            discount_cents=discount,
+            total_cents=total,
+            created_at=now,
+            discount_code=dc.code if dc is not None else None,
         )
-        self.orders.append(order)
-        self.clear_cart(user_id)
+        try:
+            self.orders.append(order)
+        except OverflowError:
+            raise ValueError("Order amount out of range")
 
         # Mark discount as consumed
-        if applied_code:
-            dc = self._find_code(applied_code)
-            dc.used = True
-            dc.redeemed_order_id = order.id
-            self.active_code = None  # consume current active code
-
+        if dc is not None:
+            self._redeem_code(dc, order.id)
         return order
 
     # Order index helpers -----
+    def get_order(self, order_id: int) -> Optional[Order]:
+        """
+        The order with this id, or None.
+        """
+        with self._lock:
+            return self.orders.by_id(order_id)
+
+    def user_orders(
+        self, user_id: str, before: Optional[int] = None, limit: int = 20
+    ) -> List[Order]:
+        """
+        The user's orders placed before order id `before`, newest first.
+        """
+        with self._lock:
+            return self.orders.for_user(user_id, before, limit)
+
     def next_order_number(self) -> int:
         """
         The order number that will be assigned to the next order placed.
@@ -256,87 +1013,576 @@ class InMemoryStore:
         """
         return self.active_code is not None
 
-    def _random_code(self, length: int = 8) -> str:
-        """
-        Generate an 8-char A-Z0-9 code.
-        """
-        alphabet = string.ascii_uppercase + string.digits
-        return "".join(secrets.choice(alphabet) for _ in range(length))
-
     def generate_code(self) -> DiscountCode:
         """
         Generate a discount code (single-use) when eligible and no active code exists.
         Side-effect: sets self.active_code.
+
+        Raises ValueError if another caller activated a code first.
         """
-        code = self._random_code()
-        dc = DiscountCode(
-            code=code, created_at=timezone.now(), discount_pct=settings.DISCOUNT_PERCENT
-        )
-        self.discount_codes.append(dc)
-        self.active_code = code
-        return dc
+        with self._lock:
+            if self.active_code is not None:
+                raise ValueError("An active discount code already exists.")
+            (code,) = self._unique_codes(self._code_pool.take(1))
+            dc = DiscountCode(
+                code=code,
+                created_at=timezone.now(),
+                discount_pct=settings.DISCOUNT_PERCENT,
+            )
+            self._register_code(dc)
+            self.active_code = code
+            self._log(
+                {
+                    "op": "code",
+                    "code": dc.code,
+                    "at": _to_us(dc.created_at),
+                    "pct": dc.discount_pct,
+                }
+            )
+            return dc
+
+    def issue_codes(
+        self, count: int, discount_pct: Optional[int] = None
+    ) -> List[DiscountCode]:
+        """
+        Issue `count` single-use campaign codes, redeemable on any order,
+        each distinct from every code issued before. Codes come from the
+        pre-generated pool and are built before taking the global lock,
+        which is held only to check and register them.
+        """
+        if count <= 0:
+            raise ValueError("Count must be positive")
+        if discount_pct is None:
+            discount_pct = settings.DISCOUNT_PERCENT
+        elif not 1 <= discount_pct <= 100:
+            raise ValueError("Discount percent must be between 1 and 100")
+
+        codes = self._code_pool.take(count)
+        now = timezone.now()
+        issued = _campaign_codes(codes, now, discount_pct)
+        with self._lock:
+            if any(code in self._codes_by_code for code in codes):
+                # Some were issued since they were pooled (rare): replace them
+                codes = self._unique_codes(codes)
+                issued = _campaign_codes(codes, now, discount_pct)
+            self._register_campaign(issued)
+            self._log(
+                {"op": "codes", "codes": codes, "at": _to_us(now), "pct": discount_pct}
+            )
+        return issued
+
+    def _unique_codes(self, codes: List[str]) -> List[str]:
+        """
+        `codes` without those issued since they were pooled, topped up from
+        the pool. Caller must hold the global lock.
+        """
+        fresh = [code for code in codes if code not in self._codes_by_code]
+        while len(fresh) < len(codes):
+            seen = set(fresh)
+            for code in self._code_pool.take(len(codes) - len(fresh)):
+                if code not in self._codes_by_code and code not in seen:
+                    fresh.append(code)
+                    seen.add(code)
+        return fresh
+
+    def _register_code(self, dc: DiscountCode) -> None:
+        """
+        Record a code in the issue log and the code index.
+        Caller must hold the global lock.
+        """
+        if dc.campaign:
+            self.campaign_codes.append(dc)
+            self._campaign_redeemed += dc.used
+        else:
+            self.discount_codes.append(dc)
+        self._codes_by_code[dc.code] = dc
+
+    def _register_campaign(self, issued: List[DiscountCode]) -> None:
+        """
+        `_register_code` for a batch of new, unused campaign codes.
+        Caller must hold the global lock.
+        """
+        self.campaign_codes.extend(issued)
+        self._codes_by_code.update((dc.code, dc) for dc in issued)
+
+    def _redeem_code(self, dc: DiscountCode, order_id: int) -> None:
+        """
+        Mark a code used by an order (the indexed instance is mutated in
+        place, so the code index stays current). Caller must hold the
+        global lock.
+        """
+        dc.used = True
+        dc.redeemed_order_id = order_id
+        if dc.campaign:
+            self._campaign_redeemed += 1
+        elif dc.code == self.active_code:
+            self.active_code = None  # consume current active code
 
     def _find_code(self, code: str) -> DiscountCode:
         """
-        Find the most recent instance of a code or raise.
+        Find the most recent instance of a code or raise. O(1) via the index.
+        """
+        dc = self._codes_by_code.get(code)
+        if dc is None:
+            raise ValueError("Code not found")
+        return dc
+
+    def _valid_code(self, code: Optional[str]) -> Optional[DiscountCode]:
+        """
+        Return the DiscountCode if it is currently redeemable, else None.
+        Caller must hold the global lock.
         """
-        for dc in reversed(self.discount_codes):
-            if dc.code == code:
-                return dc
-        raise ValueError("Code not found")
+        dc = self._codes_by_code.get(code) if code else None
+        if dc is None or dc.used:
+            return None
+        if not dc.campaign and (code != self.active_code or not self.eligible_now()):
+            return None
+        return dc
 
     def validate_discount(self, code: Optional[str]) -> bool:
         """
-        A code is valid iff:
-        - matches the current active_code,
-        - the next order is eligible (nth), and
-        - the code hasn't been used yet.
+        A code is valid iff it hasn't been used yet and either:
+        - it is a campaign code, or
+        - it matches the current active_code and the next order is
+          eligible (nth).
         """
-        if not code:
-            return False
+        with self._lock:
+            return self._valid_code(code) is not None
 
-        if code != self.active_code:
-            return False
+    # Admin stats -----
+    def _recompute_totals(self) -> Dict[str, object]:
+        """
+        Recompute the purchase aggregates by scanning every order.
+        """
+        return {
+            "items_purchased": sum(oi.quantity for o in self.orders for oi in o.items),
+            "gross_amount": from_cents(sum(o.subtotal_cents for o in self.orders)),
+            "total_discount_amount": from_cents(
+                sum(o.discount_cents for o in self.orders)
+            ),
+            "net_amount": from_cents(sum(o.total_cents for o in self.orders)),
+        }
 
-        if not self.eligible_now():
-            return False
+    def _tally(self, orders: List[Order], at_us: int) -> None:
+        """
+        Add newly appended orders, all placed at `at_us`, to the running
+        aggregates and rollups.
+        """
+        items = sum(oi.quantity for order in orders for oi in order.items)
+        gross = sum(order.subtotal_cents for order in orders)
+        discount = sum(order.discount_cents for order in orders)
+        net = sum(order.total_cents for order in orders)
+        self._items_purchased += items
+        self._gross += gross
+        self._discount_total += discount
+        self._net += net
+        self.rollup.add(at_us, items, gross, discount, net, orders=len(orders))
 
-        try:
-            dc = self._find_code(code)
-        except ValueError:
-            return False
+    def _running_totals(self) -> Dict[str, object]:
+        """
+        The incrementally maintained purchase aggregates.
+        """
+        return {
+            "items_purchased": self._items_purchased,
+            "gross_amount": from_cents(self._gross),
+            "total_discount_amount": from_cents(self._discount_total),
+            "net_amount": from_cents(self._net),
+        }
 
-        return not dc.used
+    def stats_consistent(self) -> bool:
+        """
+        True if the running aggregates match a full recomputation.
+        Intended for tests and ad-hoc audits; cost is O(orders).
+        """
+        with self._lock:
+            return self._running_totals() == self._recompute_totals()
 
-    # Admin stats -----
     def stats(self) -> Dict[str, object]:
         """
-        Aggregate purchase stats and list discount codes.
+        Aggregate purchase stats and list the Nth-order discount codes
+        (campaign codes are only counted).
+        Totals come from running counters, so cost is independent of orders.
+        """
+        with self._lock:
+            return {
+                **self._running_totals(),
+                "carts": self.cart_stats(),
+                "discount_codes": [
+                    {
+                        "code": dc.code,
+                        "used": dc.used,
+                        "discount_pct": dc.discount_pct,
+                        "redeemed_order_id": dc.redeemed_order_id,
+                        "created_at": _isoz(dc.created_at),
+                    }
+                    for dc in self.discount_codes
+                ],
+                "campaign_codes": {
+                    "issued": len(self.campaign_codes),
+                    "redeemed": self._campaign_redeemed,
+                },
+            }
+
+    def sales_window(
+        self, start: datetime, end: datetime, granularity: Optional[str] = None
+    ) -> Dict[str, object]:
+        """
+        Purchase totals for [start, end) summed from rollup buckets, plus
+        the per-bucket series. The range ends at most one bucket after now
+        and is widened to whole buckets; with no granularity the finest
+        one still covering `start` is used.
+        Raises ValueError for an invalid range or granularity.
+        """
+        with self._lock:
+            granularity, start_us, end_us, buckets = self.rollup.query(
+                _to_us(start), _to_us(end), _to_us(timezone.now()), granularity
+            )
+
+        def figures(orders, items, gross, discount, net):
+            return {
+                "order_count": orders,
+                "items_purchased": items,
+                "gross_amount": from_cents(gross),
+                "total_discount_amount": from_cents(discount),
+                "net_amount": from_cents(net),
+            }
+
+        totals = [sum(values) for values in zip(*(v for _, v in buckets))]
+        return {
+            "start": _isoz(_from_us(start_us)),
+            "end": _isoz(_from_us(end_us)),
+            "granularity": granularity,
+            **figures(*(totals or [0] * 5)),
+            "buckets": [
+                {"start": _isoz(_from_us(at)), **figures(*values)}
+                for at, values in buckets
+            ],
+        }
+
+    # Durability -----
+    @classmethod
+    def open(
+        cls,
+        data_dir: str,
+        fsync_batch: int = 64,
+        fsync_interval: float = 0.05,
+        snapshot_every: int = 100_000,
+        **kwargs,
+    ) -> "InMemoryStore":
+        """
+        Build a durable store backed by data_dir.
+
+        Recovery loads the latest snapshot, replays the WAL tail after it,
+        then starts a fresh log segment. Every later mutation is appended to
+        the WAL (group-committed per fsync_batch / fsync_interval) and a
+        snapshot is taken in the background every snapshot_every records.
         """
-        items_count = sum(oi.quantity for o in self.orders for oi in o.items)
-        gross = sum(o.subtotal for o in self.orders) if self.orders else D("0.00")
-        total_discount = (
-            sum(o.discount for o in self.orders) if self.orders else D("0.00")
+        os.makedirs(data_dir, exist_ok=True)
+        store = cls(**kwargs)
+        start = store._load_snapshot(data_dir)
+        for record in WriteAheadLog.replay(data_dir, start):
+            store._apply(record)
+
+        segment = max(list_segments(data_dir), default=start - 1) + 1
+        store._data_dir = data_dir
+        store._snapshot_every = snapshot_every
+        store._wal = WriteAheadLog(
+            data_dir,
+            segment=max(segment, start),
+            fsync_batch=fsync_batch,
+            fsync_interval=fsync_interval,
         )
-        net = sum(o.total for o in self.orders) if self.orders else D("0.00")
+        return store
+
+    @property
+    def may_block(self) -> bool:
+        """
+        True if operations can wait on I/O (a WAL group-commit fsync), so
+        async callers must not run them on the event loop. The order
+        sequencer does not count: only checkouts wait for its writer, and
+        catalog reads never do.
+        """
+        return self._wal is not None
 
+    def close(self) -> None:
+        """
+        Flush and close the WAL (no-op for a non-durable store).
+        """
+        if self._wal is not None:
+            self._wal.close()
+
+    def _log(self, record: Dict[str, object]) -> None:
+        """
+        Append a mutation to the WAL. Callers hold the lock(s) that ordered
+        the mutation, so per-user and per-order ordering is preserved.
+        """
+        if self._wal is None:
+            return
+        self._wal.append(record)
+        if (
+            self._snapshot_every
+            and self._wal.records_since_rotation >= self._snapshot_every
+            and not self._snapshot_lock.locked()
+        ):
+            threading.Thread(
+                target=self._background_snapshot, name="store-snapshot", daemon=True
+            ).start()
+
+    @staticmethod
+    def _order_record(order: Order) -> Dict[str, object]:
         return {
-            "items_purchased": items_count,
-            "gross_amount": money(gross),
-            "total_discount_amount": money(total_discount),
-            "net_amount": money(net),
-            "discount_codes": [
-                {
-                    "code": dc.code,
-                    "used": dc.used,
-                    "discount_pct": dc.discount_pct,
-                    "redeemed_order_id": dc.redeemed_order_id,
-                    "created_at": _isoz(dc.created_at),
-                }
-                for dc in self.discount_codes
+            "op": "order",
+            "id": order.id,
+            "u": order.user_id,
+            "items": [
+                [oi.product_id, oi.name, str(oi.price), oi.quantity, str(oi.line_total)]
+                for oi in order.items
             ],
+            "sub": str(order.subtotal),
+            "disc": str(order.discount),
+            "tot": str(order.total),
+            "at": _to_us(order.created_at),
+            "code": order.discount_code,
         }
 
+    def _apply(self, record: Dict[str, object]) -> None:
+        """
+        Re-apply one WAL record during recovery (no validation, no logging).
+        """
+        op = record["op"]
+        if op == "add":
+            current = self._quantity(record["u"], record["p"])
+            self._set_line(record["u"], record["p"], current + record["q"])
+        elif op == "set":
+            self._set_line(record["u"], record["p"], record["q"])
+        elif op == "remove":
+            self._set_line(record["u"], record["p"], 0)
+        elif op == "clear":
+            self._drop_cart(record["u"])
+        elif op == "price":
+            self._restore_price(record["p"], record["c"])
+        elif op == "batch":
+            self._apply_cart_ops(record["u"], record["ops"])
+        elif op == "code":
+            self._register_code(
+                DiscountCode(
+                    code=record["code"],
+                    created_at=_from_us(record["at"]),
+                    discount_pct=record["pct"],
+                )
+            )
+            self.active_code = record["code"]
+        elif op == "codes":
+            self._register_campaign(
+                _campaign_codes(record["codes"], _from_us(record["at"]), record["pct"])
+            )
+        elif op == "order":
+            items = [
+                OrderItem(
+                    product_id=pid,
+                    name=name,
+                    price_cents=to_cents(price),
+                    quantity=qty,
+                    line_total_cents=to_cents(line_total),
+                )
+                for pid, name, price, qty, line_total in record["items"]
+            ]
+            order = Order(
+                id=record["id"],
+                user_id=record["u"],
+                items=items,
+                subtotal_cents=to_cents(record["sub"]),
+                discount_cents=to_cents(record["disc"]),
+                total_cents=to_cents(record["tot"]),
+                created_at=_from_us(record["at"]),
+                discount_code=record["code"],
+            )
+            self._restore_order(order)
+            self._drop_cart(order.user_id)
+            if order.discount_code:
+                dc = self._codes_by_code.get(order.discount_code)
+                if dc is not None:
+                    self._redeem_code(dc, order.id)
+        else:
+            raise ValueError(f"Unknown WAL record op: {op}")
+
+    def _restore_price(self, product_id: int, price_cents: int) -> None:
+        """
+        Re-apply a logged price change and reprice the carts holding it.
+        """
+        if product_id not in self.products:
+            return  # dropped from the catalog file since
+        with self._reprice_lock:
+            users = self._change_price(product_id, price_cents)
+        self._reprice_carts(product_id, users)
+
+    def _restore_order(self, order: Order) -> None:
+        self.orders.append(order)
+        self._tally([order], _to_us(order.created_at))
+
+    def _background_snapshot(self) -> None:
+        """
+        Periodic snapshot entry point; skips if one is already running.
+        """
+        if not self._snapshot_lock.acquire(blocking=False):
+            return
+        try:
+            self._snapshot_locked()
+        finally:
+            self._snapshot_lock.release()
+
+    def snapshot(self) -> None:
+        """
+        Write a compact snapshot and drop WAL segments it covers.
+
+        State is captured (and the WAL rotated) while briefly holding every
+        lock; encoding and writing happen after the locks are released.
+        """
+        if self._wal is None:
+            raise ValueError("Store is not durable")
+
+        with self._snapshot_lock:
+            self._snapshot_locked()
+
+    def _snapshot_locked(self) -> None:
+        with ExitStack() as stack:
+            for lock in self._cart_locks:
+                stack.enter_context(lock)
+            stack.enter_context(self._lock)
+            carts = {u: dict(c) for u, c in self.carts.items() if c}
+            columns, strings = self.orders.to_columns()
+            columns.update(self.rollup.to_columns())
+            codes = [
+                (
+                    dc.code,
+                    dc.created_at,
+                    dc.used,
+                    dc.redeemed_order_id,
+                    dc.discount_pct,
+                    dc.campaign,
+                )
+                for dc in itertools.chain(self.discount_codes, self.campaign_codes)
+            ]
+            active_code = self.active_code
+            prices = dict(self._price_overrides)
+            segment = self._wal.rotate()
+
+        for name in ("code_at", "code_redeemed", "code_pct"):
+            columns[name] = array("q")
+        for name in ("code_used", "code_campaign"):
+            columns[name] = array("b")
+        code_strs = []
+        for code, created_at, used, redeemed, pct, campaign in codes:
+            code_strs.append(code)
+            columns["code_at"].append(_to_us(created_at))
+            columns["code_used"].append(1 if used else 0)
+            columns["code_redeemed"].append(redeemed or 0)
+            columns["code_pct"].append(pct)
+            columns["code_campaign"].append(1 if campaign else 0)
+
+        write_snapshot(
+            self._data_dir,
+            meta={
+                "segment": segment,
+                "strings": {name: len(values) for name, values in strings.items()},
+                "codes": len(codes),
+                "active_code": active_code,
+                "prices": prices,
+            },
+            columns=columns,
+            blobs={
+                **{name: pack_strings(values) for name, values in strings.items()},
+                "code": pack_strings(code_strs),
+                "carts": json.dumps(carts).encode(),
+            },
+        )
+        WriteAheadLog.prune(self._data_dir, segment)
+
+    def _load_snapshot(self, data_dir: str) -> int:
+        """
+        Restore state from data_dir's snapshot, if any.
+        Returns the first WAL segment not covered by it.
+        """
+        loaded = read_snapshot(data_dir)
+        if loaded is None:
+            return 1
+        meta, col, blobs = loaded
+
+        # Order history loads as whole columns: no per-order Python work
+        self.orders.load_columns(
+            col,
+            {
+                name: unpack_strings(blobs[name], count)
+                for name, count in meta["strings"].items()
+            },
+        )
+        self._items_purchased = self.orders.column_sum("qty")
+        self._gross = self.orders.column_sum("subtotal")
+        self._discount_total = self.orders.column_sum("discount")
+        self._net = self.orders.column_sum("total")
+        if not self.rollup.load_columns(col):
+            # Snapshots written before the rollups were saved
+            for args in self.orders.rollup_rows():
+                self.rollup.add(*args)
+
+        # Snapshots written before campaign codes existed lack the column
+        campaign = col.get("code_campaign") or array("b", bytes(meta["codes"]))
+        for i, code in enumerate(unpack_strings(blobs["code"], meta["codes"])):
+            self._register_code(
+                DiscountCode(
+                    code=code,
+                    created_at=_from_us(col["code_at"][i]),
+                    used=bool(col["code_used"][i]),
+                    redeemed_order_id=col["code_redeemed"][i] or None,
+                    discount_pct=col["code_pct"][i],
+                    campaign=bool(campaign[i]),
+                )
+            )
+        self.active_code = meta["active_code"]
+        # Prices changed at runtime, before carts so they are priced at them
+        for pid, price_cents in meta.get("prices", {}).items():
+            self._restore_price(int(pid), price_cents)
+        # Restored carts count as used now (idle time is not persisted)
+        for u, c in json.loads(blobs["carts"]).items():
+            for p, q in c.items():
+                self._set_line(u, int(p), q)
+        return meta["segment"]
+
+
+def _build_default_store() -> InMemoryStore:
+    """
+    Build the store selected by settings.STORE_BACKEND, with the catalog
+    from settings.STORE_CATALOG_PATH when one is configured.
+    """
+    options = {
+        "catalog": None,
+        "cart_ttl": settings.STORE_CART_TTL,
+        "max_carts": settings.STORE_MAX_CARTS,
+        "order_sequencer": settings.STORE_ORDER_SEQUENCER,
+        "verify_cart_totals": settings.STORE_VERIFY_CART_TOTALS,
+        "code_pool_size": settings.DISCOUNT_CODE_POOL_SIZE,
+    }
+    if settings.STORE_CATALOG_PATH:
+        options["catalog"] = load_catalog(settings.STORE_CATALOG_PATH)
+
+    if settings.STORE_BACKEND == "shared":
+        from .backends import SharedMemoryStore
+
+        return SharedMemoryStore(
+            settings.STORE_SHM_NAME, capacity=settings.STORE_SHM_CAPACITY, **options
+        )
+    if settings.STORE_DATA_DIR:
+        return InMemoryStore.open(
+            settings.STORE_DATA_DIR,
+            fsync_batch=settings.STORE_WAL_FSYNC_BATCH,
+            fsync_interval=settings.STORE_WAL_FSYNC_INTERVAL,
+            snapshot_every=settings.STORE_SNAPSHOT_EVERY,
+            **options,
+        )
+    return InMemoryStore(**options)
+
 
-# Module-level singleton used by views. It keeps state for the process.
-db = InMemoryStore()
+# Module-level singleton used by views. It keeps state for the process,
+# on disk when STORE_DATA_DIR is configured, or across worker processes
+# with the shared-memory backend.
+db = _build_default_store()
@@ -0,0 +1,221 @@
+"""
+Columnar, append-only storage for order history.
+
+Orders are kept as parallel typed arrays instead of one Python object per
+order and item. Amounts are integer cents, timestamps are epoch
+microseconds, and repeated strings (user ids, discount codes, product
+name/price snapshots) are interned into small side tables. Rows are
+plain tuples; building ``Order`` objects is left to the store.
+"""
+
+# Standard library imports
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# (product_id, name, price_cents, quantity, line_total_cents)
+ItemRow = Tuple[int, str, int, int, int]
+
+# (id, user_id, created_at_us, subtotal_c, discount_c, total_c, code, items)
+OrderRow = Tuple[int, str, int, int, int, int, object, List[ItemRow]]
+
+# Column name -> array typecode, in snapshot order
+ORDER_COLUMNS = {
+    "id": "q",
+    "user": "i",
+    "at": "q",
+    "subtotal": "q",
+    "discount": "q",
+    "total": "q",
+    "code": "i",
+    "item_end": "q",
+}
+ITEM_COLUMNS = {"snap": "i", "qty": "q", "line": "q"}
+SNAP_COLUMNS = {"snap_pid": "q", "snap_price": "q"}
+
+
+class ColumnarLedger:
+    """
+    Append-only order table with items in parallel arrays.
+
+    Per order: id, interned user, created_at, subtotal/discount/total, an
+    optional interned code (-1 for none) and the end offset of its items.
+    Per item: a product-snapshot index, quantity and line total. A snapshot
+    is one distinct (product_id, name, price) seen at checkout time.
+
+    Order ids must be appended in increasing order; that keeps the id
+    column sorted for lookups, and each user's row list (a secondary
+    index kept alongside the interned user table) sorted too.
+    """
+
+    def __init__(self):
+        self._cols: Dict[str, array] = {
+            name: array(tc)
+            for name, tc in {**ORDER_COLUMNS, **ITEM_COLUMNS, **SNAP_COLUMNS}.items()
+        }
+        self._users: List[str] = []
+        self._user_index: Dict[str, int] = {}
+        self._user_rows: List[array] = []  # interned user -> row indices
+        self._codes: List[str] = []
+        self._code_index: Dict[str, int] = {}
+        self._snap_names: List[str] = []
+        self._snap_index: Dict[Tuple[int, str, int], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._cols["id"])
+
+    @staticmethod
+    def _intern(value: str, values: List[str], index: Dict[str, int]) -> int:
+        i = index.get(value)
+        if i is None:
+            i = index[value] = len(values)
+            values.append(value)
+        return i
+
+    def _snapshot_id(self, product_id: int, name: str, price_cents: int) -> int:
+        key = (product_id, name, price_cents)
+        i = self._snap_index.get(key)
+        if i is None:
+            i = self._snap_index[key] = len(self._snap_names)
+            self._snap_names.append(name)
+            self._cols["snap_pid"].append(product_id)
+            self._cols["snap_price"].append(price_cents)
+        return i
+
+    def append_row(self, row: OrderRow) -> None:
+        """
+        Append one order. Values are range-checked before any column is
+        touched, so a failing append leaves the ledger unchanged.
+        """
+        order_id, user_id, at_us, sub_c, disc_c, tot_c, code, items = row
+        numbers = [order_id, at_us, sub_c, disc_c, tot_c]
+        for pid, _, price_c, qty, line_c in items:
+            numbers.extend((pid, price_c, qty, line_c))
+        array("q", numbers)  # raises OverflowError before any column changes
+
+        c = self._cols
+        if c["id"] and order_id <= c["id"][-1]:
+            raise ValueError("Order ids must increase")
+        for pid, name, price_c, qty, line_c in items:
+            c["snap"].append(self._snapshot_id(pid, name, price_c))
+            c["qty"].append(qty)
+            c["line"].append(line_c)
+        c["item_end"].append(len(c["qty"]))
+        user = self._intern(user_id, self._users, self._user_index)
+        if user == len(self._user_rows):
+            self._user_rows.append(array("q"))
+        self._user_rows[user].append(len(c["id"]))
+        c["id"].append(order_id)
+        c["user"].append(user)
+        c["at"].append(at_us)
+        c["subtotal"].append(sub_c)
+        c["discount"].append(disc_c)
+        c["total"].append(tot_c)
+        c["code"].append(
+            self._intern(code, self._codes, self._code_index) if code else -1
+        )
+
+    def row(self, i: int) -> OrderRow:
+        c = self._cols
+        start = c["item_end"][i - 1] if i > 0 else 0
+        items = []
+        for j in range(start, c["item_end"][i]):
+            s = c["snap"][j]
+            items.append(
+                (
+                    c["snap_pid"][s],
+                    self._snap_names[s],
+                    c["snap_price"][s],
+                    c["qty"][j],
+                    c["line"][j],
+                )
+            )
+        code = c["code"][i]
+        return (
+            c["id"][i],
+            self._users[c["user"][i]],
+            c["at"][i],
+            c["subtotal"][i],
+            c["discount"][i],
+            c["total"][i],
+            self._codes[code] if code >= 0 else None,
+            items,
+        )
+
+    def find_id(self, order_id: int) -> int:
+        """
+        Row index of the order with this id, or -1.
+        """
+        ids = self._cols["id"]
+        i = bisect_left(ids, order_id)
+        return i if i < len(ids) and ids[i] == order_id else -1
+
+    def user_rows(self, user_id: str) -> array:
+        """
+        Row indices of the user's orders, oldest first (do not mutate).
+        """
+        user = self._user_index.get(user_id)
+        return self._user_rows[user] if user is not None else array("q")
+
+    def column_sum(self, name: str) -> int:
+        return sum(self._cols[name])
+
+    def rollup_rows(self) -> Iterator[Tuple[int, int, int, int, int]]:
+        """
+        (created_at_us, items, subtotal, discount, total) per order, read
+        straight from the columns (used to rebuild rollups after a load).
+        """
+        c = self._cols
+        qty, start = c["qty"], 0
+        for at, end, sub, disc, tot in zip(
+            c["at"], c["item_end"], c["subtotal"], c["discount"], c["total"]
+        ):
+            yield at, sum(qty[start:end]), sub, disc, tot
+            start = end
+
+    def nbytes(self) -> int:
+        """
+        Approximate payload size of the numeric columns, in bytes.
+        """
+        return sum(len(col) * col.itemsize for col in self._cols.values())
+
+    # Snapshot support -----
+
+    def to_columns(self) -> Tuple[Dict[str, array], Dict[str, Sequence[str]]]:
+        """
+        Copies of the numeric columns and string tables (cheap memcpy for
+        arrays, so callers can take this under a lock and encode later).
+        """
+        columns = {name: col[:] for name, col in self._cols.items()}
+        strings = {
+            "users": list(self._users),
+            "codes": list(self._codes),
+            "snap_names": list(self._snap_names),
+        }
+        return columns, strings
+
+    def load_columns(
+        self, columns: Dict[str, array], strings: Dict[str, Sequence[str]]
+    ) -> None:
+        """
+        Replace the ledger contents with previously dumped columns.
+        """
+        for name, col in self._cols.items():
+            loaded = columns[name]
+            if loaded.typecode != col.typecode:
+                loaded = array(col.typecode, loaded)
+            self._cols[name] = loaded
+        self._users = list(strings["users"])
+        self._codes = list(strings["codes"])
+        self._snap_names = list(strings["snap_names"])
+        self._user_index = {u: i for i, u in enumerate(self._users)}
+        self._user_rows = [array("q") for _ in self._users]
+        for row, user in enumerate(self._cols["user"]):
+            self._user_rows[user].append(row)
+        self._code_index = {c: i for i, c in enumerate(self._codes)}
+        self._snap_index = {
+            (pid, name, price): i
+            for i, (pid, name, price) in enumerate(
+                zip(self._cols["snap_pid"], self._snap_names, self._cols["snap_price"])
+            )
+        }
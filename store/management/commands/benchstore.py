@@ -0,0 +1,30 @@
+"""
+``python manage.py benchstore``: the InMemoryStore micro-benchmark suite.
+
+See benchmarks/store_ops.py; exits non-zero when a result regresses past
+``--threshold`` against ``--baseline``.
+"""
+
+# Related third-party imports
+from django.core.management.base import BaseCommand, CommandError
+
+# Local application/library specific imports
+from benchmarks import store_ops
+
+
+class Command(BaseCommand):
+    help = (
+        "Time InMemoryStore operations across store sizes; save or compare "
+        "JSON baselines."
+    )
+
+    def add_arguments(self, parser):
+        store_ops.add_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            regressed = store_ops.run(options, self.stdout.write)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if regressed:
+            raise CommandError(f"{regressed} benchmark(s) regressed")
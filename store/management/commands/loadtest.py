@@ -0,0 +1,32 @@
+"""
+``python manage.py loadtest``: synthetic shopper traffic through the API.
+
+See benchmarks/loadtest.py; exits non-zero when any request failed.
+"""
+
+# Related third-party imports
+from django.core.management.base import BaseCommand, CommandError
+
+# Local application/library specific imports
+from benchmarks import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive browse/cart/checkout/admin traffic through the store API and "
+        "report throughput and per-endpoint latency percentiles."
+    )
+    # The URL checks would import the URLconf before --target asgi can
+    # select the async views
+    requires_system_checks = []
+
+    def add_arguments(self, parser):
+        loadtest.add_arguments(parser)
+
+    def handle(self, *args, **options):
+        try:
+            failed = loadtest.run(options, self.stdout.write)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        if failed:
+            raise CommandError(f"{failed} request(s) failed")
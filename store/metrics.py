@@ -0,0 +1,219 @@
+"""
+Request metrics in the Prometheus text format.
+
+``RequestMetricsMiddleware`` records, per resolved URL name and method, the
+request count, the server error (5xx) count and a latency histogram. Each
+thread (under ASGI, the event loop's thread too) writes only to its own
+accumulators, so recording a request takes no lock. A scrape merges the
+accumulators of all threads; those of threads that have exited are folded
+into a retired total so counters never go backwards.
+"""
+
+# Standard library imports
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+# Related third-party imports
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from rest_framework.renderers import BaseRenderer
+
+# Latency bucket upper bounds in seconds (finer than the Prometheus
+# defaults at the low end: most store requests finish well under 5 ms)
+BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Series key: (URL name, method). A row is [requests, errors, seconds sum,
+# count per bucket..., count above the last bucket]
+Key = Tuple[str, str]
+_REQUESTS, _ERRORS, _SUM, _FIRST_BUCKET = 0, 1, 2, 3
+
+
+class _Shard:
+    """
+    One thread's accumulators; only that thread writes to them.
+    """
+
+    __slots__ = ("thread", "series")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.series: Dict[Key, List[float]] = {}
+
+
+class RequestMetrics:
+    """
+    Per-thread request counters and histograms, merged on `snapshot`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the shard list, not the rows
+        self._shards: List[_Shard] = []
+        self._retired: Dict[Key, List[float]] = {}
+
+    def observe(self, view: str, method: str, status: int, seconds: float) -> None:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        row = shard.series.get((view, method))
+        if row is None:
+            row = [0] * (_FIRST_BUCKET + len(self.buckets) + 1)
+            shard.series[(view, method)] = row
+        row[_REQUESTS] += 1
+        if status >= 500:
+            row[_ERRORS] += 1
+        row[_SUM] += seconds
+        row[_FIRST_BUCKET + bisect_left(self.buckets, seconds)] += 1
+
+    def snapshot(self) -> Dict[Key, List[float]]:
+        """
+        Totals per series across all threads, past and present.
+        """
+        with self._lock:
+            merged = {key: row[:] for key, row in self._retired.items()}
+            live = []
+            for shard in self._shards:
+                # Dead threads no longer write: their rows are final
+                alive = shard.thread.is_alive()
+                for key, row in list(shard.series.items()):
+                    _add(merged, key, row)
+                    if not alive:
+                        _add(self._retired, key, row)
+                if alive:
+                    live.append(shard)
+            self._shards = live
+        return merged
+
+
+def _add(totals: Dict[Key, List[float]], key: Key, row: List[float]) -> None:
+    total = totals.get(key)
+    if total is None:
+        totals[key] = row[:]
+    else:
+        for i, value in enumerate(row):
+            total[i] += value
+
+
+# Process-wide registry fed by the middleware
+request_metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    """
+    Time every request and record it under its resolved URL name
+    ("unresolved" when no URL pattern matched).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - start)
+        return response
+
+    @staticmethod
+    def _record(request, response, seconds: float) -> None:
+        match = request.resolver_match
+        view = (match.url_name if match else None) or "unresolved"
+        request_metrics.observe(view, request.method, response.status_code, seconds)
+
+
+# Exposition -----
+def _labels(**labels: str) -> str:
+    escaped = (
+        (name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render_metrics(gauges: Dict[str, int]) -> str:
+    """
+    The request metrics plus the given store gauges (name -> value, each
+    exported as store_<name>) in the Prometheus text format.
+    """
+    snapshot = request_metrics.snapshot()
+    buckets = request_metrics.buckets
+    series = sorted(snapshot.items())
+    lines = [
+        "# HELP store_http_requests_total Requests handled, by URL name and method.",
+        "# TYPE store_http_requests_total counter",
+    ]
+    for (view, method), row in series:
+        labels = _labels(view=view, method=method)
+        lines.append(f"store_http_requests_total{labels} {row[_REQUESTS]}")
+    lines += [
+        "# HELP store_http_request_errors_total Requests answered with a 5xx status.",
+        "# TYPE store_http_request_errors_total counter",
+    ]
+    for (view, method), row in series:
+        labels = _labels(view=view, method=method)
+        lines.append(f"store_http_request_errors_total{labels} {row[_ERRORS]}")
+    lines += [
+        "# HELP store_http_request_duration_seconds Request latency.",
+        "# TYPE store_http_request_duration_seconds histogram",
+    ]
+    for (view, method), row in series:
+        cumulative = 0
+        for bound, count in zip([*map(repr, buckets), "+Inf"], row[_FIRST_BUCKET:]):
+            cumulative += count
+            labels = _labels(view=view, method=method, le=bound)
+            lines.append(
+                f"store_http_request_duration_seconds_bucket{labels} {cumulative}"
+            )
+        labels = _labels(view=view, method=method)
+        lines.append(f"store_http_request_duration_seconds_sum{labels} {row[_SUM]!r}")
+        # The +Inf bucket, so _count always agrees with the buckets
+        lines.append(f"store_http_request_duration_seconds_count{labels} {cumulative}")
+    for name, value in gauges.items():
+        lines += [f"# TYPE store_{name} gauge", f"store_{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusTextRenderer(BaseRenderer):
+    """
+    Text exposition format, version 0.0.4.
+    """
+
+    media_type = "text/plain"
+    format = "txt"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):  # an error, e.g. a missing admin key
+            data = f"# {data.get('detail', '')}\n"
+        return data.encode(self.charset)
@@ -0,0 +1,48 @@
+"""
+Money helpers.
+
+Amounts are handled internally as integer cents; Decimal is only used to
+parse input and to render output (two places, ROUND_HALF_UP).
+"""
+
+# Standard library imports
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def D(x) -> Decimal:
+    """
+    Return a Decimal from any numeric/string value with safe coercion.
+    """
+    return Decimal(str(x))
+
+
+def money(x: Decimal) -> Decimal:
+    """
+    Two-decimal rounding suitable for currency display and arithmetic.
+    """
+    return Decimal(x).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+
+
+def to_cents(x) -> int:
+    """
+    Integer cents for an amount, rounded ROUND_HALF_UP to two places.
+    """
+    return int(money(D(x)).scaleb(2))
+
+
+def from_cents(c: int) -> Decimal:
+    """
+    Two-decimal Decimal for integer cents. Used at the serializer boundary.
+    """
+    return Decimal(c).scaleb(-2)
+
+
+def percent_of(amount_cents: int, pct: int) -> int:
+    """
+    amount * pct / 100 in whole cents, rounded ROUND_HALF_UP (ties away
+    from zero), matching money(amount * (D(pct) / D(100))).
+    """
+    q, r = divmod(abs(amount_cents * pct), 100)
+    if r >= 50:
+        q += 1
+    return q if amount_cents * pct >= 0 else -q
@@ -0,0 +1,72 @@
+"""
+Pre-rendered catalog responses, keyed by catalog version.
+
+Product listing and search pages only change when the catalog does, so
+the rendered JSON body of each page is kept under the catalog version it
+was built from and served as-is until the version moves on. Each body
+carries a strong ETag (a digest of the bytes), so a client revalidating
+with If-None-Match gets a 304 from the cache without the page being
+rebuilt or re-serialized.
+"""
+
+# Standard library imports
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+
+class RenderedPage:
+    """
+    One cached response: the JSON body, its ETag, and the cursor of the
+    next page (None on the last page).
+    """
+
+    __slots__ = ("body", "etag", "next_cursor")
+
+    def __init__(self, body: bytes, next_cursor: Optional[int] = None):
+        self.body = body
+        self.etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        self.next_cursor = next_cursor
+
+
+class CatalogPageCache:
+    """
+    Up to `max_entries` rendered pages of the current catalog version,
+    least recently used evicted first. Pages of an older version are
+    dropped as soon as one of a newer version is stored.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = 0
+        self._pages: "OrderedDict[Hashable, RenderedPage]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(self, version: int, key: Hashable) -> Optional[RenderedPage]:
+        with self._lock:
+            if version != self._version:
+                return None
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+            return page
+
+    def put(self, version: int, key: Hashable, page: RenderedPage) -> None:
+        """
+        Store `page` as built from catalog `version` (ignored if the cache
+        already holds a newer version).
+        """
+        with self._lock:
+            if version < self._version:
+                return
+            if version > self._version:
+                self._version = version
+                self._pages.clear()
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            while len(self._pages) > self.max_entries:
+                self._pages.popitem(last=False)
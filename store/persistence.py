@@ -0,0 +1,289 @@
+"""
+Local durability primitives for the in-memory store.
+
+Two on-disk artifacts live in a store data directory:
+
+- ``wal.<segment>.log``: append-only JSON-lines write-ahead log. Records are
+  buffered and fsynced in groups (group commit) either every
+  ``fsync_batch`` records or every ``fsync_interval`` seconds.
+- ``snapshot.bin``: a compact, columnar snapshot. Numeric columns are raw
+  ``array`` buffers so they are loaded straight out of an mmap without
+  per-record parsing; string columns are NUL-joined UTF-8 blobs.
+
+This module only knows about files and primitive columns; converting store
+state to and from columns is the store's job.
+"""
+
+# Standard library imports
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SNAPSHOT_MAGIC = b"ECOMSNP2"
+SNAPSHOT_NAME = "snapshot.bin"
+_HEADER_LEN = struct.Struct("<I")
+
+
+def _segment_path(data_dir: str, segment: int) -> str:
+    return os.path.join(data_dir, f"wal.{segment:06d}.log")
+
+
+def list_segments(data_dir: str) -> List[int]:
+    """
+    Return the WAL segment numbers present in data_dir, ascending.
+    """
+    segments = []
+    for name in os.listdir(data_dir):
+        if name.startswith("wal.") and name.endswith(".log"):
+            try:
+                segments.append(int(name[4:-4]))
+            except ValueError:
+                continue
+    return sorted(segments)
+
+
+def _fsync_dir(path: str) -> None:
+    """
+    Persist directory entries (renames/creates) where the OS supports it.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """
+    Append-only, segmented JSON-lines log with group commit.
+
+    Appends are written to an OS-buffered file and made durable in batches:
+    after ``fsync_batch`` records, or by a background flusher at most
+    ``fsync_interval`` seconds after the first unsynced record. Setting
+    ``fsync_batch=1`` gives synchronous durability per mutation.
+    """
+
+    def __init__(
+        self,
+        data_dir: str,
+        segment: int = 1,
+        fsync_batch: int = 64,
+        fsync_interval: float = 0.05,
+    ):
+        self.data_dir = data_dir
+        self.fsync_batch = max(1, fsync_batch)
+        self.fsync_interval = fsync_interval
+        self.segment = segment
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._records = 0  # records appended since the last rotation
+        self._file = open(_segment_path(data_dir, segment), "ab")
+        self._closed = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if fsync_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="wal-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    @property
+    def records_since_rotation(self) -> int:
+        return self._records
+
+    def append(self, record: Dict[str, object]) -> None:
+        """
+        Append one record; fsync when the group-commit batch is full.
+        """
+        line = json.dumps(record, separators=(",", ":")).encode() + b"\n"
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            self._records += 1
+            if self._pending >= self.fsync_batch:
+                self._sync_locked()
+
+    def flush(self) -> None:
+        """
+        Write and fsync everything appended so far.
+        """
+        with self._lock:
+            self._sync_locked()
+
+    def rotate(self) -> int:
+        """
+        Seal the current segment and start the next one.
+        Returns the new segment number; replay from it onwards covers every
+        record appended after this call.
+        """
+        with self._lock:
+            self._sync_locked()
+            self._file.close()
+            self.segment += 1
+            self._records = 0
+            self._file = open(_segment_path(self.data_dir, self.segment), "ab")
+            _fsync_dir(self.data_dir)
+            return self.segment
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+                self._file.close()
+
+    def _sync_locked(self) -> None:
+        if self._pending and not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._pending = 0
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            with self._lock:
+                self._sync_locked()
+
+    @staticmethod
+    def replay(data_dir: str, from_segment: int) -> Iterator[Dict[str, object]]:
+        """
+        Yield records from every segment >= from_segment, in order.
+        A torn (partially written) final line is ignored.
+        """
+        for segment in list_segments(data_dir):
+            if segment < from_segment:
+                continue
+            with open(_segment_path(data_dir, segment), "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break  # torn write at crash time
+                    yield json.loads(line)
+
+    @staticmethod
+    def prune(data_dir: str, before_segment: int) -> None:
+        """
+        Delete segments fully covered by a snapshot.
+        """
+        for segment in list_segments(data_dir):
+            if segment < before_segment:
+                os.remove(_segment_path(data_dir, segment))
+
+
+def write_snapshot(
+    data_dir: str,
+    meta: Dict[str, object],
+    columns: Dict[str, array],
+    blobs: Dict[str, bytes],
+) -> None:
+    """
+    Atomically write a snapshot (temp file + fsync + rename).
+
+    Layout: MAGIC | u32 header length | JSON header | section bytes...
+    The header lists each section's kind, offset and length, relative to the
+    end of the header.
+    """
+    sections = []
+    offset = 0
+    for name, col in columns.items():
+        size = len(col) * col.itemsize
+        sections.append(
+            {
+                "name": name,
+                "kind": "array",
+                "typecode": col.typecode,
+                "offset": offset,
+                "length": size,
+            }
+        )
+        offset += size
+    for name, blob in blobs.items():
+        sections.append(
+            {"name": name, "kind": "blob", "offset": offset, "length": len(blob)}
+        )
+        offset += len(blob)
+
+    header = json.dumps(
+        {"meta": meta, "byteorder": sys.byteorder, "sections": sections}
+    ).encode()
+
+    final = os.path.join(data_dir, SNAPSHOT_NAME)
+    tmp = final + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(SNAPSHOT_MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for col in columns.values():
+            col.tofile(f)
+        for blob in blobs.values():
+            f.write(blob)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, final)
+    _fsync_dir(data_dir)
+
+
+def read_snapshot(
+    data_dir: str,
+) -> Optional[Tuple[Dict[str, object], Dict[str, array], Dict[str, bytes]]]:
+    """
+    Load a snapshot via mmap. Returns (meta, columns, blobs), or None if no
+    snapshot exists. Array sections are bulk-copied with frombytes, never
+    parsed record by record.
+    """
+    path = os.path.join(data_dir, SNAPSHOT_NAME)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return None
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            if bytes(view[: len(SNAPSHOT_MAGIC)]) != SNAPSHOT_MAGIC:
+                raise ValueError("Not a store snapshot")
+            pos = len(SNAPSHOT_MAGIC)
+            (header_len,) = _HEADER_LEN.unpack_from(view, pos)
+            pos += _HEADER_LEN.size
+            header = json.loads(bytes(view[pos : pos + header_len]))
+            base = pos + header_len
+
+            columns: Dict[str, array] = {}
+            blobs: Dict[str, bytes] = {}
+            for sec in header["sections"]:
+                start = base + sec["offset"]
+                chunk = view[start : start + sec["length"]]
+                if sec["kind"] == "array":
+                    col = array(sec["typecode"])
+                    col.frombytes(chunk)
+                    if header["byteorder"] != sys.byteorder:
+                        col.byteswap()
+                    columns[sec["name"]] = col
+                else:
+                    blobs[sec["name"]] = bytes(chunk)
+                chunk.release()
+        finally:
+            view.release()
+
+    return header["meta"], columns, blobs
+
+
+def pack_strings(values: List[str]) -> bytes:
+    """
+    Join strings into a NUL-separated UTF-8 blob.
+    """
+    return "\0".join(values).encode()
+
+
+def unpack_strings(blob: bytes, count: int) -> List[str]:
+    """
+    Inverse of pack_strings; splitting happens in C, not per record.
+    """
+    if count == 0:
+        return []
+    return blob.decode().split("\0")
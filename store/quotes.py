@@ -0,0 +1,87 @@
+"""
+Checkout quotes: priced cart snapshots handed out as signed tokens.
+
+``POST /api/checkout/quote/`` prices the cart once and keeps the result
+here under a random id. The client gets the id signed with a timestamp
+(``django.core.signing``), so a forged, altered or expired token is
+rejected without a lookup. Checkout with a valid token commits the kept
+snapshot instead of repricing the cart. State is per process (like the
+default store backend): a token whose snapshot is not found here, e.g.
+because another worker issued it, still checks out, at current prices.
+"""
+
+# Standard library imports
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+# Related third-party imports
+from django.core import signing
+from django.utils import timezone
+
+# Local application/library specific imports
+from .inmemory import Quote
+
+_SALT = "store.quotes"
+
+
+class QuoteCache:
+    """
+    At most `max_quotes` quotes, each valid for `ttl` seconds.
+
+    Entries sit in an OrderedDict oldest first, so expiry and the size
+    bound only ever look at the front.
+    """
+
+    def __init__(self, max_quotes: int = 100_000, ttl: float = 15 * 60):
+        self.max_quotes = max_quotes
+        self.ttl = ttl
+        self._clock = time.monotonic
+        self._lock = threading.Lock()
+        self._signer = signing.TimestampSigner(salt=_SALT)
+        self._entries: "OrderedDict[str, Tuple[Quote, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def issue(self, quote: Quote) -> Tuple[str, datetime]:
+        """
+        Keep `quote` and return its token and expiry time.
+        """
+        quote_id = secrets.token_urlsafe(12)
+        with self._lock:
+            self._entries[quote_id] = (quote, self._clock() + self.ttl)
+            self._trim()
+        expires_at = timezone.now() + timedelta(seconds=self.ttl)
+        return self._signer.sign(quote_id), expires_at
+
+    def get(self, token: str, user_id: str) -> Optional[Quote]:
+        """
+        The quote behind `token`, or None if it is no longer kept here.
+        Raises ValueError for a token that is invalid, expired or was
+        issued to another user.
+        """
+        try:
+            quote_id = self._signer.unsign(token, max_age=self.ttl)
+        except signing.BadSignature:  # includes SignatureExpired
+            raise ValueError("Invalid or expired quote.")
+        with self._lock:
+            self._trim()
+            entry = self._entries.get(quote_id)
+        if entry is None:
+            return None
+        quote = entry[0]
+        if quote.user_id != user_id:
+            raise ValueError("Invalid or expired quote.")
+        return quote
+
+    def _trim(self) -> None:
+        now = self._clock()
+        while self._entries:
+            _, expires = next(iter(self._entries.values()))
+            if expires > now and len(self._entries) <= self.max_quotes:
+                break
+            self._entries.popitem(last=False)
@@ -0,0 +1,194 @@
+"""
+Time-bucketed sales rollups.
+
+Every order is added to three rings of fixed-width buckets (per minute,
+hour and day, all aligned to UTC). A ring keeps its most recent `size`
+buckets in typed arrays, overwriting the oldest slot as time moves on, so
+memory is fixed and a range query sums at most `size` buckets no matter
+how many orders were placed. The coarser rings are the downsampled view
+of the finer ones: each keeps data for longer at lower resolution.
+"""
+
+# Standard library imports
+from array import array
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Per-bucket counters, all integers (amounts in cents)
+METRICS = ("orders", "items", "gross", "discount", "net")
+
+# granularity -> (bucket width in seconds, buckets retained)
+GRANULARITIES: Dict[str, Tuple[int, int]] = {
+    "minute": (60, 24 * 60),  # 24 hours
+    "hour": (3600, 90 * 24),  # 90 days
+    "day": (86400, 3 * 366),  # ~3 years
+}
+
+_US = 1_000_000
+
+Bucket = Tuple[int, Tuple[int, ...]]  # (bucket start in epoch us, metrics)
+
+
+class BucketRing:
+    """
+    The last `size` buckets of `width_s` seconds, one slot per bucket.
+
+    A slot remembers which bucket number it holds, so slots left over from
+    an earlier lap of the ring are recognised as stale and never summed.
+    """
+
+    def __init__(self, width_s: int, size: int):
+        self.width_us = width_s * _US
+        self.size = size
+        self._bucket = array("q", [-1]) * size
+        self._cols = {name: array("q", [0]) * size for name in METRICS}
+        self._latest = -1
+
+    def add(self, at_us: int, values: Tuple[int, ...]) -> None:
+        b = at_us // self.width_us
+        if b <= self._latest - self.size:
+            return  # older than anything this ring retains
+        slot = b % self.size
+        if self._bucket[slot] != b:
+            self._bucket[slot] = b
+            for col in self._cols.values():
+                col[slot] = 0
+        for name, value in zip(METRICS, values):
+            self._cols[name][slot] += value
+        if b > self._latest:
+            self._latest = b
+
+    def to_columns(self) -> Dict[str, array]:
+        """
+        Copies of the slot arrays: "bucket" (bucket number per slot) and
+        one column per metric.
+        """
+        return {"bucket": self._bucket[:], **{n: c[:] for n, c in self._cols.items()}}
+
+    def load_columns(self, columns: Dict[str, array]) -> bool:
+        """
+        Replace the slots with previously dumped columns. Returns False,
+        changing nothing, if a column is missing or sized for another ring.
+        """
+        names = ("bucket", *METRICS)
+        if any(len(columns.get(name, ())) != self.size for name in names):
+            return False
+        self._bucket = array("q", columns["bucket"])
+        self._cols = {name: array("q", columns[name]) for name in METRICS}
+        self._latest = max(self._bucket)
+        return True
+
+    def first_retained(self, now_us: int) -> int:
+        """
+        Start (epoch us) of the oldest bucket still retained at `now_us`.
+        """
+        return (now_us // self.width_us - self.size + 1) * self.width_us
+
+    def buckets(self, start_us: int, end_us: int) -> Iterator[Bucket]:
+        """
+        Non-empty buckets overlapping [start_us, end_us), oldest first.
+        """
+        first = max(start_us // self.width_us, self._latest - self.size + 1)
+        last = min((end_us - 1) // self.width_us, self._latest)
+        for b in range(first, last + 1):
+            slot = b % self.size
+            if self._bucket[slot] == b:
+                yield b * self.width_us, tuple(
+                    self._cols[name][slot] for name in METRICS
+                )
+
+
+class SalesRollup:
+    """
+    Minute, hour and day buckets of order counts, items and amounts.
+    """
+
+    def __init__(self):
+        self.rings = {
+            name: BucketRing(width_s, size)
+            for name, (width_s, size) in GRANULARITIES.items()
+        }
+
+    def add(
+        self,
+        at_us: int,
+        items: int,
+        gross: int,
+        discount: int,
+        net: int,
+        orders: int = 1,
+    ) -> None:
+        values = (orders, items, gross, discount, net)
+        for ring in self.rings.values():
+            ring.add(at_us, values)
+
+    def to_columns(self) -> Dict[str, array]:
+        """
+        Every ring's slot arrays, named rollup_<granularity>_<column>.
+        """
+        return {
+            f"rollup_{granularity}_{name}": col
+            for granularity, ring in self.rings.items()
+            for name, col in ring.to_columns().items()
+        }
+
+    def load_columns(self, columns: Dict[str, array]) -> bool:
+        """
+        Restore every ring from `to_columns` output. Returns False if any
+        ring could not be restored (e.g. a snapshot from before the rings
+        were saved); the caller then rebuilds them from the orders.
+        """
+        for granularity, ring in self.rings.items():
+            prefix = f"rollup_{granularity}_"
+            ring_columns = {
+                name[len(prefix) :]: col
+                for name, col in columns.items()
+                if name.startswith(prefix)
+            }
+            if not ring.load_columns(ring_columns):
+                self.rings = SalesRollup().rings
+                return False
+        return True
+
+    def pick_granularity(self, start_us: int, now_us: int) -> str:
+        """
+        The finest granularity that still retains data back to start_us.
+        """
+        for name, ring in self.rings.items():
+            if start_us >= ring.first_retained(now_us):
+                return name
+        return "day"
+
+    def query(
+        self,
+        start_us: int,
+        end_us: int,
+        now_us: int,
+        granularity: Optional[str] = None,
+    ) -> Tuple[str, int, int, List[Bucket]]:
+        """
+        Buckets of one granularity covering [start_us, end_us). The range
+        is cut off one bucket past `now_us` (nothing later has data, and
+        the end stays a valid datetime) and widened to whole buckets;
+        returns (granularity, aligned start, aligned end, buckets).
+        Raises ValueError for an unknown granularity or one whose
+        retention does not reach start_us.
+        """
+        if end_us <= start_us:
+            raise ValueError("'to' must be after 'from'.")
+        if granularity is None:
+            granularity = self.pick_granularity(start_us, now_us)
+        ring = self.rings.get(granularity)
+        if ring is None:
+            raise ValueError(f"granularity must be one of: {', '.join(GRANULARITIES)}.")
+        if start_us < ring.first_retained(now_us):
+            raise ValueError(
+                f"'from' is older than the {ring.size} {granularity} buckets "
+                f"kept at {granularity} granularity."
+            )
+
+        width = ring.width_us
+        end_us = min(end_us, now_us + width)
+        start_us = min(start_us, end_us)
+        start_us -= start_us % width
+        end_us += -end_us % width
+        return granularity, start_us, end_us, list(ring.buckets(start_us, end_us))
@@ -0,0 +1,151 @@
+"""
+Product name search: an inverted token index with prefix lookup.
+
+Names are split into lower-cased word tokens. Each token maps to a sorted
+``array('q')`` of product ids (its postings), and the distinct tokens are
+kept in one sorted list that serves as a flattened prefix trie: every
+token starting with a prefix is a contiguous run found by binary search.
+"""
+
+# Standard library imports
+import re
+from array import array
+from bisect import bisect_left, insort
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.casefold())
+
+
+def _contains(postings: array, pid: int) -> bool:
+    i = bisect_left(postings, pid)
+    return i < len(postings) and postings[i] == pid
+
+
+class ProductSearchIndex:
+    """
+    Token -> product id postings plus a sorted token list for prefixes.
+
+    A query matches products whose name contains every query token; the
+    last token is matched as a prefix (typeahead) unless the query ends in
+    whitespace.
+    """
+
+    def __init__(self, products: Iterable[Tuple[int, str]] = ()):
+        postings: Dict[str, List[int]] = {}
+        for pid, name in products:
+            for token in set(tokenize(name)):
+                postings.setdefault(token, []).append(pid)
+        self._postings: Dict[str, array] = {
+            token: array("q", sorted(ids)) for token, ids in postings.items()
+        }
+        self._terms: List[str] = sorted(self._postings)
+
+    def __len__(self) -> int:
+        """
+        Number of distinct tokens.
+        """
+        return len(self._terms)
+
+    # Incremental updates -----
+
+    def add(self, pid: int, name: str) -> None:
+        for token in set(tokenize(name)):
+            postings = self._postings.get(token)
+            if postings is None:
+                self._postings[token] = array("q", [pid])
+                insort(self._terms, token)
+            elif not _contains(postings, pid):
+                postings.insert(bisect_left(postings, pid), pid)
+
+    def remove(self, pid: int, name: str) -> None:
+        for token in set(tokenize(name)):
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            i = bisect_left(postings, pid)
+            if i < len(postings) and postings[i] == pid:
+                postings.pop(i)
+            if not postings:
+                del self._postings[token]
+                del self._terms[bisect_left(self._terms, token)]
+
+    # Queries -----
+
+    def completions(self, prefix: str) -> Iterator[str]:
+        """
+        Indexed tokens starting with `prefix`, in sorted order.
+        """
+        terms = self._terms
+        for i in range(bisect_left(terms, prefix), len(terms)):
+            if not terms[i].startswith(prefix):
+                break
+            yield terms[i]
+
+    def search(
+        self, query: str, limit: int, name_of: Callable[[int], str]
+    ) -> List[int]:
+        """
+        Up to `limit` matching product ids (unranked). `name_of` returns the
+        current name of an indexed product id.
+
+        The scan is driven by whichever is shorter: the smallest postings
+        of the whole tokens, or the postings of the prefix's completions.
+        Either way it stops as soon as `limit` matches are found.
+        """
+        tokens = tokenize(query)
+        if not tokens or limit <= 0:
+            return []
+        prefix: Optional[str] = None
+        if not query[-1:].isspace():
+            prefix = tokens.pop()
+
+        lists = []
+        for token in set(tokens):
+            postings = self._postings.get(token)
+            if postings is None:
+                return []
+            lists.append(postings)
+        lists.sort(key=len)
+
+        if lists and (prefix is None or self._cheaper_by_ids(lists[0], prefix)):
+            driver, rest = lists[0], lists[1:]
+
+            def accept(pid):
+                return all(_contains(other, pid) for other in rest) and (
+                    prefix is None
+                    or any(t.startswith(prefix) for t in tokenize(name_of(pid)))
+                )
+
+            results = []
+            for pid in driver:
+                if accept(pid):
+                    results.append(pid)
+                    if len(results) == limit:
+                        break
+            return results
+
+        results, seen = [], set()
+        for term in self.completions(prefix):
+            for pid in self._postings[term]:
+                if pid in seen or not all(_contains(o, pid) for o in lists):
+                    continue
+                seen.add(pid)
+                results.append(pid)
+                if len(results) == limit:
+                    return results
+        return results
+
+    def _cheaper_by_ids(self, postings: array, prefix: str) -> bool:
+        """
+        True if scanning `postings` beats walking the prefix completions.
+        """
+        budget = len(postings)
+        for term in self.completions(prefix):
+            budget -= len(self._postings[term])
+            if budget < 0:
+                return True
+        return False
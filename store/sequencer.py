@@ -0,0 +1,130 @@
+"""
+Single-writer order sequencing.
+
+Checkout has one inherently serial step: assigning the next order number,
+applying the Nth-order discount rule and appending to the ledger. With
+``OrderSequencer`` that step runs on one writer thread fed by a bounded
+queue. Request threads price their cart on their own, submit the priced
+draft and wait for the resulting order. The writer drains the queue in
+micro-batches and commits each batch under a single hold of the store
+lock, instead of every request thread competing for that lock in turn.
+
+The writer starts on the first submission and exits after
+`idle_timeout` seconds without work; the next submission starts it again.
+"""
+
+# Standard library imports
+import threading
+from typing import Callable, List, Optional
+
+
+class OrderDraft:
+    """
+    A priced cart awaiting its order number. `done` is held until the
+    writer has committed it (a bare lock is the cheapest thing to wait on).
+    """
+
+    __slots__ = (
+        "user_id",
+        "items",
+        "subtotal_cents",
+        "discount_code",
+        "done",
+        "order",
+        "error",
+    )
+
+    def __init__(self, user_id, items, subtotal_cents, discount_code):
+        self.user_id = user_id
+        self.items = items
+        self.subtotal_cents = subtotal_cents
+        self.discount_code = discount_code
+        self.done = threading.Lock()
+        self.order = None
+        self.error: Optional[BaseException] = None
+
+
+class OrderSequencer:
+    """
+    Commit drafts on one writer thread, up to `max_batch` per lock hold.
+
+    `commit(drafts)` is called on the writer with `lock` held and sets
+    each draft's `order`, or its `error`, which is raised to that draft's
+    caller only. At most `max_pending` drafts wait to be committed; further
+    submitters block until there is room.
+    """
+
+    def __init__(
+        self,
+        commit: Callable,
+        lock,
+        max_batch: int = 256,
+        max_pending: int = 4096,
+        idle_timeout: float = 1.0,
+    ):
+        self.commit = commit
+        self.lock = lock
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition(threading.Lock())
+        self._pending: List[OrderDraft] = []
+        self._writer: Optional[threading.Thread] = None
+        self._writer_waiting = False
+        self._submitters_waiting = 0
+        # Batches and drafts committed so far, for monitoring
+        self.batches = 0
+        self.committed = 0
+
+    def submit(self, draft: OrderDraft):
+        """
+        Queue `draft` and wait for its order (or its commit error).
+        """
+        draft.done.acquire()
+        with self._cond:
+            while len(self._pending) >= self.max_pending:
+                self._submitters_waiting += 1
+                self._cond.wait()
+                self._submitters_waiting -= 1
+            self._pending.append(draft)
+            if self._writer is None:
+                self._writer = threading.Thread(
+                    target=self._run, name="order-sequencer", daemon=True
+                )
+                self._writer.start()
+            elif self._writer_waiting:
+                self._cond.notify_all()
+        draft.done.acquire()  # released by the writer
+        if draft.error is not None:
+            raise draft.error
+        return draft.order
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._writer_waiting = True
+                    woken = self._cond.wait(self.idle_timeout)
+                    self._writer_waiting = False
+                    if not woken and not self._pending:
+                        self._writer = None  # the next submit starts another
+                        return
+                batch = self._pending[: self.max_batch]
+                del self._pending[: self.max_batch]
+                if self._submitters_waiting:
+                    self._cond.notify_all()
+            self._commit_batch(batch)
+
+    def _commit_batch(self, batch: List[OrderDraft]) -> None:
+        with self.lock:
+            try:
+                self.commit(batch)
+            except Exception as e:  # unexpected: fail whatever is uncommitted
+                for draft in batch:
+                    if draft.order is None and draft.error is None:
+                        draft.error = e
+            self.batches += 1
+            self.committed += len(batch)
+        # Wake the waiting request threads after releasing the lock
+        for draft in batch:
+            draft.done.release()
@@ -1,6 +1,9 @@
 # Related third-party imports
 from rest_framework import serializers
 
+# Local application/library specific imports
+from .encoders import compile_encoder
+
 
 class CartLineOutSerializer(serializers.Serializer):
     """
@@ -38,6 +41,36 @@ class CartItemSerializer(serializers.Serializer):
     )
 
 
+class CartOpSerializer(serializers.Serializer):
+    """
+    One operation in a batch cart update.
+    """
+
+    op = serializers.ChoiceField(
+        choices=["add", "set", "remove"],
+    )
+
+    product_id = serializers.IntegerField()
+
+    quantity = serializers.IntegerField(
+        required=False,
+        default=0,
+    )
+
+
+class CartBatchSerializer(serializers.Serializer):
+    """
+    Request payload for POST /api/cart/batch/: operations applied in order,
+    all or nothing.
+    """
+
+    ops = CartOpSerializer(
+        many=True,
+        allow_empty=False,
+        max_length=100,
+    )
+
+
 class ProductSerializer(serializers.Serializer):
     """
     Product payload for the public API.
@@ -53,9 +86,9 @@ class ProductSerializer(serializers.Serializer):
     )
 
 
-class CheckoutSerializer(serializers.Serializer):
+class QuoteRequestSerializer(serializers.Serializer):
     """
-    Request payload for checkout.
+    Request payload for a checkout quote.
     """
 
     discount_code = serializers.CharField(
@@ -65,6 +98,19 @@ class CheckoutSerializer(serializers.Serializer):
     )
 
 
+class CheckoutSerializer(QuoteRequestSerializer):
+    """
+    Request payload for checkout. `quote` is a token from
+    POST /api/checkout/quote/.
+    """
+
+    quote = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        allow_null=True,
+    )
+
+
 class OrderItemSerializer(serializers.Serializer):
     """
     Output payload for a single order item.
@@ -121,6 +167,109 @@ class OrderSerializer(serializers.Serializer):
     )
 
 
+class QuoteSerializer(serializers.Serializer):
+    """
+    Output payload for a checkout quote: the priced cart, the discount the
+    code would give now, and the token to check it out with.
+    """
+
+    quote = serializers.CharField()
+
+    expires_at = serializers.DateTimeField()
+
+    items = OrderItemSerializer(many=True)
+
+    subtotal = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+    )
+
+    discount = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+    )
+
+    total = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+    )
+
+    discount_code = serializers.CharField(
+        allow_null=True,
+        required=False,
+    )
+
+
+class CartStatsSerializer(serializers.Serializer):
+    """
+    Live carts and how many were evicted (idle TTL / LRU bound).
+    """
+
+    active = serializers.IntegerField()
+
+    evicted_idle = serializers.IntegerField()
+
+    evicted_lru = serializers.IntegerField()
+
+
+class CampaignCodeStatsSerializer(serializers.Serializer):
+    """
+    Campaign discount codes issued and redeemed so far.
+    """
+
+    issued = serializers.IntegerField()
+
+    redeemed = serializers.IntegerField()
+
+
+class SalesFiguresSerializer(serializers.Serializer):
+    """
+    Order count and purchase totals for one time range.
+    """
+
+    order_count = serializers.IntegerField()
+
+    items_purchased = serializers.IntegerField()
+
+    gross_amount = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+    )
+
+    total_discount_amount = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+    )
+
+    net_amount = serializers.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+    )
+
+
+class SalesBucketSerializer(SalesFiguresSerializer):
+    """
+    One rollup bucket, starting at `start`.
+    """
+
+    start = serializers.CharField()
+
+
+class SalesWindowSerializer(SalesFiguresSerializer):
+    """
+    Totals for a [start, end) window, summed from rollup buckets, and the
+    non-empty buckets themselves.
+    """
+
+    start = serializers.CharField()
+
+    end = serializers.CharField()
+
+    granularity = serializers.CharField()
+
+    buckets = SalesBucketSerializer(many=True)
+
+
 class AdminStatsSerializer(serializers.Serializer):
     """
     Admin roll-up for purchases and discount codes.
@@ -142,8 +291,16 @@ class AdminStatsSerializer(serializers.Serializer):
         decimal_places=2,
     )
 
+    carts = CartStatsSerializer()
+
+    window = SalesWindowSerializer(
+        required=False,
+    )
+
     discount_codes = serializers.ListField()
 
+    campaign_codes = CampaignCodeStatsSerializer()
+
 
 class HealthSerializer(serializers.Serializer):
     """
@@ -153,6 +310,34 @@ class HealthSerializer(serializers.Serializer):
     status = serializers.CharField()
 
 
+class AdminPriceSerializer(serializers.Serializer):
+    """
+    Request payload for an admin price change.
+    """
+
+    price = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=0,
+    )
+
+
+class AdminPriceResponseSerializer(serializers.Serializer):
+    """
+    Schema for the admin price change response: the new price and how
+    many carts holding the product are being repriced.
+    """
+
+    product_id = serializers.IntegerField()
+
+    price = serializers.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+    )
+
+    carts_repriced = serializers.IntegerField()
+
+
 class AdminGenerateDiscountResponseSerializer(serializers.Serializer):
     """
     Schema for the admin generate-discount response.
@@ -165,3 +350,45 @@ class AdminGenerateDiscountResponseSerializer(serializers.Serializer):
     discount_pct = serializers.IntegerField()
 
     note = serializers.CharField()
+
+
+class AdminBulkDiscountSerializer(serializers.Serializer):
+    """
+    Request payload for issuing campaign discount codes in bulk.
+    """
+
+    # Per request; a larger campaign takes several requests
+    count = serializers.IntegerField(
+        min_value=1,
+        max_value=100_000,
+    )
+
+    discount_pct = serializers.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=100,
+    )
+
+
+class AdminBulkDiscountResponseSerializer(serializers.Serializer):
+    """
+    Schema for the admin bulk discount response: the issued codes.
+    """
+
+    count = serializers.IntegerField()
+
+    discount_pct = serializers.IntegerField()
+
+    created_at = serializers.CharField()
+
+    codes = serializers.ListField(
+        child=serializers.CharField(),
+    )
+
+
+# Compiled encoders for the hot response shapes (see store/encoders.py).
+# The classes above remain the schema and the reference output.
+encode_cart = compile_encoder(CartOutSerializer)
+encode_products = compile_encoder(ProductSerializer(many=True))
+encode_order = compile_encoder(OrderSerializer)
+encode_quote = compile_encoder(QuoteSerializer)
@@ -1,14 +1,77 @@
 # Standard library imports
+import asyncio
+import decimal
 import json
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import partial
 from importlib import reload
+from io import StringIO
+from unittest import mock
 
 # Related third-party imports
+from asgiref.sync import iscoroutinefunction
 from django.conf import settings
-from django.test import override_settings, TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import (
+    AsyncRequestFactory,
+    override_settings,
+    RequestFactory,
+    TestCase,
+)
 from django.urls import reverse
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.renderers import JSONRenderer
 
 # Local application/library specific imports
-from store import inmemory, views
+from benchmarks import loadtest, store_ops
+from store import (
+    catalog,
+    codepool,
+    encoders,
+    inmemory,
+    metrics,
+    persistence,
+    rollups,
+    views,
+)
+from store.aio import run_catalog, run_store
+from store.idempotency import IdempotencyCache, IdempotencyKeyInProgress
+from store.pagecache import CatalogPageCache, RenderedPage
+from store.quotes import QuoteCache
+from store.serializers import (
+    encode_order,
+    encode_products,
+    OrderSerializer,
+    ProductSerializer,
+)
+
+# Stores built from settings check kept cart totals on every priced read
+_verify_cart_totals = override_settings(STORE_VERIFY_CART_TOTALS=True)
+
+
+def setUpModule():
+    # Every compiled encode in the suite is checked against DRF's output
+    encoders.VERIFY = True
+    _verify_cart_totals.enable()
+
+
+def tearDownModule():
+    encoders.VERIFY = False
+    _verify_cart_totals.disable()
 
 
 def J(resp):
@@ -127,6 +190,81 @@ class CartAPITests(TestCase):
         self.assertIn("quantity must be an integer", J(r)["detail"])
 
 
+class CartBatchTests(BaseStoreTest):
+    """
+    Verifies POST /api/cart/batch/:
+    - ops apply in order and the resulting cart is returned
+    - one invalid op rejects the whole batch
+    - a batch is a single WAL record that replays to the same cart
+    """
+
+    def batch(self, ops, user="batch-u"):
+        return self.client.post(
+            reverse("cart-batch"),
+            data={"ops": ops},
+            content_type="application/json",
+            HTTP_X_USER_ID=user,
+        )
+
+    def test_ops_apply_in_order(self):
+        r = self.batch(
+            [
+                {"op": "add", "product_id": 1, "quantity": 2},
+                {"op": "add", "product_id": 1, "quantity": 1},
+                {"op": "set", "product_id": 2, "quantity": 4},
+                {"op": "add", "product_id": 3, "quantity": 1},
+                {"op": "remove", "product_id": 3},
+                {"op": "set", "product_id": 2, "quantity": 0},
+                {"op": "set", "product_id": 2, "quantity": 1},
+            ]
+        )
+        self.assertEqual(r.status_code, 200)
+        body = J(r)
+        self.assertEqual(
+            body["items"],
+            [{"product_id": 1, "quantity": 3}, {"product_id": 2, "quantity": 1}],
+        )
+        self.assertEqual(body["total"], "2600.00")
+        self.assertEqual(
+            J(self.client.get(reverse("cart"), HTTP_X_USER_ID="batch-u")), body
+        )
+
+    def test_invalid_op_rejects_whole_batch(self):
+        self.batch([{"op": "add", "product_id": 1, "quantity": 1}])
+        r = self.batch(
+            [
+                {"op": "set", "product_id": 1, "quantity": 9},
+                {"op": "add", "product_id": 2, "quantity": 1},
+                {"op": "add", "product_id": 999, "quantity": 1},
+            ]
+        )
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("ops[2]", J(r)["detail"])
+        self.assertEqual(views.db.cart_snapshot("batch-u"), {1: 1})
+
+        for ops in (
+            [],
+            [{"op": "add", "product_id": 1, "quantity": 0}],
+            [{"op": "swap", "product_id": 1}],
+            [{"op": "remove", "product_id": 1}] * 101,
+        ):
+            self.assertEqual(self.batch(ops).status_code, 400, ops)
+
+    def test_batch_replays_from_wal(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            cart = store.apply_cart_ops(
+                "w", [("add", 1, 2), ("set", 3, 5), ("remove", 1, 0)]
+            )
+            store.apply_cart_ops("gone", [("add", 2, 1), ("set", 2, 0)])
+            store.close()
+
+            reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            self.assertEqual(cart, {3: 5})
+            self.assertEqual(dict(reopened.carts), {"w": {3: 5}})
+            reopened.close()
+
+
 class CheckoutAPITests(TestCase):
     """
     Verifies checkout behavior (without discounts).
@@ -187,6 +325,472 @@ class CheckoutAPITests(TestCase):
         self.assertIn("Cart is empty", J(r)["detail"])
 
 
+class CheckoutIdempotencyTests(BaseStoreTest):
+    """
+    Verifies Idempotency-Key handling on POST /api/checkout/:
+    - a retry replays the first response byte-for-byte, placing one order
+    - reusing a key with another payload is rejected
+    - failed attempts are not cached
+    - concurrent duplicates wait for the in-flight request
+    - the response cache is bounded by size and TTL
+    """
+
+    def setUp(self):
+        super().setUp()
+        views.checkout_responses = IdempotencyCache()
+
+    def checkout(self, user, key, data=None):
+        return self.client.post(
+            reverse("checkout"),
+            data=data or {},
+            content_type="application/json",
+            HTTP_X_USER_ID=user,
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_replays_first_response(self):
+        views.db.add_to_cart("idem", 1, 2)
+        first = self.checkout("idem", "k1")
+        self.assertEqual(first.status_code, 201)
+        views.db.add_to_cart("idem", 2, 1)  # a re-added cart must not matter
+        retry = self.checkout("idem", "k1")
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(len(views.db.orders), 1)
+
+        # Keys are scoped per user
+        views.db.add_to_cart("other", 1, 1)
+        self.assertEqual(J(self.checkout("other", "k1"))["user_id"], "other")
+
+    def test_key_reuse_and_validation(self):
+        views.db.add_to_cart("idem", 1, 1)
+        self.checkout("idem", "k2")
+        r = self.checkout("idem", "k2", {"discount_code": "NOPE1234"})
+        self.assertEqual(r.status_code, 422)
+        self.assertEqual(self.checkout("idem", "x" * 256).status_code, 400)
+
+    def test_failures_are_not_cached(self):
+        self.assertEqual(self.checkout("idem", "k3").status_code, 400)  # empty
+        views.db.add_to_cart("idem", 3, 1)
+        r = self.checkout("idem", "k3")
+        self.assertEqual(r.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", r.headers)
+
+    def test_concurrent_duplicates_place_one_order(self):
+        views.db.add_to_cart("race", 1, 1)
+        factory = RequestFactory()
+        view = views.Checkout.as_view()
+
+        def attempt(_):
+            request = factory.post(
+                "/api/checkout/",
+                data="{}",
+                content_type="application/json",
+                HTTP_X_USER_ID="race",
+                HTTP_IDEMPOTENCY_KEY="same",
+            )
+            response = view(request)
+            if hasattr(response, "render"):  # DRF Response (non-replayed path)
+                response.render()
+            return response.status_code, response.content
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(attempt, range(16)))
+        self.assertEqual(len(views.db.orders), 1)
+        self.assertEqual(len(set(results)), 1)
+        self.assertEqual(results[0][0], 201)
+
+    def test_cache_is_bounded(self):
+        cache = IdempotencyCache(max_keys=2, ttl=60)
+        now = [0.0]
+        cache._clock = lambda: now[0]
+        for key in ("a", "b", "c"):
+            self.assertIsNone(cache.claim(key, "{}", timeout=0))
+            cache.complete(key, 201, key.encode())
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.claim("a", "{}", timeout=0))  # evicted: runs again
+        cache.release("a")
+
+        self.assertEqual(cache.claim("c", "{}", timeout=0).body, b"c")
+        now[0] = 61
+        self.assertIsNone(cache.claim("c", "{}", timeout=0))  # expired
+        self.assertEqual(len(cache), 1)
+        with self.assertRaises(IdempotencyKeyInProgress):
+            cache.claim("c", "{}", timeout=0)
+
+    def test_key_in_flight_does_not_hold_back_eviction(self):
+        cache = IdempotencyCache(max_keys=2, ttl=60)
+        self.assertIsNone(cache.claim("slow", "{}", timeout=0))
+        for i in range(10):
+            self.assertIsNone(cache.claim(i, "{}", timeout=0))
+            cache.complete(i, 201, b"{}")
+            self.assertLessEqual(len(cache), 3)
+        self.assertEqual(list(cache._entries), [8, 9])
+        with self.assertRaises(IdempotencyKeyInProgress):
+            cache.claim("slow", "{}", timeout=0)
+        cache.complete("slow", 201, b"slow")
+        self.assertEqual(list(cache._entries), [9, "slow"])
+        self.assertEqual(cache.claim("slow", "{}", timeout=0).body, b"slow")
+
+
+class CheckoutQuoteTests(BaseStoreTest):
+    """
+    Verifies POST /api/checkout/quote/ and checkout with its token:
+    - an unchanged cart is committed at the quoted prices, unrepriced
+    - a cart or catalog change since the quote reprices
+    - tampered, expired and other users' tokens are rejected
+    - a token whose quote was evicted still checks out
+    """
+
+    def setUp(self):
+        super().setUp()
+        views.checkout_quotes = QuoteCache()
+
+    def quote(self, user, data=None):
+        return self.client.post(
+            reverse("checkout-quote"),
+            data=data or {},
+            content_type="application/json",
+            HTTP_X_USER_ID=user,
+        )
+
+    def checkout(self, user, token):
+        return self.client.post(
+            reverse("checkout"),
+            data={"quote": token},
+            content_type="application/json",
+            HTTP_X_USER_ID=user,
+        )
+
+    def test_quote_is_committed_without_repricing(self):
+        views.db.add_to_cart("q", 1, 2)
+        views.db.add_to_cart("q", 2, 1)
+        r = self.quote("q")
+        self.assertEqual(r.status_code, 200)
+        quote = J(r)
+        self.assertEqual(quote["subtotal"], "1850.00")
+        self.assertEqual(quote["discount"], "0.00")
+        self.assertEqual(quote["total"], "1850.00")
+        self.assertEqual(
+            [i["line_total"] for i in quote["items"]], ["1500.00", "350.00"]
+        )
+        self.assertIn("expires_at", quote)
+        self.assertEqual(len(views.db.orders), 0)
+
+        with mock.patch.object(
+            views.db, "_price_cart", wraps=views.db._price_cart
+        ) as price:
+            r = self.checkout("q", quote["quote"])
+            price.assert_not_called()
+        self.assertEqual(r.status_code, 201)
+        order = J(r)
+        self.assertEqual(order["total"], "1850.00")
+        self.assertEqual(order["items"], quote["items"])
+        self.assertEqual(views.db.get_cart("q"), {})
+
+    def test_changes_after_the_quote_reprice(self):
+        views.db.add_to_cart("q", 1, 1)
+        token = J(self.quote("q"))["quote"]
+        views.db.add_to_cart("q", 1, 1)
+        self.assertEqual(J(self.checkout("q", token))["total"], "1500.00")
+
+        views.db.add_to_cart("q", 2, 1)
+        token = J(self.quote("q"))["quote"]
+        views.db.products.set_price(2, 40000)
+        self.assertEqual(J(self.checkout("q", token))["total"], "400.00")
+
+    def test_invalid_tokens_are_rejected(self):
+        views.db.add_to_cart("q", 1, 1)
+        views.db.add_to_cart("other", 1, 1)
+        token = J(self.quote("q"))["quote"]
+
+        for bad in (token + "x", "not-a-token"):
+            r = self.checkout("q", bad)
+            self.assertEqual(r.status_code, 400)
+            self.assertEqual(J(r)["detail"], "Invalid or expired quote.")
+        self.assertEqual(self.checkout("other", token).status_code, 400)
+
+        expired = timezone.now().timestamp() + views.checkout_quotes.ttl + 1
+        with mock.patch("django.core.signing.time.time", return_value=expired):
+            self.assertEqual(self.checkout("q", token).status_code, 400)
+        self.assertEqual(len(views.db.orders), 0)
+        self.assertEqual(self.checkout("q", token).status_code, 201)
+
+    def test_evicted_quote_reprices(self):
+        views.checkout_quotes = QuoteCache(max_quotes=1)
+        views.db.add_to_cart("q", 1, 1)
+        token = J(self.quote("q"))["quote"]
+        views.db.add_to_cart("other", 2, 1)
+        self.quote("other")
+        self.assertEqual(len(views.checkout_quotes), 1)
+        self.assertIsNone(views.checkout_quotes.get(token, "q"))
+        self.assertEqual(J(self.checkout("q", token))["total"], "750.00")
+
+    def test_quote_errors(self):
+        r = self.quote("q")
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(J(r)["detail"], "Cart is empty")
+        views.db.add_to_cart("q", 1, 1)
+        r = self.quote("q", {"discount_code": "NOPE1234"})
+        self.assertEqual(r.status_code, 400)
+
+
+class AsyncViewTests(BaseStoreTest):
+    """
+    Verifies the async (ASGI) variants of the hot endpoints:
+    - they are coroutine views and answer exactly like their sync views
+    - idempotent duplicates wait on the event loop, not a thread
+    - store calls stay on the loop unless a lock they need is held
+      elsewhere, the order sequencer would be waited for or the store can
+      block (WAL, shared backend); catalog reads unless the store can block
+    """
+
+    def setUp(self):
+        super().setUp()
+        views.checkout_responses = IdempotencyCache()
+        self.factory = AsyncRequestFactory()
+        self.headers = {"x-user-id": "aio"}
+
+    def test_views_are_coroutines(self):
+        for view in (
+            views.AsyncCartBatch,
+            views.AsyncCartItemAdd,
+            views.AsyncCartItemUpdate,
+            views.AsyncCartView,
+            views.AsyncCheckout,
+            views.AsyncHealthView,
+            views.AsyncProductList,
+            views.AsyncProductSearch,
+        ):
+            self.assertTrue(iscoroutinefunction(view.as_view()), view)
+
+    async def test_cart_and_checkout(self):
+        post = partial(
+            self.factory.post, content_type="application/json", headers=self.headers
+        )
+        r = await views.AsyncCartItemAdd.as_view()(
+            post("/api/cart/items/", {"product_id": 1, "quantity": 2})
+        )
+        self.assertEqual(r.status_code, 201)
+        r = await views.AsyncCartItemAdd.as_view()(post("/api/cart/items/", {}))
+        self.assertEqual(r.status_code, 400)
+        r = await views.AsyncCartItemUpdate.as_view()(
+            self.factory.put(
+                "/api/cart/items/2/",
+                {"quantity": 3},
+                content_type="application/json",
+                headers=self.headers,
+            ),
+            product_id=2,
+        )
+        self.assertEqual(r.status_code, 200)
+        r = await views.AsyncCartBatch.as_view()(
+            post("/api/cart/batch/", {"ops": [{"op": "remove", "product_id": 2}]})
+        )
+        self.assertEqual(J(r)["items"], [{"product_id": 1, "quantity": 2}])
+
+        request = self.factory.get("/api/cart/", headers=self.headers)
+        r = await views.AsyncCartView.as_view()(request)
+        self.assertEqual(r.content, views.CartView.as_view()(request).render().content)
+
+        headers = {**self.headers, "idempotency-key": "k"}
+        checkout = views.AsyncCheckout.as_view()
+        first = await checkout(post("/api/checkout/", {}, headers=headers))
+        again = await checkout(post("/api/checkout/", {}, headers=headers))
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(again.content, first.content)
+        self.assertEqual(again["Idempotent-Replayed"], "true")
+        self.assertEqual(len(views.db.orders), 1)
+
+    async def test_catalog_matches_sync_views(self):
+        for view, sync_view, path in (
+            (views.AsyncProductList, views.ProductList, "/api/products/?limit=2"),
+            (
+                views.AsyncProductSearch,
+                views.ProductSearch,
+                "/api/products/search/?q=a",
+            ),
+            (views.AsyncHealthView, views.HealthView, "/api/health/"),
+        ):
+            request = self.factory.get(path)
+            r = await view.as_view()(request)
+            expected = sync_view.as_view()(request)
+            if hasattr(expected, "render"):
+                expected.render()
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(r.content, expected.content)
+            self.assertEqual(r.get("X-Next-Cursor"), expected.get("X-Next-Cursor"))
+
+    async def test_duplicate_waits_on_the_loop(self):
+        cache = IdempotencyCache()
+        self.assertIsNone(await cache.aclaim("k", "{}", timeout=1))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, cache.complete, "k", 201, b"{}")
+        # Another coroutine keeps running while the duplicate waits
+        ticks = []
+        loop.call_soon(ticks.append, 1)
+        cached = await cache.aclaim("k", "{}", timeout=1)
+        self.assertEqual((cached.status, cached.body), (201, b"{}"))
+        self.assertEqual(ticks, [1])
+
+        self.assertIsNone(await cache.aclaim("slow", "{}", timeout=1))
+        with self.assertRaises(IdempotencyKeyInProgress):
+            await cache.aclaim("slow", "{}", timeout=0.01)
+        threading.Timer(0.01, cache.release, ["slow"]).start()
+        self.assertIsNone(await cache.aclaim("slow", "{}", timeout=1))
+
+    def hold_elsewhere(self, lock):
+        """
+        Hold `lock` on another thread, as an admin view or the cart reprice
+        would, until 0.2s from now.
+        """
+        held = threading.Event()
+
+        def hold():
+            with lock:
+                held.set()
+                time.sleep(0.2)
+
+        threading.Thread(target=hold).start()
+        self.assertTrue(held.wait(5))
+
+    async def test_store_calls_stay_on_the_loop_unless_contended(self):
+        here = threading.get_ident()
+        db = views.db
+        self.assertEqual(
+            await run_store(db.hold_uncontended("aio"), threading.get_ident), here
+        )
+        self.assertEqual(
+            await run_store(
+                db.hold_uncontended("aio", orders=True), threading.get_ident
+            ),
+            here,
+        )
+        self.assertFalse(db._lock._is_owned())  # released again
+
+        self.hold_elsewhere(db._lock)
+        self.assertEqual(
+            await run_store(db.hold_uncontended("aio"), threading.get_ident), here
+        )
+        self.assertNotEqual(
+            await run_store(
+                db.hold_uncontended("aio", orders=True), threading.get_ident
+            ),
+            here,
+        )
+        self.assertFalse(db._cart_lock("aio")._is_owned())
+
+        self.assertFalse(db.may_block)
+        self.assertEqual(await run_catalog(db, threading.get_ident), here)
+        with mock.patch.object(
+            inmemory.InMemoryStore, "may_block", new_callable=mock.PropertyMock
+        ) as may_block:
+            may_block.return_value = True
+            self.assertNotEqual(await run_catalog(db, threading.get_ident), here)
+            self.assertNotEqual(
+                await run_store(db.hold_uncontended("aio"), threading.get_ident), here
+            )
+
+    async def test_uncontended_handlers_run_on_the_loop(self):
+        here, threads = threading.get_ident(), []
+        for name in ("add_to_cart", "priced_cart", "quote", "place_order"):
+            method = getattr(views.db, name)
+
+            def record(*args, method=method, **kwargs):
+                threads.append(threading.get_ident())
+                return method(*args, **kwargs)
+
+            setattr(views.db, name, record)
+        post = partial(
+            self.factory.post, content_type="application/json", headers=self.headers
+        )
+        r = await views.AsyncCartItemAdd.as_view()(
+            post("/api/cart/items/", {"product_id": 1, "quantity": 2})
+        )
+        self.assertEqual(r.status_code, 201)
+        r = await views.AsyncCartView.as_view()(
+            self.factory.get("/api/cart/", headers=self.headers)
+        )
+        self.assertEqual(J(r)["total"], "1500.00")
+        token = J(
+            await views.AsyncCheckoutQuote.as_view()(post("/api/checkout/quote/", {}))
+        )
+        r = await views.AsyncCheckout.as_view()(
+            post("/api/checkout/", {"quote": token["quote"]})
+        )
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(threads, [here] * 4)
+
+    async def test_contended_store_locks_do_not_stall_the_loop(self):
+        self.hold_elsewhere(views.db._cart_lock("aio"))
+        read = asyncio.ensure_future(
+            views.AsyncCartView.as_view()(
+                self.factory.get("/api/cart/", headers=self.headers)
+            )
+        )
+        await asyncio.sleep(0.05)
+        self.assertFalse(read.done())  # the loop kept running meanwhile
+        self.assertEqual((await read).status_code, 200)
+
+        # A checkout waits off the loop for the global lock too, once only
+        views.db.add_to_cart("aio", 1, 1)
+        self.hold_elsewhere(views.db._lock)
+        checkout = asyncio.ensure_future(
+            views.AsyncCheckout.as_view()(
+                self.factory.post(
+                    "/api/checkout/",
+                    {},
+                    content_type="application/json",
+                    headers=self.headers,
+                )
+            )
+        )
+        await asyncio.sleep(0.05)
+        self.assertFalse(checkout.done())
+        self.assertEqual((await checkout).status_code, 201)
+        self.assertEqual(len(views.db.orders), 1)
+        self.assertEqual(views.db.get_cart("aio"), {})
+
+    async def test_sequenced_checkouts_leave_the_loop(self):
+        # Each checkout waits for the sequencer's writer thread
+        views.db = inmemory.InMemoryStore(order_sequencer=True)
+        # ... which catalog reads never do
+        self.assertFalse(views.db.may_block)
+        here = threading.get_ident()
+        self.assertEqual(await run_catalog(views.db, threading.get_ident), here)
+        users = [f"seq{i}" for i in range(8)]
+        for user in users:
+            views.db.add_to_cart(user, 1, 1)
+        submit, threads = views.db._sequencer.submit, set()
+
+        def record(draft):
+            threads.add(threading.get_ident())
+            return submit(draft)
+
+        views.db._sequencer.submit = record
+        checkout = views.AsyncCheckout.as_view()
+        responses = await asyncio.gather(
+            *(
+                checkout(
+                    self.factory.post(
+                        "/api/checkout/",
+                        {},
+                        content_type="application/json",
+                        headers={"x-user-id": user},
+                    )
+                )
+                for user in users
+            )
+        )
+        self.assertEqual([r.status_code for r in responses], [201] * len(users))
+        self.assertEqual(
+            sorted(J(r)["id"] for r in responses), list(range(1, len(users) + 1))
+        )
+        self.assertEqual(views.db._sequencer.committed, len(users))
+        self.assertNotIn(threading.get_ident(), threads)
+
+
 @override_settings(ADMIN_API_KEY="test-key")
 class DiscountFlowTests(TestCase):
     """
@@ -264,6 +868,24 @@ class DiscountFlowTests(TestCase):
         )
         self.assertEqual(r2.status_code, 400)
 
+    def test_code_index_tracks_generation_and_redemption(self):
+        store = inmemory.db
+        n = settings.NTH_ORDER_FOR_DISCOUNT
+        for i in range(1, n):
+            store.add_to_cart(f"idx{i}", 1, 1)
+            store.place_order(f"idx{i}")
+
+        dc = store.generate_code()
+        self.assertIs(store._find_code(dc.code), dc)
+        with self.assertRaises(ValueError):
+            store._find_code("NOPE0000")
+
+        store.add_to_cart("idx-nth", 2, 1)
+        order = store.place_order("idx-nth", discount_code=dc.code)
+        self.assertTrue(store._find_code(dc.code).used)
+        self.assertEqual(store._find_code(dc.code).redeemed_order_id, order.id)
+        self.assertFalse(store.validate_discount(dc.code))
+
     def test_cannot_generate_code_when_not_eligible(self):
         # Fresh run; first order is not eligible if N > 1
         r = self.client.post(reverse("admin-generate-discount"), **self.admin)
@@ -292,35 +914,1806 @@ class DiscountFlowTests(TestCase):
         self.assertIn("items_purchased", stats)
         self.assertIn("discount_codes", stats)
 
+    def test_admin_stats_running_totals_match_recompute(self):
+        n = settings.NTH_ORDER_FOR_DISCOUNT
+        store = inmemory.db
+        for i in range(1, 2 * n + 1):
+            uid = f"agg{i}"
+            store.add_to_cart(uid, 1, i)
+            store.add_to_cart(uid, 3, 1)
+            if store.eligible_now() and not store.has_active_code():
+                store.generate_code()
+            store.place_order(uid, discount_code=store.active_code)
 
-class HealthTests(TestCase):
-    def test_health(self):
-        resp = self.client.get(reverse("health"))
-        self.assertEqual(resp.status_code, 200)
-        self.assertEqual(json.loads(resp.content.decode()), {"status": "ok"})
+        self.assertTrue(store.stats_consistent())
+
+        r = self.client.get(reverse("admin-stats"), **self.admin)
+        stats = J(r)
+        self.assertEqual(stats["items_purchased"], sum(range(1, 2 * n + 1)) + 2 * n)
+        self.assertNotEqual(stats["total_discount_amount"], "0.00")
+        self.assertEqual(
+            stats["net_amount"],
+            str(
+                inmemory.D(stats["gross_amount"])
+                - inmemory.D(stats["total_discount_amount"])
+            ),
+        )
 
 
-class ProductAPITests(TestCase):
+class ConcurrencyTests(TestCase):
     """
-    Verifies the public product catalog is exposed and shaped correctly.
+    Stress the store from a thread pool:
+    - order ids stay unique and gap-free
+    - each discount code is redeemed exactly once
+    - concurrent increments on one cart are not lost
     """
 
-    def test_get_products(self):
-        resp = self.client.get(reverse("products"))
-        self.assertEqual(resp.status_code, 200)
+    CHECKOUTS = 2000
+    WORKERS = 32
+    STORE_OPTIONS = {}
 
-        data = json.loads(resp.content.decode())
+    def make_store(self):
+        return inmemory.InMemoryStore(**self.STORE_OPTIONS)
 
-        # Basic shape checks
-        self.assertIsInstance(data, list)
-        self.assertGreaterEqual(len(data), 1)
-        for item in data:
-            self.assertIn("id", item)
-            self.assertIn("name", item)
-            self.assertIn("price", item)
+    def test_concurrent_checkouts_unique_ids_and_single_redemption(self):
+        store = self.make_store()
 
-            # price should be a stringified decimal with two places
-            self.assertRegex(item["price"], r"^\d+\.\d{2}$")
+        def checkout(i):
+            uid = f"stress{i}"
+            store.add_to_cart(uid, 1, 1)
+            store.add_to_cart(uid, 2, 2)
+            if store.eligible_now() and not store.has_active_code():
+                try:
+                    store.generate_code()
+                except ValueError:
+                    pass  # another thread won the race
+            return store.place_order(uid, discount_code=store.active_code)
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            orders = list(pool.map(checkout, range(self.CHECKOUTS)))
+
+        ids = sorted(o.id for o in orders)
+        self.assertEqual(ids, list(range(1, self.CHECKOUTS + 1)))
+
+        n = settings.NTH_ORDER_FOR_DISCOUNT
+        redemptions = Counter(o.discount_code for o in orders if o.discount_code)
+        self.assertTrue(redemptions)
+        self.assertTrue(all(count == 1 for count in redemptions.values()))
+        for o in orders:
+            if o.discount_code:
+                self.assertEqual(o.id % n, 0)
+
+        by_id = {o.id: o for o in orders}
+        for dc in store.discount_codes:
+            if dc.used:
+                self.assertEqual(by_id[dc.redeemed_order_id].discount_code, dc.code)
+            else:
+                self.assertNotIn(dc.code, redemptions)
+        self.assertTrue(store.stats_consistent())
+
+    def test_same_code_contended_is_redeemed_once(self):
+        store = self.make_store()
+        n = settings.NTH_ORDER_FOR_DISCOUNT
+        for i in range(1, n):
+            store.add_to_cart(f"pre{i}", 1, 1)
+            store.place_order(f"pre{i}")
+        code = store.generate_code().code
+
+        def checkout(i):
+            uid = f"race{i}"
+            store.add_to_cart(uid, 3, 1)
+            return store.place_order(uid, discount_code=code)
+
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            orders = list(pool.map(checkout, range(200)))
+
+        self.assertEqual(sum(1 for o in orders if o.discount_code == code), 1)
+
+    def test_concurrent_increments_on_one_cart(self):
+        store = self.make_store()
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            list(pool.map(lambda _: store.add_to_cart("shared", 1, 1), range(1000)))
+        self.assertEqual(store.get_cart("shared")[1], 1000)
+
+
+class SequencerTests(ConcurrencyTests):
+    """
+    The concurrency checks again with orders committed by the single-writer
+    sequencer, plus:
+    - drafts are committed in batches, and one failing draft fails alone
+    - the idle writer exits and the next checkout starts a new one
+    - sequenced orders survive WAL recovery
+    """
+
+    STORE_OPTIONS = {"order_sequencer": True}
+
+    def test_drafts_are_batched(self):
+        store = self.make_store()
+        gate = threading.Event()
+        commit = store._sequencer.commit
+
+        def slow_commit(drafts):
+            gate.wait(5)  # hold the writer so that drafts pile up
+            commit(drafts)
+
+        def checkout(i):
+            store.add_to_cart(f"b{i}", 1, 1)
+            return store.place_order(f"b{i}")
+
+        store._sequencer.commit = slow_commit
+        with ThreadPoolExecutor(max_workers=self.WORKERS) as pool:
+            futures = [pool.submit(checkout, i) for i in range(200)]
+            threading.Timer(0.05, gate.set).start()
+            orders = [f.result() for f in futures]
+        self.assertEqual(sorted(o.id for o in orders), list(range(1, 201)))
+        self.assertLess(store._sequencer.batches, 200)
+        self.assertEqual(store._sequencer.committed, 200)
+        self.assertTrue(store.stats_consistent())
+
+    def test_failed_draft_fails_alone(self):
+        store = self.make_store()
+        store.add_to_cart("huge", 1, 10**18)
+        store.add_to_cart("ok", 1, 1)
+        draft = inmemory.OrderDraft("ok", [], 100, None)
+        huge = inmemory.OrderDraft("huge", [], 10**20, None)
+        with store._lock:
+            store._commit_orders([huge, draft])
+        self.assertIsInstance(huge.error, ValueError)
+        self.assertEqual(draft.order.id, 1)
+        with self.assertRaises(ValueError):
+            store.place_order("huge")
+        self.assertEqual(store.place_order("ok").id, 2)
+        self.assertEqual(store.get_cart("huge"), {1: 10**18})
+        self.assertTrue(store.stats_consistent())
+
+    def test_idle_writer_exits_and_restarts(self):
+        store = self.make_store()
+        store._sequencer.idle_timeout = 0.01
+        store.add_to_cart("a", 1, 1)
+        store.place_order("a")
+        writer = store._sequencer._writer
+        writer.join(timeout=5)
+        self.assertFalse(writer.is_alive())
+        self.assertIsNone(store._sequencer._writer)
+        store.add_to_cart("b", 1, 1)
+        self.assertEqual(store.place_order("b").id, 2)
+
+    def test_sequenced_orders_are_recovered(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(
+                data_dir, snapshot_every=0, order_sequencer=True
+            )
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(
+                    pool.map(
+                        lambda i: (
+                            store.add_to_cart(f"w{i}", 2, 1),
+                            store.place_order(f"w{i}"),
+                        ),
+                        range(50),
+                    )
+                )
+            store.close()
+            reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            self.assertEqual(len(reopened.orders), 50)
+            self.assertEqual(reopened.stats(), store.stats())
+            reopened.close()
+
+
+def _decimal_reference(lines, pct):
+    """
+    The pre-cents Decimal pricing from place_order, kept as the oracle.
+    """
+    D, money = inmemory.D, inmemory.money
+    line_totals = [money(price * D(qty)) for price, qty in lines]
+    subtotal = money(sum(line_totals, D("0.00")))
+    discount = money(subtotal * (D(pct) / D(100))) if pct else D("0.00")
+    return line_totals, subtotal, discount, money(subtotal - discount)
+
+
+class CartTotalsTests(BaseStoreTest):
+    """
+    Verifies the totals kept per cart:
+    - every cart write reprices only its line; reads never reprice
+    - a catalog change reprices the cart on its next read
+    - random cart traffic never drifts from a full reprice
+    - recovery rebuilds the totals
+    """
+
+    def test_reads_do_not_reprice(self):
+        self.assertTrue(views.db.verify_cart_totals)
+        store = inmemory.InMemoryStore()  # without verification, which reprices
+        store.add_to_cart("u", 1, 2)
+        store.set_cart_item("u", 2, 3)
+        store.apply_cart_ops("u", [("add", 3, 1), ("remove", 2, 0)])
+        with mock.patch.object(store, "_price_totals") as reprice:
+            self.assertEqual(store.priced_cart("u"), ([(1, 2), (3, 1)], 240000))
+            reprice.assert_not_called()
+        self.assertEqual(store._cart_totals["u"].lines, {1: 150000, 3: 90000})
+        self.assertEqual(store.priced_cart("nobody"), ([], 0))
+
+        r = self.client.get(reverse("cart"), HTTP_X_USER_ID="nobody")
+        self.assertEqual(J(r), {"items": [], "total": "0.00"})
+
+    def test_catalog_change_reprices(self):
+        views.db.add_to_cart("u", 1, 2)
+        views.db.add_to_cart("u", 2, 1)
+        views.db.products.set_price(2, 40000)
+        r = self.client.get(reverse("cart"), HTTP_X_USER_ID="u")
+        self.assertEqual(J(r)["total"], "1900.00")
+
+        # A write after a price change drops the stale totals, not patches them
+        views.db.products.set_price(1, 10000)
+        views.db.add_to_cart("u", 1, 1)
+        self.assertNotIn("u", views.db._cart_totals)
+        self.assertEqual(views.db.priced_cart("u")[1], 70000)
+
+    def test_random_traffic_matches_reprice(self):
+        store = inmemory.InMemoryStore(verify_cart_totals=True)
+        rng = random.Random(7)
+        users = [f"u{i}" for i in range(5)]
+        for step in range(2000):
+            user, pid = rng.choice(users), rng.randint(1, 3)
+            kind = rng.randrange(6)
+            if kind == 0:
+                store.add_to_cart(user, pid, rng.randint(1, 3))
+            elif kind == 1:
+                store.set_cart_item(user, pid, rng.randint(-1, 4))
+            elif kind == 2:
+                store.remove_cart_item(user, pid)
+            elif kind == 3:
+                ops = [("add", pid, 1), ("set", rng.randint(1, 3), rng.randint(0, 2))]
+                store.apply_cart_ops(user, ops)
+            elif kind == 4 and step % 50 == 0:
+                store.products.set_price(pid, rng.randint(100, 100_000))
+            store.priced_cart(rng.choice(users))  # raises on any drift
+
+        store._cart_totals["u0"] = inmemory.CartTotals(store._totals_epoch)
+        store._cart_totals["u0"].subtotal_cents = 1
+        store.carts.setdefault("u0", {1: 1})
+        with self.assertRaises(AssertionError):
+            store.priced_cart("u0")
+
+    def test_recovery_rebuilds_totals(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            store.add_to_cart("u", 1, 1)
+            store.add_to_cart("v", 2, 2)
+            store.snapshot()
+            store.apply_cart_ops("u", [("add", 3, 2), ("set", 1, 3)])
+            store.remove_cart_item("v", 2)
+            store.close()
+            reopened = inmemory.InMemoryStore.open(
+                data_dir, snapshot_every=0, verify_cart_totals=True
+            )
+            self.assertEqual(reopened.priced_cart("u"), ([(1, 3), (3, 2)], 405000))
+            self.assertEqual(reopened.priced_cart("v"), ([], 0))
+            self.assertEqual(reopened._cart_totals["u"].subtotal_cents, 405000)
+            reopened.close()
+
+
+class PriceChangeTests(BaseStoreTest):
+    """
+    Verifies runtime price changes:
+    - the reverse index follows every cart write, checkout and eviction
+    - only the carts holding the product are repriced, one line each
+    - reads stay exact while a background reprice is still running
+    - quotes survive changes to products they do not hold
+    - the admin endpoint, and durability of changed prices
+    """
+
+    def test_reverse_index_follows_carts(self):
+        store = inmemory.InMemoryStore()
+        store.add_to_cart("a", 1, 1)
+        store.apply_cart_ops("b", [("add", 1, 1), ("set", 2, 2)])
+        store.set_cart_item("c", 2, 1)
+        self.assertEqual(store._carts_by_product, {1: {"a", "b"}, 2: {"b", "c"}})
+        store.remove_cart_item("b", 1)
+        store.place_order("c")
+        store.clear_cart("a")
+        self.assertEqual(store._carts_by_product, {1: set(), 2: {"b"}})
+
+    def test_reprices_only_affected_carts(self):
+        store = inmemory.InMemoryStore(verify_cart_totals=True)
+        for i in range(300):
+            store.add_to_cart(f"u{i}", 1 + i % 3, 1 + i % 2)
+        with mock.patch.object(
+            store, "_price_totals", wraps=store._price_totals
+        ) as reprice, mock.patch.object(
+            store, "_reprice_line", wraps=store._reprice_line
+        ) as line:
+            self.assertEqual(store.set_price(2, 100, background=False), 100)
+            self.assertEqual(line.call_count, 100)
+            reprice.assert_not_called()
+        self.assertEqual(store.priced_cart("u1"), ([(2, 2)], 200))
+        self.assertEqual(store.priced_cart("u0")[1], 75000)
+        self.assertFalse(store._repricing)
+
+        with self.assertRaisesMessage(ValueError, "Unknown product_id"):
+            store.set_price(99, 100)
+        with self.assertRaisesMessage(ValueError, "Price must not be negative"):
+            store.set_price(1, -1)
+
+    def test_direct_catalog_change_before_set_price_reprices(self):
+        store = inmemory.InMemoryStore(verify_cart_totals=True)
+        store.add_to_cart("u", 1, 1)
+        store.add_to_cart("u", 2, 1)
+        store.products.set_price(2, 1)
+        store.set_price(1, 5, background=False)
+        self.assertEqual(store.priced_cart("u")[1], 6)
+
+        # Also when the direct change lands during another product's reprice
+        gate, done = threading.Event(), threading.Event()
+        reprice = store._reprice_carts
+
+        def held(*args):
+            gate.wait(5)
+            reprice(*args)
+            done.set()
+
+        with mock.patch.object(store, "_reprice_carts", held):
+            store.set_price(3, 7)
+        store.products.set_price(2, 2)
+        store.set_price(1, 10, background=False)
+        gate.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(store.priced_cart("u")[1], 12)
+
+    def test_reads_are_exact_during_a_background_reprice(self):
+        store = inmemory.InMemoryStore(verify_cart_totals=True)
+        store.add_to_cart("u", 1, 2)
+        store.add_to_cart("u", 2, 1)
+        gate, done = threading.Event(), threading.Event()
+        reprice = store._reprice_carts
+
+        def held(*args):
+            gate.wait(5)
+            reprice(*args)
+            done.set()
+
+        with mock.patch.object(store, "_reprice_carts", held):
+            store.set_price(1, 1000)
+            self.assertEqual(store._repricing, {1: 1})
+            self.assertEqual(store.priced_cart("u")[1], 2000 + 35000)
+            store.add_to_cart("u", 1, 1)
+            self.assertEqual(store.priced_cart("u")[1], 3000 + 35000)
+            gate.set()
+            self.assertTrue(done.wait(5))
+        self.assertFalse(store._repricing)
+        self.assertEqual(store.priced_cart("u")[1], 3000 + 35000)
+
+    def test_quotes_survive_unrelated_changes(self):
+        store = inmemory.InMemoryStore()
+        store.add_to_cart("q", 1, 1)
+        quote = store.quote("q")
+        store.set_price(2, 100, background=False)
+        with mock.patch.object(store, "_price_cart") as price:
+            self.assertEqual(store.place_order("q", quote=quote).total_cents, 75000)
+            price.assert_not_called()
+
+        store.add_to_cart("q", 1, 1)
+        quote = store.quote("q")
+        store.set_price(1, 100, background=False)
+        self.assertEqual(store.place_order("q", quote=quote).total_cents, 100)
+
+    def test_admin_price_endpoint(self):
+        views.db.add_to_cart("p", 3, 2)
+        url = reverse("admin-product-price", kwargs={"product_id": 3})
+        key = {"HTTP_X_ADMIN_KEY": "supersecret"}
+
+        def put(data, url=url, **headers):
+            return self.client.put(
+                url, data=data, content_type="application/json", **headers
+            )
+
+        self.assertEqual(put({"price": "10.00"}).status_code, 403)
+        r = put({"price": "10.005"}, **key)
+        self.assertEqual(r.status_code, 400)
+        self.assertEqual(put({"price": "-1.00"}, **key).status_code, 400)
+        missing = reverse("admin-product-price", kwargs={"product_id": 99})
+        self.assertEqual(put({"price": "1.00"}, url=missing, **key).status_code, 400)
+
+        r = put({"price": "12.50"}, **key)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(J(r), {"product_id": 3, "price": "12.50", "carts_repriced": 1})
+        products = J(self.client.get(reverse("products")))
+        self.assertEqual(products[2]["price"], "12.50")
+        cart = J(self.client.get(reverse("cart"), HTTP_X_USER_ID="p"))
+        self.assertEqual(cart["total"], "25.00")
+
+    def test_price_changes_are_durable(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            store.add_to_cart("u", 1, 1)
+            store.add_to_cart("u", 2, 1)
+            store.set_price(1, 100, background=False)
+            store.snapshot()
+            store.set_price(2, 200, background=False)
+            store.close()
+            reopened = inmemory.InMemoryStore.open(
+                data_dir, snapshot_every=0, verify_cart_totals=True
+            )
+            self.assertEqual(reopened.products[1].price_cents, 100)
+            self.assertEqual(reopened.products[2].price_cents, 200)
+            self.assertEqual(reopened.priced_cart("u")[1], 300)
+            reopened.close()
+
+
+class DiscountCodePoolTests(BaseStoreTest):
+    """
+    Verifies pooled discount code generation and campaign codes:
+    - codes are base32 and the pool never pools a duplicate or taken code
+    - the pool refills in the background below its watermark
+    - campaign codes are unique, single-use and redeemable on any order
+    - the bulk admin endpoint, and durability of issued codes
+    """
+
+    def test_pool_skips_duplicates_and_taken_codes(self):
+        codes = codepool.random_codes(1000)
+        self.assertTrue(all(len(c) == 8 and c.isalnum() for c in codes))
+        self.assertFalse(set("".join(codes)) - set("ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"))
+
+        pool = codepool.CodePool({"TAKEN000"}.__contains__, size=0, refill_at=0)
+        batches = iter([["AAAAAAAA", "AAAAAAAA", "TAKEN000"], ["BBBBBBBB"]])
+        with mock.patch.object(codepool, "random_codes", lambda n: next(batches)):
+            self.assertEqual(pool.take(2), ["AAAAAAAA", "BBBBBBBB"])
+        self.assertEqual(pool.collisions, 2)
+        self.assertEqual(len(pool), 0)
+
+    def test_pool_refills_below_watermark(self):
+        pool = codepool.CodePool(lambda code: False, size=100, refill_at=50, chunk=30)
+        self.assertEqual(len(pool.take(10)), 10)
+        for _ in range(500):
+            if len(pool) == 100 and not pool._refilling:
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(len(pool), 100)
+        pool.take(40)
+        self.assertEqual(len(pool), 60)  # above the watermark: no refill
+        self.assertFalse(pool._refilling)
+
+    def test_campaign_codes_redeem_on_any_order(self):
+        store = inmemory.InMemoryStore(code_pool_size=0)
+        codes = [dc.code for dc in store.issue_codes(3, discount_pct=20)]
+        self.assertEqual(len(set(codes)), 3)
+        self.assertIsNone(store.active_code)
+
+        store.add_to_cart("c", 1, 1)
+        order = store.place_order("c", discount_code=codes[0])
+        self.assertEqual(order.id, 1)
+        self.assertEqual(order.discount_cents, 15000)
+        self.assertFalse(store.validate_discount(codes[0]))
+        self.assertTrue(store.validate_discount(codes[1]))
+        stats = store.stats()
+        self.assertEqual(stats["campaign_codes"], {"issued": 3, "redeemed": 1})
+        self.assertEqual(stats["discount_codes"], [])
+
+        # The Nth-order code keeps its own rules alongside
+        for i in range(2, settings.NTH_ORDER_FOR_DISCOUNT):
+            store.add_to_cart(f"c{i}", 1, 1)
+            store.place_order(f"c{i}")
+        nth = store.generate_code().code
+        store.add_to_cart("c", 1, 1)
+        store.place_order("c", discount_code=codes[1])
+        self.assertEqual(store.active_code, nth)
+
+        with self.assertRaisesMessage(ValueError, "Count must be positive"):
+            store.issue_codes(0)
+        with self.assertRaisesMessage(ValueError, "between 1 and 100"):
+            store.issue_codes(1, discount_pct=101)
+
+    def test_issued_codes_never_repeat(self):
+        store = inmemory.InMemoryStore(code_pool_size=10)
+        (first,) = store.issue_codes(1)
+        # A code issued since it was pooled, e.g. by another process
+        store._code_pool._ready.appendleft(first.code)
+        codes = [dc.code for dc in store.issue_codes(5)]
+        self.assertEqual(len(set(codes)), 5)
+        self.assertNotIn(first.code, codes)
+        self.assertEqual(len(store._codes_by_code), 6)
+
+    def test_bulk_endpoint(self):
+        url = reverse("admin-bulk-discount-codes")
+        key = {"HTTP_X_ADMIN_KEY": "supersecret"}
+
+        def post(data, **headers):
+            return self.client.post(
+                url, data=data, content_type="application/json", **headers
+            )
+
+        self.assertEqual(post({"count": 1}).status_code, 403)
+        self.assertEqual(post({"count": 0}, **key).status_code, 400)
+        self.assertEqual(post({"count": 100_001}, **key).status_code, 400)
+        self.assertEqual(post({"count": 1, "discount_pct": 0}, **key).status_code, 400)
+
+        r = post({"count": 500, "discount_pct": 15}, **key)
+        self.assertEqual(r.status_code, 201)
+        body = J(r)
+        self.assertEqual((body["count"], body["discount_pct"]), (500, 15))
+        self.assertEqual(len(set(body["codes"])), 500)
+
+        views.db.add_to_cart("b", 2, 2)
+        r = self.client.post(
+            reverse("checkout"),
+            data={"discount_code": body["codes"][0]},
+            content_type="application/json",
+            HTTP_X_USER_ID="b",
+        )
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(J(r)["discount"], "105.00")
+        stats = J(self.client.get(reverse("admin-stats"), **key))
+        self.assertEqual(stats["campaign_codes"], {"issued": 500, "redeemed": 1})
+
+    def test_campaign_codes_are_durable(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            snapshotted = [dc.code for dc in store.issue_codes(3)]
+            store.add_to_cart("d", 1, 1)
+            store.place_order("d", discount_code=snapshotted[0])
+            store.snapshot()
+            logged = [dc.code for dc in store.issue_codes(2, discount_pct=50)]
+            store.close()
+
+            reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            self.assertEqual(
+                [dc.code for dc in reopened.campaign_codes], snapshotted + logged
+            )
+            self.assertEqual(reopened._find_code(logged[0]).discount_pct, 50)
+            self.assertFalse(reopened.validate_discount(snapshotted[0]))
+            self.assertTrue(reopened.validate_discount(snapshotted[1]))
+            self.assertEqual(
+                reopened.stats()["campaign_codes"], {"issued": 5, "redeemed": 1}
+            )
+            reopened.close()
+
+
+class CartEvictionTests(BaseStoreTest):
+    """
+    Verifies cart memory stays bounded:
+    - reads and no-op deletes never allocate a cart; empty carts are dropped
+    - idle carts expire after cart_ttl, a few per cart write
+    - max_carts keeps only the most recently used carts
+    - evictions are logged, so recovery does not resurrect them
+    """
+
+    def make_store(self, **kwargs):
+        store = inmemory.InMemoryStore(**kwargs)
+        self.now = 0.0
+        store._clock = lambda: self.now
+        return store
+
+    def test_read_paths_do_not_allocate(self):
+        views.db.cart_snapshot("ghost")
+        views.db.get_cart("ghost")
+        views.db.remove_cart_item("ghost", 1)
+        views.db.set_cart_item("ghost", 1, 0)
+        self.client.get(reverse("cart"), HTTP_X_USER_ID="ghost-http")
+        self.client.delete(
+            reverse("cart-item", kwargs={"product_id": 1}),
+            HTTP_X_USER_ID="ghost-http",
+        )
+        self.assertEqual(len(views.db.carts), 0)
+
+        views.db.add_to_cart("u1", 1, 1)
+        views.db.remove_cart_item("u1", 1)
+        self.assertNotIn("u1", views.db.carts)
+        views.db.add_to_cart("u2", 1, 1)
+        views.db.place_order("u2")
+        self.assertNotIn("u2", views.db.carts)
+
+    def test_idle_carts_expire_in_amortized_batches(self):
+        store = self.make_store(cart_ttl=60)
+        for i in range(10):
+            store.add_to_cart(f"idle{i}", 1, 1)
+        self.now = 30
+        store.cart_snapshot("idle0")  # a read keeps the cart alive
+        self.now = 61
+        store.add_to_cart("active", 2, 1)
+        self.assertEqual(store.cart_stats()["evicted_idle"], inmemory.CART_EVICT_BATCH)
+
+        for _ in range(3):
+            store.add_to_cart("active", 2, 1)
+        self.assertEqual(sorted(store.carts), ["active", "idle0"])
+        self.assertEqual(store.cart_stats()["evicted_idle"], 9)
+
+    def test_max_carts_keeps_most_recently_used(self):
+        store = self.make_store(max_carts=3)
+        for i in range(10):
+            store.add_to_cart(f"u{i}", 1, 1)
+            self.now += 1
+        self.assertEqual(list(store.carts), ["u7", "u8", "u9"])
+        self.assertEqual(
+            store.cart_stats(), {"active": 3, "evicted_idle": 0, "evicted_lru": 7}
+        )
+
+        store.set_cart_item("u7", 2, 1)  # now most recent
+        store.add_to_cart("new", 1, 1)
+        self.assertEqual(list(store.carts), ["u9", "u7", "new"])
+
+    def test_evictions_survive_recovery(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(
+                data_dir, fsync_batch=1, fsync_interval=0, snapshot_every=0, max_carts=2
+            )
+            for uid in ("a", "b", "c"):
+                store.add_to_cart(uid, 1, 1)
+            store.close()
+
+            reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            self.assertEqual(list(reopened.carts), ["b", "c"])
+            reopened.close()
+
+    def test_admin_stats_expose_eviction_counters(self):
+        r = self.client.get(
+            reverse("admin-stats"), HTTP_X_ADMIN_KEY=settings.ADMIN_API_KEY
+        )
+        self.assertEqual(
+            J(r)["carts"], {"active": 0, "evicted_idle": 0, "evicted_lru": 0}
+        )
+
+
+class MoneyEngineTests(TestCase):
+    """
+    Property-style checks (seeded random sampling) that the integer-cents
+    engine matches the original Decimal ROUND_HALF_UP arithmetic exactly.
+    """
+
+    SAMPLES = 2000
+
+    def test_percent_of_matches_decimal(self):
+        rng = random.Random(1234)
+        D, money = inmemory.D, inmemory.money
+        for _ in range(self.SAMPLES):
+            amount = rng.choice([rng.randint(0, 10**9), rng.randint(0, 200)])
+            pct = rng.randint(0, 100)
+            expected = money(inmemory.from_cents(amount) * (D(pct) / D(100)))
+            self.assertEqual(
+                inmemory.from_cents(inmemory.percent_of(amount, pct)),
+                expected,
+                (amount, pct),
+            )
+        # exact half-cent ties round up
+        self.assertEqual(inmemory.percent_of(5, 10), 1)
+        self.assertEqual(inmemory.percent_of(15, 10), 2)
+        self.assertEqual(inmemory.percent_of(-5, 10), -1)
+
+    def test_cents_round_trip(self):
+        rng = random.Random(99)
+        for _ in range(self.SAMPLES):
+            cents = rng.randint(0, 10**12)
+            self.assertEqual(inmemory.to_cents(inmemory.from_cents(cents)), cents)
+        self.assertEqual(inmemory.to_cents("10.005"), 1001)
+        self.assertEqual(inmemory.to_cents(inmemory.D("750")), 75000)
+
+    @override_settings(NTH_ORDER_FOR_DISCOUNT=1)
+    def test_place_order_matches_decimal_reference(self):
+        rng = random.Random(2024)
+        for i in range(300):
+            store = inmemory.InMemoryStore()
+            for pid in list(store.products):
+                store.products.set_price(pid, rng.randint(1, 10**7))
+            lines = {
+                pid: rng.randint(1, 50)
+                for pid in rng.sample(sorted(store.products), rng.randint(1, 3))
+            }
+            for pid, qty in lines.items():
+                store.add_to_cart("prop", pid, qty)
+
+            pct = rng.randint(1, 100)
+            use_code = bool(i % 2)
+            with override_settings(DISCOUNT_PERCENT=pct):
+                code = store.generate_code().code if use_code else None
+            order = store.place_order("prop", discount_code=code)
+
+            line_totals, subtotal, discount, total = _decimal_reference(
+                [(store.products[pid].price, qty) for pid, qty in lines.items()],
+                pct if use_code else 0,
+            )
+            self.assertEqual([oi.line_total for oi in order.items], line_totals)
+            self.assertEqual(order.subtotal, subtotal)
+            self.assertEqual(order.discount, discount)
+            self.assertEqual(order.total, total)
+            self.assertEqual(OrderSerializer(order).data["total"], f"{total:.2f}")
+
+
+class OrderLedgerTests(TestCase):
+    """
+    Verifies the columnar order ledger round-trips orders exactly.
+    """
+
+    def test_orders_materialize_identically(self):
+        store = inmemory.InMemoryStore()
+        placed = []
+        for i in range(5):
+            uid = f"ledger{i % 2}"
+            store.add_to_cart(uid, 1, i + 1)
+            store.add_to_cart(uid, 3, 1)
+            placed.append(store.place_order(uid))
+
+        self.assertEqual(len(store.orders), 5)
+        self.assertEqual(
+            [OrderSerializer(o).data for o in store.orders],
+            [OrderSerializer(o).data for o in placed],
+        )
+        self.assertEqual(store.orders[-1].id, 5)
+        self.assertEqual([o.id for o in store.orders[1:3]], [2, 3])
+        with self.assertRaises(IndexError):
+            store.orders[5]
+
+    def test_out_of_range_amount_leaves_ledger_unchanged(self):
+        store = inmemory.InMemoryStore()
+        store.add_to_cart("huge", 1, 10**18)
+        with self.assertRaises(ValueError):
+            store.place_order("huge")
+        self.assertEqual(len(store.orders), 0)
+        self.assertEqual(store.next_order_number(), 1)
+        self.assertTrue(store.stats_consistent())
+
+
+@override_settings(ADMIN_API_KEY="test-key")
+class MetricsTests(BaseStoreTest):
+    """
+    Verifies request metrics and GET /api/admin/metrics/:
+    - counts, 5xx errors and latency histograms per URL name and method
+    - per-thread accumulators merge on scrape and outlive their threads
+    - the endpoint needs the admin key and reports store gauges
+    """
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.object(
+            metrics, "request_metrics", metrics.RequestMetrics()
+        )
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scrape(self):
+        r = self.client.get(reverse("admin-metrics"), HTTP_X_ADMIN_KEY="test-key")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return r.content.decode()
+
+    def test_requests_are_recorded_per_url_name(self):
+        self.client.get(reverse("cart"), HTTP_X_USER_ID="m")
+        self.client.get(reverse("cart"), HTTP_X_USER_ID="m")
+        self.client.post(
+            reverse("cart-add"),
+            {"product_id": 1, "quantity": 1},
+            content_type="application/json",
+            HTTP_X_USER_ID="m",
+        )
+        self.client.get("/api/no-such-endpoint/")
+        self.client.raise_request_exception = False
+        with mock.patch.object(views.CartView, "get", side_effect=RuntimeError):
+            self.assertEqual(self.client.get(reverse("cart")).status_code, 500)
+
+        text = self.scrape()
+        self.assertIn('store_http_requests_total{view="cart",method="GET"} 3', text)
+        self.assertIn(
+            'store_http_requests_total{view="cart-add",method="POST"} 1', text
+        )
+        self.assertIn(
+            'store_http_requests_total{view="unresolved",method="GET"} 1', text
+        )
+        self.assertIn(
+            'store_http_request_errors_total{view="cart",method="GET"} 1', text
+        )
+        self.assertIn(
+            'store_http_request_errors_total{view="cart-add",method="POST"} 0', text
+        )
+        self.assertIn(
+            'store_http_request_duration_seconds_bucket{view="cart",method="GET",'
+            'le="+Inf"} 3',
+            text,
+        )
+        self.assertIn(
+            'store_http_request_duration_seconds_count{view="cart",method="GET"} 3',
+            text,
+        )
+        self.assertIn("store_carts 1\n", text)
+        self.assertIn("store_orders 0\n", text)
+        self.assertIn("store_discount_codes 0\n", text)
+        self.assertIn(f"store_products {len(views.db.products)}\n", text)
+
+    def test_metrics_require_admin_key(self):
+        r = self.client.get(reverse("admin-metrics"))
+        self.assertEqual(r.status_code, 403)
+        r = self.client.get(reverse("admin-metrics"), HTTP_X_ADMIN_KEY="wrong")
+        self.assertEqual(r.status_code, 403)
+
+    def test_histogram_buckets_are_cumulative(self):
+        for seconds in (0.0001, 0.001, 0.003, 20):
+            self.registry.observe("v", "GET", 200, seconds)
+        text = metrics.render_metrics({})
+        bucket = 'store_http_request_duration_seconds_bucket{view="v",method="GET",le="%s"} %d'
+        self.assertIn(bucket % ("0.0005", 1), text)
+        self.assertIn(bucket % ("0.001", 2), text)  # upper bounds are inclusive
+        self.assertIn(bucket % ("0.005", 3), text)
+        self.assertIn(bucket % ("10.0", 3), text)
+        self.assertIn(bucket % ("+Inf", 4), text)
+        self.assertIn(
+            'store_http_request_duration_seconds_sum{view="v",method="GET"} 20.0041',
+            text,
+        )
+
+    def test_thread_accumulators_merge_and_outlive_threads(self):
+        registry = metrics.RequestMetrics()
+
+        def work():
+            for _ in range(250):
+                registry.observe("cart", "GET", 200, 0.001)
+            registry.observe("cart", "GET", 503, 0.001)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        for _ in range(2):  # retired rows are counted once, scrape after scrape
+            row = registry.snapshot()[("cart", "GET")]
+            self.assertEqual(row[0], 1004)
+            self.assertEqual(row[1], 4)
+        registry.observe("cart", "GET", 200, 0.001)
+        self.assertEqual(registry.snapshot()[("cart", "GET")][0], 1005)
+
+    async def test_async_middleware(self):
+        async def view(request):
+            return HttpResponse(status=201)
+
+        middleware = metrics.RequestMetricsMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        r = await middleware(AsyncRequestFactory().post("/x/"))
+        self.assertEqual(r.status_code, 201)
+        self.assertEqual(self.registry.snapshot()[("unresolved", "POST")][0], 1)
+
+
+class OrderHistoryTests(BaseStoreTest):
+    """
+    Verifies the per-user order index and the /api/orders/ endpoints:
+    - history is newest first, cursor-paginated and scoped to the caller
+    - order lookup by id, hiding other users' orders
+    - the index is rebuilt from a snapshot
+    """
+
+    def place(self, user_id, qty=1):
+        views.db.add_to_cart(user_id, 1, qty)
+        return views.db.place_order(user_id)
+
+    def test_history_is_paginated_newest_first(self):
+        mine = []
+        for i in range(7):
+            mine.append(self.place("hist-a", i + 1).id)
+            self.place("hist-b")
+        seen, params = [], {"limit": 3}
+        while True:
+            r = self.client.get(reverse("orders"), params, HTTP_X_USER_ID="hist-a")
+            self.assertEqual(r.status_code, 200)
+            seen.extend(o["id"] for o in J(r))
+            if "X-Next-Cursor" not in r.headers:
+                break
+            params = {"limit": 3, "cursor": r.headers["X-Next-Cursor"]}
+        self.assertEqual(seen, mine[::-1])
+        self.assertEqual(len(seen), 7)
+        self.assertTrue(all(o["user_id"] == "hist-a" for o in J(r)))
+
+        r = self.client.get(reverse("orders"), HTTP_X_USER_ID="nobody")
+        self.assertEqual(J(r), [])
+        r = self.client.get(reverse("orders"), {"cursor": 0}, HTTP_X_USER_ID="hist-a")
+        self.assertEqual(r.status_code, 400)
+
+    def test_order_detail_is_scoped_to_owner(self):
+        order = self.place("owner", 2)
+        url = reverse("order-detail", kwargs={"order_id": order.id})
+        r = self.client.get(url, HTTP_X_USER_ID="owner")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(J(r), OrderSerializer(order).data)
+
+        self.assertEqual(self.client.get(url, HTTP_X_USER_ID="other").status_code, 404)
+        missing = reverse("order-detail", kwargs={"order_id": 999})
+        self.assertEqual(
+            self.client.get(missing, HTTP_X_USER_ID="owner").status_code, 404
+        )
+
+    def test_index_survives_snapshot_reload(self):
+        with tempfile.TemporaryDirectory() as data_dir:
+            store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            for i in range(6):
+                store.add_to_cart(f"snap{i % 2}", 1, 1)
+                store.place_order(f"snap{i % 2}")
+            store.snapshot()
+            store.close()
+
+            reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+            self.assertEqual([o.id for o in reopened.user_orders("snap1")], [6, 4, 2])
+            self.assertEqual(
+                [o.id for o in reopened.user_orders("snap0", before=5, limit=1)], [3]
+            )
+            self.assertEqual(reopened.get_order(4).user_id, "snap1")
+            self.assertIsNone(reopened.get_order(7))
+            reopened.close()
+
+
+class SalesRollupTests(BaseStoreTest):
+    """
+    Verifies windowed stats from the minute/hour/day rollup buckets:
+    - orders land in the right buckets and windows sum them
+    - granularity defaults to the finest one retained for the range
+    - ring slots from an earlier lap are never counted
+    - rollups are rebuilt from a snapshot
+    """
+
+    T0 = datetime(2030, 1, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        super().setUp()
+        self.admin = {"HTTP_X_ADMIN_KEY": settings.ADMIN_API_KEY}
+        self.now = self.T0
+        patcher = mock.patch.object(inmemory.timezone, "now", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def order_at(self, store, minutes, qty=1):
+        self.now = self.T0 + timedelta(minutes=minutes)
+        store.add_to_cart("roll", 2, qty)
+        return store.place_order("roll")
+
+    def window(self, **params):
+        r = self.client.get(reverse("admin-stats"), params, **self.admin)
+        return r.status_code, J(r)
+
+    def test_window_sums_buckets(self):
+        for minutes, qty in ((0, 1), (0.5, 2), (5, 3), (90, 4)):
+            self.order_at(views.db, minutes, qty)
+        self.now = self.T0 + timedelta(hours=2)
+
+        code, body = self.window(
+            **{"from": "2030-01-01T12:00:00Z", "to": "2030-01-01T12:10:00Z"}
+        )
+        self.assertEqual(code, 200)
+        window = body["window"]
+        self.assertEqual(window["granularity"], "minute")
+        self.assertEqual(window["order_count"], 3)
+        self.assertEqual(window["items_purchased"], 6)
+        self.assertEqual(window["gross_amount"], "2100.00")
+        self.assertEqual(
+            [(b["start"], b["order_count"]) for b in window["buckets"]],
+            [("2030-01-01T12:00:00Z", 2), ("2030-01-01T12:05:00Z", 1)],
+        )
+        # All-time totals are unchanged by the window
+        self.assertEqual(body["items_purchased"], 10)
+
+        code, body = self.window(
+            **{"from": "2030-01-01T12:30:00", "granularity": "hour"}
+        )
+        window = body["window"]
+        self.assertEqual(
+            (window["start"], window["end"]),
+            ("2030-01-01T12:00:00Z", "2030-01-01T14:00:00Z"),
+        )
+        self.assertEqual([b["order_count"] for b in window["buckets"]], [3, 1])
+
+    def test_default_granularity_follows_retention(self):
+        self.now = self.T0
+        for days, expected in ((0.5, "minute"), (2, "hour"), (100, "day")):
+            start = (self.T0 - timedelta(days=days)).isoformat()
+            code, body = self.window(**{"from": start})
+            self.assertEqual(code, 200)
+            self.assertEqual(body["window"]["granularity"], expected)
+
+        too_old = (self.T0 - timedelta(days=2)).isoformat()
+        code, body = self.window(**{"from": too_old, "granularity": "minute"})
+        self.assertEqual(code, 400)
+
+    def test_invalid_window_params(self):
+        for params in (
+            {"from": "yesterday"},
+            {"to": "2030-01-01T00:00:00Z"},
+            {"from": "2030-01-01T12:00:00Z", "to": "2030-01-01T11:00:00Z"},
+            {"from": "2030-01-01T11:00:00Z", "granularity": "week"},
+        ):
+            code, body = self.window(**params)
+            self.assertEqual(code, 400, params)
+            self.assertIn("detail", body)
+
+        # Ranges running past now are cut off one bucket after it
+        for params, end in (
+            (
+                {
+                    "from": "2030-01-01T00:00:00Z",
+                    "to": "9999-12-31T23:59:59Z",
+                    "granularity": "day",
+                },
+                "2030-01-03T00:00:00Z",
+            ),
+            (
+                {"from": "9999-12-31T00:00:00Z", "to": "9999-12-31T23:59:59Z"},
+                "2030-01-01T12:01:00Z",
+            ),
+        ):
+            code, body = self.window(**params)
+            self.assertEqual(code, 200, params)
+            self.assertEqual(body["window"]["end"], end)
+            self.assertEqual(body["window"]["order_count"], 0)
+
+    def test_ring_ignores_slots_from_earlier_laps(self):
+        ring = rollups.BucketRing(60, 3)
+        ring.add(0, (1, 1, 100, 0, 100))
+        ring.add(5 * 60 * 10**6, (1, 2, 200, 0, 200))  # reuses minute 0's slot
+        ring.add(0, (1, 1, 100, 0, 100))  # too old now, dropped
+        self.assertEqual(
+            list(ring.buckets(0, 10 * 60 * 10**6)),
+            [(5 * 60 * 10**6, (1, 2, 200, 0, 200))],
+        )
+
+    def test_rollups_rebuilt_from_snapshot(self):
+        start, end = self.T0, self.T0 + timedelta(hours=3)
+        # Snapshots carry the rings; older ones without them are rebuilt
+        for saved in (True, False):
+            with tempfile.TemporaryDirectory() as data_dir:
+                store = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+                for minutes in (0, 1, 61, 62, 63):
+                    self.order_at(store, minutes)
+                with ExitStack() as stack:
+                    if not saved:
+                        stack.enter_context(
+                            mock.patch.object(
+                                rollups.SalesRollup, "to_columns", return_value={}
+                            )
+                        )
+                    store.snapshot()
+                self.order_at(store, 64)  # WAL tail
+                before = store.sales_window(start, end)
+                store.close()
+
+                with mock.patch.object(
+                    inmemory.OrderLedger,
+                    "rollup_rows",
+                    wraps=inmemory.OrderLedger.rollup_rows,
+                    autospec=True,
+                ) as rebuild:
+                    reopened = inmemory.InMemoryStore.open(data_dir, snapshot_every=0)
+                self.assertEqual(rebuild.called, not saved)
+                self.assertEqual(reopened.sales_window(start, end), before)
+                self.assertEqual(before["order_count"], 6)
+                reopened.close()
+
+
+class DurabilityTests(TestCase):
+    """
+    Verifies the optional WAL + snapshot mode:
+    - WAL-only recovery restores carts, orders, codes and aggregates
+    - snapshot + WAL tail recovery is equivalent and prunes old segments
+    - a torn final WAL line is ignored
+    """
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.data_dir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def open_store(self):
+        return inmemory.InMemoryStore.open(
+            self.data_dir, fsync_batch=8, fsync_interval=0, snapshot_every=0
+        )
+
+    def populate(self, store, prefix, orders):
+        for i in range(orders):
+            uid = f"{prefix}{i}"
+            store.add_to_cart(uid, 1, 1 + i % 3)
+            store.add_to_cart(uid, 2, 1)
+            store.set_cart_item(uid, 3, 2)
+            store.remove_cart_item(uid, 2)
+            if store.eligible_now() and not store.has_active_code():
+                store.generate_code()
+            store.place_order(uid, discount_code=store.active_code)
+        store.add_to_cart(f"{prefix}-open", 3, 4)
+
+    def state(self, store):
+        return (
+            store.stats(),
+            [OrderSerializer(o).data for o in store.orders],
+            {u: c for u, c in store.carts.items() if c},
+            store.active_code,
+        )
+
+    def test_wal_only_recovery(self):
+        store = self.open_store()
+        self.populate(store, "w", 2 * settings.NTH_ORDER_FOR_DISCOUNT + 1)
+        before = self.state(store)
+        store.close()
+
+        recovered = self.open_store()
+        self.assertEqual(self.state(recovered), before)
+        self.assertTrue(recovered.stats_consistent())
+        self.assertEqual(
+            recovered.next_order_number(), 2 * settings.NTH_ORDER_FOR_DISCOUNT + 2
+        )
+        recovered.close()
+
+    def test_snapshot_plus_tail_recovery(self):
+        store = self.open_store()
+        self.populate(store, "a", 7)
+        store.snapshot()
+        self.populate(store, "b", 4)
+        before = self.state(store)
+        store.close()
+
+        self.assertTrue(
+            os.path.exists(os.path.join(self.data_dir, persistence.SNAPSHOT_NAME))
+        )
+        self.assertEqual(persistence.list_segments(self.data_dir), [2])
+
+        recovered = self.open_store()
+        self.assertEqual(self.state(recovered), before)
+        self.assertTrue(recovered.stats_consistent())
+        recovered.close()
+
+    def test_torn_wal_tail_is_ignored(self):
+        store = self.open_store()
+        self.populate(store, "t", 3)
+        before = self.state(store)
+        segment = store._wal.segment
+        store.close()
+
+        with open(os.path.join(self.data_dir, f"wal.{segment:06d}.log"), "ab") as f:
+            f.write(b'{"op":"add","u":"torn","p"')
+
+        recovered = self.open_store()
+        self.assertEqual(self.state(recovered), before)
+        recovered.close()
+
+
+def _shared_worker(name, worker, orders):
+    """
+    Runs in a child process: attach to the shared store and place orders.
+    """
+    from store.backends import SharedMemoryStore
+
+    store = SharedMemoryStore(name, capacity=1 << 20)
+    for i in range(orders):
+        uid = f"w{worker}-{i}"
+        store.add_to_cart(uid, 1 + i % 3, 1)
+        if store.eligible_now() and not store.has_active_code():
+            try:
+                store.generate_code()
+            except ValueError:
+                pass
+        store.place_order(uid, discount_code=store.active_code)
+    store.add_to_cart("shared-cart", 1, 1)
+    store.close()
+
+
+@unittest.skipUnless(hasattr(os, "fork"), "requires fork()")
+class SharedMemoryBackendTests(TestCase):
+    """
+    Verifies that worker processes attached to one SharedMemoryStore share
+    a single order sequence, cart set and discount state.
+    """
+
+    WORKERS = 4
+    ORDERS = 40
+
+    def setUp(self):
+        from store.backends import SharedMemoryStore
+
+        self.name = f"ecom_test_{uuid.uuid4().hex[:12]}"
+        self.store = SharedMemoryStore(self.name, capacity=1 << 20)
+
+    def tearDown(self):
+        self.store.unlink()
+        self.store.close()
+
+    def test_workers_share_order_sequence_and_carts(self):
+        ctx = multiprocessing.get_context("fork")
+        procs = [
+            ctx.Process(target=_shared_worker, args=(self.name, w, self.ORDERS))
+            for w in range(self.WORKERS)
+        ]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        self.store.sync()
+        total = self.WORKERS * self.ORDERS
+        self.assertEqual([o.id for o in self.store.orders], list(range(1, total + 1)))
+        self.assertEqual(self.store.get_cart("shared-cart"), {1: self.WORKERS})
+
+        n = settings.NTH_ORDER_FOR_DISCOUNT
+        redeemed = [o for o in self.store.orders if o.discount_code]
+        self.assertTrue(redeemed)
+        self.assertTrue(all(o.id % n == 0 for o in redeemed))
+        self.assertEqual(len({o.discount_code for o in redeemed}), len(redeemed))
+        self.assertTrue(self.store.stats_consistent())
+
+    def test_compaction_preserves_state(self):
+        from store.backends import SharedMemoryStore
+
+        small = SharedMemoryStore(f"{self.name}_small", capacity=4096)
+        try:
+            for i in range(200):
+                small.add_to_cart("churn", 1, 1)
+                small.set_cart_item("churn", 2, i + 1)
+                small.remove_cart_item("churn", 1)
+            small.place_order("churn")
+            before = (small.get_cart("churn"), small.stats(), small._generation)
+
+            other = SharedMemoryStore(f"{self.name}_small")
+            self.assertGreater(before[2], 0)
+            self.assertEqual(other.stats(), before[1])
+            self.assertEqual(other.next_order_number(), 2)
+            other.close()
+        finally:
+            small.unlink()
+            small.close()
+
+    def test_price_changes_reach_every_replica(self):
+        from store.backends import SharedMemoryStore
+
+        other = SharedMemoryStore(self.name)
+        try:
+            other.add_to_cart("p", 1, 2)
+            self.assertEqual(other.priced_cart("p")[1], 150000)
+            self.assertEqual(self.store.set_price(1, 1000), 1)
+            self.assertEqual(other.priced_cart("p")[1], 2000)
+            self.assertEqual(other.products[1].price_cents, 1000)
+        finally:
+            other.close()
+
+    def test_listings_follow_price_changes_of_other_replicas(self):
+        from store.backends import SharedMemoryStore
+
+        other = SharedMemoryStore(self.name)
+        db = views.db
+        views.db = other  # this worker serves the listings
+        try:
+            r = self.client.get(reverse("products"))
+            self.assertEqual(J(r)[0]["price"], "750.00")
+            self.store.set_price(1, 12345)
+            r = self.client.get(reverse("products"), HTTP_IF_NONE_MATCH=r["ETag"])
+            self.assertEqual(r.status_code, 200)
+            self.assertEqual(J(r)[0]["price"], "123.45")
+            r = self.client.get(reverse("product-search"), {"q": J(r)[0]["name"]})
+            self.assertEqual(J(r)[0]["price"], "123.45")
+        finally:
+            views.db = db
+            other.close()
+
+    def test_campaign_codes_reach_every_replica(self):
+        from store.backends import SharedMemoryStore
+
+        small = SharedMemoryStore(f"{self.name}_small", capacity=1 << 14)
+        try:
+            codes = [dc.code for dc in small.issue_codes(1000)]
+            small.add_to_cart("c", 1, 1)
+            small.place_order("c", discount_code=codes[0])
+            for i in range(200):  # force a compaction
+                small.set_cart_item("churn", 2, i + 1)
+            self.assertGreater(small._generation, 0)
+
+            other = SharedMemoryStore(f"{self.name}_small")
+            other.sync()
+            self.assertEqual([dc.code for dc in other.campaign_codes], codes)
+            self.assertFalse(other.validate_discount(codes[0]))
+            self.assertTrue(other.validate_discount(codes[1]))
+            more = [dc.code for dc in other.issue_codes(10)]
+            self.assertFalse(set(more) & set(codes))
+            self.assertEqual(small.stats()["campaign_codes"]["issued"], 1010)
+            other.close()
+        finally:
+            small.unlink()
+            small.close()
+
+
+class HealthTests(TestCase):
+    def test_health(self):
+        resp = self.client.get(reverse("health"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(json.loads(resp.content.decode()), {"status": "ok"})
+
+
+class ProductAPITests(TestCase):
+    """
+    Verifies the public product catalog is exposed and shaped correctly.
+    """
+
+    def test_get_products(self):
+        resp = self.client.get(reverse("products"))
+        self.assertEqual(resp.status_code, 200)
+
+        data = json.loads(resp.content.decode())
+
+        # Basic shape checks
+        self.assertIsInstance(data, list)
+        self.assertGreaterEqual(len(data), 1)
+        for item in data:
+            self.assertIn("id", item)
+            self.assertIn("name", item)
+            self.assertIn("price", item)
+
+            # price should be a stringified decimal with two places
+            self.assertRegex(item["price"], r"^\d+\.\d{2}$")
+
+
+class ProductPaginationTests(BaseStoreTest):
+    """
+    Cursor pagination over a larger catalog.
+    """
+
+    def setUp(self):
+        super().setUp()
+        rows = [(pid, f"Product {pid}", pid * 100) for pid in range(1, 251)]
+        views.db = inmemory.InMemoryStore(catalog=catalog.ProductCatalog(rows))
+
+    def test_walks_every_product_once_via_next_cursor(self):
+        seen, url = [], reverse("products") + "?limit=100"
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            seen.extend(p["id"] for p in J(resp))
+            cursor = resp.headers.get("X-Next-Cursor")
+            url = (
+                reverse("products") + f"?cursor={cursor}&limit=100" if cursor else None
+            )
+        self.assertEqual(seen, list(range(1, 251)))
+
+    def test_next_link_and_last_page(self):
+        resp = self.client.get(reverse("products"), {"cursor": 200, "limit": 25})
+        self.assertEqual([p["id"] for p in J(resp)], list(range(201, 226)))
+        self.assertEqual(resp.headers["X-Next-Cursor"], "225")
+        self.assertIn("cursor=225&limit=25", resp.headers["Link"])
+        self.assertIn('rel="next"', resp.headers["Link"])
+
+        resp = self.client.get(reverse("products"), {"cursor": 225, "limit": 25})
+        self.assertEqual(len(J(resp)), 25)
+        self.assertNotIn("X-Next-Cursor", resp.headers)
+
+    def test_default_and_max_page_size(self):
+        resp = self.client.get(reverse("products"))
+        self.assertEqual(len(J(resp)), views.PRODUCTS_PAGE_SIZE)
+        resp = self.client.get(reverse("products"), {"limit": 10**6})
+        self.assertEqual(len(J(resp)), 250)
+
+    def test_invalid_params_are_rejected(self):
+        for params in ({"cursor": "abc"}, {"limit": 0}, {"cursor": -1}):
+            resp = self.client.get(reverse("products"), params)
+            self.assertEqual(resp.status_code, 400, params)
+            self.assertIn("detail", J(resp))
+
+
+class CatalogLoaderTests(TestCase):
+    """
+    Streaming catalog file loading and the columnar product table.
+    """
+
+    def _write(self, suffix, text):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_loads_csv_and_jsonl(self):
+        csv_path = self._write(".csv", "id,name,price\n2,Dates,3.5\n1,Figs,12\n")
+        jsonl_path = self._write(
+            ".jsonl",
+            '{"id": 2, "name": "Dates", "price": "3.50"}\n\n'
+            '{"id": 1, "name": "Figs", "price": 12}\n',
+        )
+        for path in (csv_path, jsonl_path):
+            products = catalog.load_catalog(path)
+            self.assertEqual(list(products), [1, 2])  # sorted despite input order
+            self.assertEqual(products[1].name, "Figs")
+            self.assertEqual(products[1].price_cents, 1200)
+            self.assertEqual(products[2].price, inmemory.D("3.50"))
+
+    def test_errors_name_the_offending_line(self):
+        cases = [
+            (".csv", "id,name,price\n1,Figs,1.00\n2,Dates,1.005\n", ":3:"),
+            (".csv", "id,name,price\n1,,1.00\n", ":2:"),
+            (".csv", "id,name,price\nx,Figs,1.00\n", ":2:"),
+            (".jsonl", '{"id": 1, "name": "Figs", "price": 1}\n{"id": 2\n', ":2:"),
+            (".jsonl", '{"id": 1, "name": "Figs", "price": -1}\n', ":1:"),
+        ]
+        for suffix, text, where in cases:
+            path = self._write(suffix, text)
+            with self.assertRaises(ValueError) as ctx:
+                catalog.load_catalog(path)
+            self.assertIn(path + where, str(ctx.exception))
+
+    def test_rejects_duplicates_missing_columns_and_unknown_format(self):
+        for suffix, text in (
+            (".csv", "id,name,price\n1,Figs,1\n1,Dates,2\n"),
+            (".csv", "id,name\n1,Figs\n"),
+            (".txt", "1,Figs,1\n"),
+        ):
+            with self.assertRaises(ValueError):
+                catalog.load_catalog(self._write(suffix, text))
+
+    def test_catalog_mapping_and_updates(self):
+        products = catalog.ProductCatalog([(5, "E", 500), (1, "A", 100)])
+        self.assertIn(1, products)
+        self.assertNotIn(3, products)
+        self.assertNotIn("1", products)
+        products.upsert(3, "C", 300)
+        products.set_price(1, 150)
+        self.assertEqual([p.price_cents for p in products.values()], [150, 300, 500])
+        with self.assertRaises(ValueError):
+            products.set_price(4, 1)
+        self.assertEqual([p.id for p in products.page(1, 1)], [3])
+
+    @override_settings(NTH_ORDER_FOR_DISCOUNT=1000)
+    def test_store_checks_out_against_loaded_catalog(self):
+        path = self._write(".csv", "id,name,price\n10,Walnuts 1kg,19.99\n")
+        store = inmemory.InMemoryStore(catalog=catalog.load_catalog(path))
+        with self.assertRaises(ValueError):
+            store.add_to_cart("u1", 1, 1)
+        store.add_to_cart("u1", 10, 3)
+        self.assertEqual(store.place_order("u1").total_cents, 5997)
+
+
+class ProductSearchTests(BaseStoreTest):
+    """
+    Name search: token index, prefix matching and incremental updates.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.products = catalog.ProductCatalog(
+            [
+                (1, "Almonds 500g", 75000),
+                (2, "Cashews 500g", 35000),
+                (3, "Salted Almonds 1kg", 140000),
+                (4, "Almond Butter", 52000),
+                (5, "Pistachios 500g", 90000),
+            ]
+        )
+        views.db = inmemory.InMemoryStore(catalog=self.products)
+
+    def ids(self, query, limit=20):
+        return [p.id for p in self.products.search(query, limit)]
+
+    def test_tokens_and_prefixes(self):
+        self.assertEqual(self.ids("alm"), [4, 1, 3])  # "almond", then "almonds"
+        self.assertEqual(self.ids("ALMONDS"), [1, 3])
+        self.assertEqual(self.ids("almond "), [4])  # trailing space: whole word
+        self.assertEqual(self.ids("500g almo"), [1])
+        self.assertEqual(self.ids("salted, alm"), [3])
+        self.assertEqual(self.ids("walnuts"), [])
+        self.assertEqual(self.ids("a", limit=2), [4, 1])
+        self.assertEqual(self.ids("   "), [])
+
+    def test_index_follows_catalog_updates(self):
+        self.products.upsert(6, "Roasted Almonds", 80000)
+        self.products.upsert(1, "Brazil Nuts 500g", 70000)
+        self.assertEqual(self.ids("almonds "), [3, 6])
+        self.assertEqual(self.ids("braz"), [1])
+        self.products.upsert(4, "Cashew Butter", 52000)
+        self.assertEqual(self.ids("almond "), [])
+        self.assertEqual(self.ids("butter cash"), [4])
+
+    def test_large_candidate_sets_use_completions(self):
+        rows = [(pid, f"Mixed Nuts {pid}", 100) for pid in range(1, 2001)]
+        products = catalog.ProductCatalog(rows)
+        hits = [p.id for p in products.search("nuts 19", 5)]
+        self.assertEqual(hits, [19, 190, 1900, 1901, 1902])  # by completion
+
+    def test_search_endpoint(self):
+        resp = self.client.get(reverse("product-search"), {"q": "almo", "limit": 2})
+        self.assertEqual(resp.status_code, 200)
+        data = J(resp)
+        self.assertEqual([p["id"] for p in data], [4, 1])
+        self.assertEqual(data[1], {"id": 1, "name": "Almonds 500g", "price": "750.00"})
+
+        for params in ({}, {"q": " "}, {"q": "alm", "limit": "x"}):
+            resp = self.client.get(reverse("product-search"), params)
+            self.assertEqual(resp.status_code, 400, params)
+
+
+@override_settings(ADMIN_API_KEY="test-key")
+class LoadTestCommandTests(BaseStoreTest):
+    """
+    `manage.py loadtest` against the in-process applications.
+    """
+
+    def run_command(self, *args):
+        out = StringIO()
+        call_command(
+            "loadtest",
+            "--sessions=40",
+            "--concurrency=4",
+            "--warmup=0",
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_wsgi_sessions_reach_every_endpoint(self):
+        out = self.run_command("--checkout-rate=1", "--admin-rate=1")
+        for endpoint in (
+            "GET /api/products/",
+            "POST /api/cart/items/",
+            "GET /api/cart/",
+            "POST /api/checkout/",
+        ):
+            self.assertIn(endpoint, out)
+        self.assertIn("target: wsgi, sessions: 40", out)
+        self.assertEqual(len(views.db.orders), 40)
+        self.assertRegex(out, r"total +\d+ .* 0\n")
+
+    def test_asgi_target(self):
+        out = self.run_command("--target=asgi", "--checkout-rate=0")
+        self.assertIn("target: asgi", out)
+        self.assertEqual(len(views.db.orders), 0)
+        self.assertEqual(len(views.db.carts), 40)
+
+    def test_sessions(self):
+        products = [{"id": 1, "name": "Almonds 500g"}]
+        rng = random.Random(1)
+        steps = loadtest.session(7, rng, products, 1, 1, "k")
+        self.assertEqual(steps[-2].endpoint, "POST /api/checkout/")
+        self.assertTrue(
+            steps[-1].endpoint.startswith(("GET /api/admin", "POST /api/admin"))
+        )
+        self.assertIn(("X-User-Id", "load-7"), steps[0].headers)
+        for _ in range(20):
+            endpoints = {
+                s.endpoint for s in loadtest.session(1, rng, products, 0, 1, "")
+            }
+            self.assertNotIn("POST /api/checkout/", endpoints)
+            self.assertFalse(any("admin" in e for e in endpoints))
+
+    def test_failed_requests_fail_the_command(self):
+        with mock.patch.object(
+            loadtest.WSGITransport, "__call__", return_value=(200, b"[]")
+        ):
+            with self.assertRaisesMessage(CommandError, "The catalog is empty"):
+                self.run_command()
+
+        calls = iter([(200, b'[{"id": 1, "name": "Almonds"}]')])
+        with mock.patch.object(
+            loadtest.WSGITransport,
+            "__call__",
+            side_effect=lambda *a: next(calls, (500, b"")),
+        ):
+            with self.assertRaisesRegex(CommandError, r"\d+ request\(s\) failed"):
+                self.run_command()
+
+
+class StoreBenchmarkTests(TestCase):
+    """
+    The benchmark suite behind `manage.py benchstore`, on a tiny profile.
+    """
+
+    TINY = {"carts": 5, "orders": 20, "codes": 3, "skus": 10}
+
+    def run_command(self, *args):
+        out = StringIO()
+        with mock.patch.dict(store_ops.PROFILES, {"small": self.TINY}):
+            call_command(
+                "benchstore",
+                "--profiles=small",
+                "--repeat=2",
+                "--min-time=0.001",
+                *args,
+                stdout=out,
+            )
+        return out.getvalue()
+
+    def test_seeded_store_matches_profile(self):
+        store = store_ops.build_store(self.TINY)
+        self.assertEqual(len(store.carts), 5)
+        self.assertEqual(len(store.orders), 20)
+        self.assertEqual(len(store.discount_codes), 3)
+        self.assertEqual(len(store.products), 10)
+        self.assertTrue(store.stats_consistent())
+
+    def test_saves_and_compares_baselines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "baseline.json")
+            out = self.run_command(f"--save={path}")
+            with open(path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.assertEqual(
+                set(saved["results"]), {f"small/{c}" for c in store_ops.CASES}
+            )
+            result = saved["results"]["small/stats"]
+            self.assertGreater(result["ops_per_sec"], 0)
+            self.assertGreaterEqual(result["ci95"], 0)
+            self.assertIn("small/place_order", out)
+
+            # A baseline far faster than anything measured here must fail
+            for r in saved["results"].values():
+                r["ops_per_sec"] *= 1000
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            with self.assertRaisesMessage(
+                CommandError, f"{len(store_ops.CASES)} benchmark(s) regressed"
+            ):
+                self.run_command(f"--baseline={path}", "--cases", *store_ops.CASES)
+
+    def test_regression_needs_the_whole_interval_below_threshold(self):
+        baseline = {"results": {"a": {"ops_per_sec": 100.0, "ci95": 1.0}}}
+
+        def current(mean, ci):
+            return {"results": {"a": {"ops_per_sec": mean, "ci95": ci}}}
+
+        self.assertEqual(store_ops.regressions(current(95, 1), baseline, 0.1), [])
+        self.assertEqual(store_ops.regressions(current(85, 10), baseline, 0.1), [])
+        [found] = store_ops.regressions(current(85, 2), baseline, 0.1)
+        self.assertEqual(found["name"], "a")
+        self.assertAlmostEqual(found["change"], -0.15)
+
+
+class CatalogETagTests(BaseStoreTest):
+    """
+    Product list and search responses are cached per catalog version:
+    - a strong ETag, with If-None-Match answered 304 without rebuilding
+    - any product change bumps the version and invalidates the pages
+    - the browsable API bypasses the cache
+    """
+
+    def setUp(self):
+        super().setUp()
+        views.catalog_pages = CatalogPageCache()
+        rows = [(pid, f"Product {pid}", pid * 100) for pid in range(1, 31)]
+        self.products = catalog.ProductCatalog(rows)
+        views.db = inmemory.InMemoryStore(catalog=self.products)
+        self.addCleanup(setattr, views, "db", inmemory.db)
+
+    def test_list_revalidates_with_304(self):
+        first = self.client.get(reverse("products"), {"limit": 10})
+        etag = first.headers["ETag"]
+        self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+
+        with mock.patch.object(views.ProductList, "_page") as build:
+            again = self.client.get(reverse("products"), {"limit": 10})
+            self.assertEqual(again.content, first.content)
+            self.assertEqual(again.headers["X-Next-Cursor"], "10")
+            not_modified = self.client.get(
+                reverse("products"), {"limit": 10}, HTTP_IF_NONE_MATCH=etag
+            )
+            build.assert_not_called()
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b"")
+        self.assertEqual(not_modified.headers["ETag"], etag)
+
+        # Another page has its own ETag
+        page2 = self.client.get(reverse("products"), {"cursor": 10, "limit": 10})
+        self.assertNotEqual(page2.headers["ETag"], etag)
+
+    def test_product_change_invalidates(self):
+        version = self.products.version
+        first = self.client.get(reverse("products"), {"limit": 5})
+        self.products.set_price(3, 999)
+        self.assertGreater(self.products.version, version)
+
+        resp = self.client.get(
+            reverse("products"), {"limit": 5}, HTTP_IF_NONE_MATCH=first.headers["ETag"]
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(J(resp)[2]["price"], "9.99")
+        self.assertNotEqual(resp.headers["ETag"], first.headers["ETag"])
+
+        # Reverting the change restores identical bytes, hence the same ETag
+        self.products.set_price(3, 300)
+        resp = self.client.get(reverse("products"), {"limit": 5})
+        self.assertEqual(resp.headers["ETag"], first.headers["ETag"])
+
+    def test_search_revalidates(self):
+        first = self.client.get(reverse("product-search"), {"q": "product 1"})
+        resp = self.client.get(
+            reverse("product-search"),
+            {"q": "product 1"},
+            HTTP_IF_NONE_MATCH=f'W/"x", {first.headers["ETag"]}',
+        )
+        self.assertEqual(resp.status_code, 304)
+        self.products.upsert(31, "Product 1 Deluxe", 100)
+        resp = self.client.get(
+            reverse("product-search"),
+            {"q": "product 1"},
+            HTTP_IF_NONE_MATCH=first.headers["ETag"],
+        )
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn(31, [p["id"] for p in J(resp)])
+
+    def test_browsable_api_is_not_cached(self):
+        resp = self.client.get(reverse("products"), HTTP_ACCEPT="text/html")
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotIn("ETag", resp.headers)
+        self.assertEqual(len(views.catalog_pages), 0)
+
+    def test_cache_is_bounded_and_versioned(self):
+        cache = CatalogPageCache(max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(1, key, RenderedPage(key.encode()))
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(1, "a"))
+        self.assertEqual(cache.get(1, "c").body, b"c")
+        self.assertIsNone(cache.get(2, "c"))
+
+        cache.put(2, "a", RenderedPage(b"new"))
+        self.assertEqual(len(cache), 1)
+        cache.put(1, "b", RenderedPage(b"stale"))  # built from an older catalog
+        self.assertIsNone(cache.get(1, "b"))
+        self.assertIsNone(cache.get(2, "b"))
+
+
+class EncoderTests(TestCase):
+    """
+    Compiled encoders render exactly what the DRF serializers render,
+    including the cases they hand back to DRF.
+    """
+
+    render = staticmethod(JSONRenderer().render)
+
+    def assertSameAsDRF(self, serializer, obj):
+        encode = encoders.compile_encoder(serializer)
+        self.assertEqual(
+            self.render(encode(obj)), self.render(serializer.to_representation(obj))
+        )
+
+    def test_orders_and_products(self):
+        store = inmemory.InMemoryStore()
+        store.add_to_cart("u", 1, 3)
+        store.add_to_cart("u", 2, 1)
+        order = store.place_order("u")
+        self.assertEqual(encode_order(order), OrderSerializer(order).data)
+        self.assertIsNone(encode_order(order)["discount_code"])
+
+        products = [
+            {"id": p.id, "name": p.name, "price": p.price}
+            for p in store.products.values()
+        ]
+        self.assertEqual(
+            encode_products(products), ProductSerializer(products, many=True).data
+        )
+
+    def test_field_edge_cases(self):
+        D = inmemory.D
+
+        class Row(serializers.Serializer):
+            n = serializers.IntegerField()
+            amount = serializers.DecimalField(max_digits=6, decimal_places=2)
+            at = serializers.DateTimeField()
+            note = serializers.CharField(required=False)
+            tag = serializers.CharField(allow_null=True)
+            kind = serializers.CharField(default="std")
+            flags = serializers.ListField()
+
+        at = datetime(2025, 1, 2, 3, 4, 5, 678, tzinfo=dt_timezone.utc)
+        row = {"n": "7", "amount": D("1.005"), "at": at, "flags": [1, None]}
+        for obj in (
+            row,
+            {**row, "amount": 2.675, "note": 5, "tag": None, "kind": "x"},
+            {**row, "amount": D("1.015"), "at": at.replace(tzinfo=None)},
+            {**row, "at": "2025-01-02", "n": lambda: 9},
+        ):
+            self.assertSameAsDRF(Row(), obj)
+        with timezone.override("Asia/Kolkata"):
+            self.assertSameAsDRF(Row(), row)
+        with self.assertRaises(decimal.InvalidOperation):  # exceeds max_digits
+            encoders.compile_encoder(Row)({**row, "amount": D("123456")})
+
+        class Computed(serializers.Serializer):
+            label = serializers.SerializerMethodField()
+
+            def get_label(self, obj):
+                return obj["n"] * 2
+
+        self.assertEqual(encoders.compile_encoder(Computed)({"n": 2}), {"label": 4})
+
+    def test_verify_reports_mismatches(self):
+        encode = encoders.compile_encoder(ProductSerializer)
+        product = {"id": 1, "name": "x", "price": inmemory.D("1")}
+        with mock.patch.object(
+            ProductSerializer, "to_representation", return_value={"id": 2}
+        ):
+            with self.assertRaises(AssertionError):
+                encode(product)
 
 
 class SchemaTests(TestCase):
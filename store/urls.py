@@ -1,25 +1,63 @@
 # Related third-party imports
+from django.conf import settings
 from django.urls import path
 
 # Local application/library specific imports
 from .views import (
+    AdminBulkDiscountCodes,
     AdminGenerateDiscount,
+    AdminMetrics,
+    AdminProductPrice,
     AdminStats,
+    CartBatch,
     CartItemAdd,
     CartItemUpdate,
     CartView,
     Checkout,
+    CheckoutQuote,
     HealthView,
+    OrderDetail,
+    OrderList,
     ProductList,
+    ProductSearch,
 )
 
+# Under ASGI the hot endpoints are served by their async variants
+if settings.ASYNC_VIEWS:
+    from .views import (
+        AsyncCartBatch as CartBatch,
+        AsyncCartItemAdd as CartItemAdd,
+        AsyncCartItemUpdate as CartItemUpdate,
+        AsyncCartView as CartView,
+        AsyncCheckout as Checkout,
+        AsyncCheckoutQuote as CheckoutQuote,
+        AsyncHealthView as HealthView,
+        AsyncProductList as ProductList,
+        AsyncProductSearch as ProductSearch,
+    )
+
 
 urlpatterns = [
+    path(
+        "admin/discount-codes/bulk/",
+        AdminBulkDiscountCodes.as_view(),
+        name="admin-bulk-discount-codes",
+    ),
     path(
         "admin/generate-discount/",
         AdminGenerateDiscount.as_view(),
         name="admin-generate-discount",
     ),
+    path(
+        "admin/metrics/",
+        AdminMetrics.as_view(),
+        name="admin-metrics",
+    ),
+    path(
+        "admin/products/<int:product_id>/price/",
+        AdminProductPrice.as_view(),
+        name="admin-product-price",
+    ),
     path(
         "admin/stats/",
         AdminStats.as_view(),
@@ -30,6 +68,11 @@ urlpatterns = [
         CartView.as_view(),
         name="cart",
     ),
+    path(
+        "cart/batch/",
+        CartBatch.as_view(),
+        name="cart-batch",
+    ),
     path(
         "cart/items/",
         CartItemAdd.as_view(),
@@ -45,14 +88,34 @@ urlpatterns = [
         Checkout.as_view(),
         name="checkout",
     ),
+    path(
+        "checkout/quote/",
+        CheckoutQuote.as_view(),
+        name="checkout-quote",
+    ),
     path(
         "health/",
         HealthView.as_view(),
         name="health",
     ),
+    path(
+        "orders/",
+        OrderList.as_view(),
+        name="orders",
+    ),
+    path(
+        "orders/<int:order_id>/",
+        OrderDetail.as_view(),
+        name="order-detail",
+    ),
     path(
         "products/",
         ProductList.as_view(),
         name="products",
     ),
+    path(
+        "products/search/",
+        ProductSearch.as_view(),
+        name="product-search",
+    ),
 ]
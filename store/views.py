@@ -1,5 +1,15 @@
+# Standard library imports
+import json
+from datetime import datetime, timezone as dt_timezone
+from typing import Optional
+
 # Related third-party imports
 from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_datetime
+from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import (
     extend_schema,
     OpenApiExample,
@@ -7,22 +17,189 @@ from drf_spectacular.utils import (
     OpenApiResponse,
 )
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 # Local application/library specific imports
-from .inmemory import db, D, money
+from .aio import AsyncAPIView, run_catalog, run_store
+from .idempotency import (
+    IdempotencyCache,
+    IdempotencyKeyInProgress,
+    IdempotencyKeyReused,
+)
+from .inmemory import db, from_cents, to_cents
+from .metrics import PrometheusTextRenderer, render_metrics
+from .pagecache import CatalogPageCache, RenderedPage
 from .permissions import HasAdminApiKey
+from .quotes import QuoteCache
+from .rollups import GRANULARITIES
 from .serializers import (
+    AdminBulkDiscountResponseSerializer,
+    AdminBulkDiscountSerializer,
     AdminGenerateDiscountResponseSerializer,
+    AdminPriceResponseSerializer,
+    AdminPriceSerializer,
     AdminStatsSerializer,
+    CartBatchSerializer,
     CartItemSerializer,
     CartOutSerializer,
     CheckoutSerializer,
+    encode_cart,
+    encode_order,
+    encode_products,
+    encode_quote,
     HealthSerializer,
     OrderSerializer,
     ProductSerializer,
+    QuoteRequestSerializer,
+    QuoteSerializer,
+)
+
+# Product listing page sizes
+PRODUCTS_PAGE_SIZE = 100
+PRODUCTS_MAX_PAGE_SIZE = 1000
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
+ORDERS_PAGE_SIZE = 20
+ORDERS_MAX_PAGE_SIZE = 100
+
+# Checkout responses replayed for retried Idempotency-Keys
+checkout_responses = IdempotencyCache(
+    max_keys=settings.CHECKOUT_IDEMPOTENCY_MAX_KEYS,
+    ttl=settings.CHECKOUT_IDEMPOTENCY_TTL,
 )
+# How long a duplicate waits for the in-flight request with its key
+IDEMPOTENCY_WAIT_SECONDS = 30
+
+# Priced carts behind the tokens of POST /api/checkout/quote/
+checkout_quotes = QuoteCache(
+    max_quotes=settings.CHECKOUT_QUOTE_MAX,
+    ttl=settings.CHECKOUT_QUOTE_TTL,
+)
+
+# Rendered product list/search pages of the current catalog version
+catalog_pages = CatalogPageCache()
+
+
+def _query_int(request, name: str, default, minimum: int):
+    """
+    Parse an optional integer query parameter, raising ValueError with a
+    client-facing message when it is malformed or below `minimum`.
+    """
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer.")
+    if value < minimum:
+        raise ValueError(f"{name} must be >= {minimum}.")
+    return value
+
+
+def _set_next_page(request, response, cursor: int, limit: int) -> None:
+    """
+    Point the client at the next page via X-Next-Cursor and a Link header.
+    """
+    next_url = request.build_absolute_uri(
+        f"{request.path}?cursor={cursor}&limit={limit}"
+    )
+    response["X-Next-Cursor"] = str(cursor)
+    response["Link"] = f'<{next_url}>; rel="next"'
+
+
+def _query_datetime(request, name: str) -> Optional[datetime]:
+    """
+    Parse an optional ISO-8601 query parameter (naive values are UTC),
+    raising ValueError with a client-facing message when malformed.
+    """
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return None
+    try:
+        value = parse_datetime(raw)
+    except ValueError:
+        value = None
+    if value is None:
+        raise ValueError(f"{name} must be an ISO-8601 datetime.")
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, dt_timezone.utc)
+    return value
+
+
+def _catalog_response(request, key, limit: int, build) -> HttpResponse:
+    """
+    Serve a catalog read (`build(catalog)` -> (data, next cursor)) from
+    the rendered page cache, with a strong ETag and If-None-Match -> 304.
+    Non-JSON renderings (the browsable API) bypass the cache.
+    """
+    products = db.catalog()
+    if not isinstance(request.accepted_renderer, JSONRenderer):
+        data, next_cursor = build(products)
+        response = Response(data)
+        if next_cursor is not None:
+            _set_next_page(request, response, next_cursor, limit)
+        return response
+
+    version = products.version
+    page = catalog_pages.get(version, key)
+    if page is None:
+        data, next_cursor = build(products)
+        page = RenderedPage(JSONRenderer().render(data), next_cursor)
+        catalog_pages.put(version, key, page)
+
+    response = HttpResponse(page.body, content_type="application/json")
+    response["ETag"] = page.etag
+    if page.next_cursor is not None:
+        _set_next_page(request, response, page.next_cursor, limit)
+    return get_conditional_response(request, etag=page.etag, response=response)
+
+
+def _cart_payload(lines, total_cents: int) -> dict:
+    """
+    Serialize (product_id, quantity) cart lines and their total as
+    {items, total}.
+    """
+    items = [{"product_id": pid, "quantity": qty} for pid, qty in lines]
+    res_data = {"items": items, "total": from_cents(total_cents)}
+    return encode_cart(res_data)
+
+
+def _priced_payload(cart) -> dict:
+    """
+    Price a cart snapshot at current prices and serialize it.
+    """
+    products = db.catalog()
+    lines = []
+    total = 0  # cents
+    for pid, qty in cart.items():
+        prod = products.get(pid)
+        if not prod:
+            continue
+        lines.append((pid, qty))
+        total += prod.price_cents * qty
+    return _cart_payload(lines, total)
+
+
+def _discount_error(code: Optional[str]) -> Optional[Response]:
+    """
+    A 400 response if the client sent a code that cannot be redeemed by
+    the next order, else None.
+    """
+    if not code or db.validate_discount(code):
+        return None
+    if not db.eligible_now():
+        return Response(
+            {"detail": f"Discount not available for order."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return Response(
+        {"detail": "Invalid or unavailable discount code."},
+        status=status.HTTP_400_BAD_REQUEST,
+    )
+
 
 admin_key_param = OpenApiParameter(
     name="X-Admin-Key",
@@ -159,25 +336,56 @@ class CartItemUpdate(APIView):
 class CartView(APIView):
     """
     GET /api/cart/
-    Returns the current user's cart and a computed total.
+    Returns the current user's cart and its total, read from the totals
+    the store keeps up to date as the cart changes.
     """
 
     def get(self, request):
         user_id = get_user_id(request)
-        cart = db.get_cart(user_id)
+        return Response(_cart_payload(*db.priced_cart(user_id)))
 
-        items = []
-        total = D("0.00")
-        for pid, qty in cart.items():
-            prod = db.products.get(pid)
-            if not prod:
-                continue
-            line = money(prod.price * D(qty))
-            items.append({"product_id": pid, "quantity": qty})
-            total += line
 
-        res_data = {"items": items, "total": money(total)}
-        return Response(CartOutSerializer(res_data).data)
+@extend_schema(
+    tags=["cart"],
+    summary="Apply several cart operations at once",
+    parameters=[user_header_param],
+    request=CartBatchSerializer,
+    responses={
+        200: CartOutSerializer,
+        400: OpenApiResponse(description="Invalid op; nothing was applied."),
+    },
+    examples=[
+        OpenApiExample(
+            "Add, set and remove",
+            value={
+                "ops": [
+                    {"op": "add", "product_id": 1, "quantity": 2},
+                    {"op": "set", "product_id": 2, "quantity": 5},
+                    {"op": "remove", "product_id": 3},
+                ]
+            },
+        )
+    ],
+)
+class CartBatch(APIView):
+    """
+    POST /api/cart/batch/
+    Applies add/set/remove ops in order, atomically (all or nothing), and
+    returns the resulting cart. "set" with quantity <= 0 removes the item.
+    """
+
+    def post(self, request):
+        user_id = get_user_id(request)
+        ser = CartBatchSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        ops = [
+            (o["op"], o["product_id"], o["quantity"]) for o in ser.validated_data["ops"]
+        ]
+        try:
+            cart = db.apply_cart_ops(user_id, ops)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(_priced_payload(cart))
 
 
 @extend_schema(
@@ -186,6 +394,11 @@ class CartView(APIView):
     responses={200: HealthSerializer},
 )
 class HealthView(APIView):
+    """
+    GET /api/health/
+    Liveness check.
+    """
+
     def get(self, request):
         return Response({"status": "ok"})
 
@@ -193,32 +406,139 @@ class HealthView(APIView):
 @extend_schema(
     tags=["catalog"],
     summary="List products",
-    responses=OpenApiResponse(response=ProductSerializer(many=True)),
+    parameters=[
+        OpenApiParameter(
+            name="cursor",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description="Return products with id greater than this "
+            "(the X-Next-Cursor of the previous page).",
+            required=False,
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description=f"Page size (default {PRODUCTS_PAGE_SIZE}, "
+            f"max {PRODUCTS_MAX_PAGE_SIZE}).",
+            required=False,
+        ),
+    ],
+    responses=OpenApiResponse(
+        response=ProductSerializer(many=True),
+        description="One page of products, ordered by id. When more remain, "
+        "the X-Next-Cursor and Link (rel=next) headers point to the next page.",
+    ),
 )
 class ProductList(APIView):
     """
-    GET /api/products/
-    Returns a simple list of products from the in-memory catalog.
+    GET /api/products/?cursor=<id>&limit=<n>
+    Returns one id-ordered page of products from the in-memory catalog.
+    """
+
+    def get(self, request):
+        try:
+            cursor = _query_int(request, "cursor", None, minimum=0)
+            limit = _query_int(request, "limit", PRODUCTS_PAGE_SIZE, minimum=1)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, PRODUCTS_MAX_PAGE_SIZE)
+        return _catalog_response(
+            request,
+            ("list", cursor, limit),
+            limit,
+            lambda products: self._page(products, cursor, limit),
+        )
+
+    @staticmethod
+    def _page(products, cursor: Optional[int], limit: int):
+        # Only this page is materialized, not the whole catalog
+        page = products.page(cursor, limit)
+        data = [{"id": p.id, "name": p.name, "price": p.price} for p in page]
+
+        next_cursor = None
+        if len(page) == limit and products.has_after(page[-1].id):
+            next_cursor = page[-1].id
+        return encode_products(data), next_cursor
+
+
+@extend_schema(
+    tags=["catalog"],
+    summary="Search products by name",
+    parameters=[
+        OpenApiParameter(
+            name="q",
+            type=str,
+            location=OpenApiParameter.QUERY,
+            description="Words the product name must contain; the last word "
+            "matches as a prefix unless the query ends with a space.",
+            required=True,
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description=f"Maximum results (default {SEARCH_PAGE_SIZE}, "
+            f"max {SEARCH_MAX_PAGE_SIZE}).",
+            required=False,
+        ),
+    ],
+    responses=OpenApiResponse(response=ProductSerializer(many=True)),
+)
+class ProductSearch(APIView):
+    """
+    GET /api/products/search/?q=<text>&limit=<n>
+    Typeahead search over product names via the catalog's token index.
     """
 
     def get(self, request):
-        # Prepare a plain list from in-memory db.
+        query = request.query_params.get("q", "")
+        if not query.strip():
+            return Response(
+                {"detail": "q is required."}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = _query_int(request, "limit", SEARCH_PAGE_SIZE, minimum=1)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, SEARCH_MAX_PAGE_SIZE)
+        return _catalog_response(
+            request,
+            ("search", query, limit),
+            limit,
+            lambda products: self._hits(products, query, limit),
+        )
+
+    @staticmethod
+    def _hits(products, query: str, limit: int):
         data = [
-            {"id": p.id, "name": p.name, "price": money(p.price)}
-            for p in db.products.values()
+            {"id": p.id, "name": p.name, "price": p.price}
+            for p in products.search(query, limit)
         ]
-
-        # then serializer validate/shape
-        serializer = ProductSerializer(data, many=True)
-        return Response(serializer.data)
+        return encode_products(data), None
 
 
 @extend_schema(
     tags=["checkout"],
     summary="Checkout current cart and create an order",
-    parameters=[user_header_param],
+    parameters=[
+        user_header_param,
+        OpenApiParameter(
+            name="Idempotency-Key",
+            type=str,
+            location=OpenApiParameter.HEADER,
+            description="Client-chosen key (max 255 chars). Retries with the "
+            "same key replay the first successful response instead of "
+            "placing another order.",
+            required=False,
+        ),
+    ],
     request=CheckoutSerializer,
-    responses={201: OrderSerializer},
+    responses={
+        201: OrderSerializer,
+        409: OpenApiResponse(description="Same key still in progress."),
+        422: OpenApiResponse(description="Same key, different payload."),
+    },
     examples=[
         OpenApiExample("Without discount", value={}),
         OpenApiExample("With discount code", value={"discount_code": "AB12CD34"}),
@@ -227,40 +547,243 @@ class ProductList(APIView):
 class Checkout(APIView):
     """
     POST /api/checkout/
+
+    With an Idempotency-Key header, the first successful response for a
+    (user, key) pair is cached and replayed byte-for-byte (with
+    Idempotent-Replayed: true) to retries; a concurrent duplicate waits
+    for the in-flight request. Failed attempts are not cached.
     """
 
     def post(self, request):
         user_id = get_user_id(request)
+        try:
+            claim = self._idempotency_claim(request, user_id)
+        except ValueError as e:
+            return self._claim_error(e)
+        if claim is None:
+            return self._checkout(request, user_id)
+        try:
+            cached = checkout_responses.claim(*claim, IDEMPOTENCY_WAIT_SECONDS)
+        except ValueError as e:
+            return self._claim_error(e)
+        if cached is not None:
+            return self._replay(cached)
+        return self._checkout_once(request, user_id, claim[0])
+
+    @staticmethod
+    def _idempotency_claim(request, user_id: str):
+        """
+        The (cache key, payload fingerprint) to claim, or None without an
+        Idempotency-Key header. Raises ValueError for a malformed key.
+        """
+        key = request.headers.get("Idempotency-Key")
+        if key is None:
+            return None
+        if not key or len(key) > 255:
+            raise ValueError("Idempotency-Key must be 1-255 characters.")
+        fingerprint = json.dumps(request.data, sort_keys=True, default=str)
+        return (user_id, key), fingerprint
+
+    @staticmethod
+    def _claim_error(e: ValueError) -> Response:
+        if isinstance(e, IdempotencyKeyReused):
+            code = status.HTTP_422_UNPROCESSABLE_ENTITY
+        elif isinstance(e, IdempotencyKeyInProgress):
+            code = status.HTTP_409_CONFLICT
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response({"detail": str(e)}, status=code)
+
+    @staticmethod
+    def _replay(cached) -> HttpResponse:
+        response = HttpResponse(
+            cached.body, status=cached.status, content_type="application/json"
+        )
+        response["Idempotent-Replayed"] = "true"
+        return response
+
+    def _checkout_once(self, request, user_id: str, cache_key) -> HttpResponse:
+        """
+        Run the checkout for a claimed key and cache a successful response.
+        """
+        try:
+            response = self._checkout(request, user_id)
+            if response.status_code != status.HTTP_201_CREATED:
+                checkout_responses.release(cache_key)
+                return response
+            body = JSONRenderer().render(response.data)
+            checkout_responses.complete(cache_key, response.status_code, body)
+        except BaseException:
+            checkout_responses.release(cache_key)
+            raise
+        return HttpResponse(
+            body, status=response.status_code, content_type="application/json"
+        )
+
+    def _checkout(self, request, user_id: str) -> Response:
         ser = CheckoutSerializer(data=request.data or {})
         ser.is_valid(raise_exception=True)
         code = ser.validated_data.get("discount_code") or None
+        token = ser.validated_data.get("quote") or None
 
         # If client sends a code, validate it before attempting checkout.
-        if code and not db.validate_discount(code):
-            if not db.eligible_now():
-                return Response(
-                    {"detail": f"Discount not available for order."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
+        error = _discount_error(code)
+        if error is not None:
+            return error
+
+        try:
+            quote = checkout_quotes.get(token, user_id) if token else None
+            order = db.place_order(user_id, discount_code=code, quote=quote)
+        except ValueError as e:
             return Response(
-                {"detail": "Invalid or unavailable discount code."},
+                {"detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        return Response(
+            encode_order(order),
+            status=status.HTTP_201_CREATED,
+        )
+
+
+@extend_schema(
+    tags=["checkout"],
+    summary="Price the current cart for checkout",
+    parameters=[user_header_param],
+    request=QuoteRequestSerializer,
+    responses={
+        200: QuoteSerializer,
+        400: OpenApiResponse(description="Empty cart or unusable code."),
+    },
+    examples=[
+        OpenApiExample("Without discount", value={}),
+        OpenApiExample("With discount code", value={"discount_code": "AB12CD34"}),
+    ],
+)
+class CheckoutQuote(APIView):
+    """
+    POST /api/checkout/quote/
+
+    Prices the cart, and the discount the code would give now, for a
+    review page. The returned token is valid for
+    settings.CHECKOUT_QUOTE_TTL seconds: passed to POST /api/checkout/ as
+    `quote`, the quoted prices are committed without repricing the cart,
+    unless the cart or the catalog changed in between (then checkout
+    prices it afresh). The code is still checked again at checkout.
+    """
+
+    def post(self, request):
+        user_id = get_user_id(request)
+        ser = QuoteRequestSerializer(data=request.data or {})
+        ser.is_valid(raise_exception=True)
+        code = ser.validated_data.get("discount_code") or None
+
+        error = _discount_error(code)
+        if error is not None:
+            return error
+
         try:
-            order = db.place_order(user_id, discount_code=code)
+            quote = db.quote(user_id, discount_code=code)
         except ValueError as e:
             return Response(
                 {"detail": str(e)},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        token, expires_at = checkout_quotes.issue(quote)
         return Response(
-            OrderSerializer(order).data,
-            status=status.HTTP_201_CREATED,
+            encode_quote(
+                {
+                    "quote": token,
+                    "expires_at": expires_at,
+                    "items": quote.items,
+                    "subtotal": quote.subtotal,
+                    "discount": quote.discount,
+                    "total": quote.total,
+                    "discount_code": quote.discount_code,
+                }
+            )
         )
 
 
+@extend_schema(
+    tags=["orders"],
+    summary="List the caller's orders (newest first)",
+    parameters=[
+        user_header_param,
+        OpenApiParameter(
+            name="cursor",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description="Return orders with id lower than this "
+            "(the X-Next-Cursor of the previous page).",
+            required=False,
+        ),
+        OpenApiParameter(
+            name="limit",
+            type=int,
+            location=OpenApiParameter.QUERY,
+            description=f"Page size (default {ORDERS_PAGE_SIZE}, "
+            f"max {ORDERS_MAX_PAGE_SIZE}).",
+            required=False,
+        ),
+    ],
+    responses=OpenApiResponse(
+        response=OrderSerializer(many=True),
+        description="One page of orders. When older orders remain, the "
+        "X-Next-Cursor and Link (rel=next) headers point to the next page.",
+    ),
+)
+class OrderList(APIView):
+    """
+    GET /api/orders/?cursor=<order id>&limit=<n>
+    The caller's order history from the per-user index, newest first.
+    """
+
+    # Distinct from OrderDetail's auto-generated "orders_retrieve"
+    @extend_schema(operation_id="orders_list")
+    def get(self, request):
+        user_id = get_user_id(request)
+        try:
+            cursor = _query_int(request, "cursor", None, minimum=1)
+            limit = _query_int(request, "limit", ORDERS_PAGE_SIZE, minimum=1)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, ORDERS_MAX_PAGE_SIZE)
+
+        # One extra row tells whether an older page exists
+        orders = db.user_orders(user_id, before=cursor, limit=limit + 1)
+        page = orders[:limit]
+        response = Response([encode_order(order) for order in page])
+        if len(orders) > limit:
+            _set_next_page(request, response, page[-1].id, limit)
+        return response
+
+
+@extend_schema(
+    tags=["orders"],
+    summary="Get one of the caller's orders",
+    parameters=[user_header_param],
+    responses={
+        200: OrderSerializer,
+        404: OpenApiResponse(description="No such order for this user."),
+    },
+)
+class OrderDetail(APIView):
+    """
+    GET /api/orders/<order_id>/
+    """
+
+    def get(self, request, order_id: int):
+        order = db.get_order(order_id)
+        # Other users' orders are indistinguishable from missing ones
+        if order is None or order.user_id != get_user_id(request):
+            return Response(
+                {"detail": "Order not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(encode_order(order))
+
+
 @extend_schema(
     tags=["admin"],
     summary="Generate discount code (only when next order is eligible)",
@@ -300,7 +823,14 @@ class AdminGenerateDiscount(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        dc = db.generate_code()
+        try:
+            dc = db.generate_code()
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         return Response(
             {
                 "code": dc.code,
@@ -314,8 +844,133 @@ class AdminGenerateDiscount(APIView):
 
 @extend_schema(
     tags=["admin"],
-    summary="Admin stats",
+    summary="Issue campaign discount codes in bulk",
     parameters=[admin_key_param],
+    request=AdminBulkDiscountSerializer,
+    responses={
+        201: AdminBulkDiscountResponseSerializer,
+        400: OpenApiResponse(description="Invalid count or discount percent"),
+        403: OpenApiResponse(description="Unauthorized (missing/invalid admin key)"),
+    },
+    examples=[OpenApiExample("Issue codes", value={"count": 1000, "discount_pct": 15})],
+)
+class AdminBulkDiscountCodes(APIView):
+    """
+    POST /api/admin/discount-codes/bulk/
+
+    Issues `count` single-use campaign codes (default DISCOUNT_PERCENT off).
+    Unlike the Nth-order code, each is redeemable on any order. Codes come
+    from a pool generated ahead of time (see store/codepool.py) and never
+    repeat an issued code.
+    """
+
+    permission_classes = [HasAdminApiKey]
+
+    def post(self, request):
+        ser = AdminBulkDiscountSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+
+        try:
+            issued = db.issue_codes(
+                ser.validated_data["count"], ser.validated_data.get("discount_pct")
+            )
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        data = {
+            "count": len(issued),
+            "discount_pct": issued[0].discount_pct,
+            "created_at": issued[0].created_at.isoformat().replace("+00:00", "Z"),
+            "codes": [dc.code for dc in issued],
+        }
+        return Response(
+            AdminBulkDiscountResponseSerializer(data).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+
+@extend_schema(
+    tags=["admin"],
+    summary="Change a product's price",
+    parameters=[
+        admin_key_param,
+        OpenApiParameter(
+            "product_id", int, OpenApiParameter.PATH, description="Product ID"
+        ),
+    ],
+    request=AdminPriceSerializer,
+    responses={
+        200: AdminPriceResponseSerializer,
+        400: OpenApiResponse(description="Invalid price or unknown product"),
+        403: OpenApiResponse(description="Unauthorized (missing/invalid admin key)"),
+    },
+    examples=[OpenApiExample("Set price", value={"price": "699.00"})],
+)
+class AdminProductPrice(APIView):
+    """
+    PUT /api/admin/products/<product_id>/price/
+
+    Sets the price at once for product listings, quotes and checkouts.
+    The kept totals of the carts holding the product are repriced in the
+    background (see InMemoryStore.set_price).
+    """
+
+    permission_classes = [HasAdminApiKey]
+
+    def put(self, request, product_id: int):
+        ser = AdminPriceSerializer(data=request.data)
+        ser.is_valid(raise_exception=True)
+        price_cents = to_cents(ser.validated_data["price"])
+
+        try:
+            carts = db.set_price(int(product_id), price_cents)
+        except ValueError as e:
+            return Response(
+                {"detail": str(e)},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        data = {
+            "product_id": int(product_id),
+            "price": from_cents(price_cents),
+            "carts_repriced": carts,
+        }
+        return Response(AdminPriceResponseSerializer(data).data)
+
+
+@extend_schema(
+    tags=["admin"],
+    summary="Admin stats",
+    parameters=[
+        admin_key_param,
+        OpenApiParameter(
+            name="from",
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description="Start of a sales window (ISO-8601; UTC if no offset). "
+            "Adds `window` to the response.",
+            required=False,
+        ),
+        OpenApiParameter(
+            name="to",
+            type=OpenApiTypes.DATETIME,
+            location=OpenApiParameter.QUERY,
+            description="End of the window (exclusive; default now).",
+            required=False,
+        ),
+        OpenApiParameter(
+            name="granularity",
+            type=str,
+            enum=list(GRANULARITIES),
+            location=OpenApiParameter.QUERY,
+            description="Bucket size for the window (default: the finest "
+            "one still retained back to `from`).",
+            required=False,
+        ),
+    ],
     responses={200: AdminStatsSerializer},
 )
 class AdminStats(APIView):
@@ -327,11 +982,140 @@ class AdminStats(APIView):
     - gross_amount
     - total_discount_amount
     - net_amount
+    - carts (active count and eviction counters)
     - discount_codes[] (with used, redeemed_order_id, created_at, etc.)
+    - campaign_codes (issued and redeemed counts)
+    - window (with ?from=&to=&granularity=): the same figures for a time
+      range, summed from per-minute/hour/day rollup buckets
     """
 
     permission_classes = [HasAdminApiKey]
 
     def get(self, request):
         stats = db.stats()
+
+        params = request.query_params
+        if any(params.get(k) for k in ("from", "to", "granularity")):
+            try:
+                start = _query_datetime(request, "from")
+                if start is None:
+                    raise ValueError("from is required for a sales window.")
+                end = _query_datetime(request, "to") or timezone.now()
+                stats["window"] = db.sales_window(
+                    start, end, params.get("granularity") or None
+                )
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response(AdminStatsSerializer(stats).data)
+
+
+@extend_schema(
+    tags=["admin"],
+    summary="Prometheus metrics",
+    parameters=[admin_key_param],
+    responses={
+        (200, "text/plain"): OpenApiResponse(
+            response=OpenApiTypes.STR,
+            description="Prometheus text exposition format.",
+        ),
+        403: OpenApiResponse(description="Unauthorized (missing/invalid admin key)"),
+    },
+)
+class AdminMetrics(APIView):
+    """
+    GET /api/admin/metrics/
+
+    Per URL name and method: request and 5xx counts and a latency histogram
+    (recorded by RequestMetricsMiddleware), plus store gauges (carts,
+    orders, discount codes, products).
+    """
+
+    permission_classes = [HasAdminApiKey]
+    renderer_classes = [PrometheusTextRenderer]
+
+    def get(self, request):
+        return Response(
+            render_metrics(db.gauges()),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+
+# Async variants -----
+# Served instead of the views above when settings.ASYNC_VIEWS is on (as
+# under ASGI). Each reuses its sync handler, run on the event loop: cart,
+# quote and checkout handlers while the caller's store locks are free
+# (else in a worker thread), catalog reads unless the store can block (see
+# store/aio.py). The sync view comes first so the schema keeps its
+# docstring.
+
+
+def _cart_hold(request):
+    return db.hold_uncontended(get_user_id(request))
+
+
+def _orders_hold(request):
+    return db.hold_uncontended(get_user_id(request), orders=True)
+
+
+class AsyncCartItemAdd(CartItemAdd, AsyncAPIView):
+    async def post(self, request):
+        return await run_store(_cart_hold(request), super().post, request)
+
+
+class AsyncCartItemUpdate(CartItemUpdate, AsyncAPIView):
+    async def delete(self, request, product_id: int):
+        return await run_store(_cart_hold(request), super().delete, request, product_id)
+
+    async def put(self, request, product_id: int):
+        return await run_store(_cart_hold(request), super().put, request, product_id)
+
+
+class AsyncCartView(CartView, AsyncAPIView):
+    async def get(self, request):
+        return await run_store(_cart_hold(request), super().get, request)
+
+
+class AsyncCartBatch(CartBatch, AsyncAPIView):
+    async def post(self, request):
+        return await run_store(_cart_hold(request), super().post, request)
+
+
+class AsyncHealthView(HealthView, AsyncAPIView):
+    async def get(self, request):
+        return super().get(request)
+
+
+class AsyncProductList(ProductList, AsyncAPIView):
+    async def get(self, request):
+        return await run_catalog(db, super().get, request)
+
+
+class AsyncProductSearch(ProductSearch, AsyncAPIView):
+    async def get(self, request):
+        return await run_catalog(db, super().get, request)
+
+
+class AsyncCheckoutQuote(CheckoutQuote, AsyncAPIView):
+    async def post(self, request):
+        return await run_store(_orders_hold(request), super().post, request)
+
+
+class AsyncCheckout(Checkout, AsyncAPIView):
+    async def post(self, request):
+        # As Checkout.post, but a duplicate waits on the loop, not a thread
+        user_id = get_user_id(request)
+        try:
+            claim = self._idempotency_claim(request, user_id)
+        except ValueError as e:
+            return self._claim_error(e)
+        hold = db.hold_uncontended(user_id, orders=True)
+        if claim is None:
+            return await run_store(hold, self._checkout, request, user_id)
+        try:
+            cached = await checkout_responses.aclaim(*claim, IDEMPOTENCY_WAIT_SECONDS)
+        except ValueError as e:
+            return self._claim_error(e)
+        if cached is not None:
+            return self._replay(cached)
+        return await run_store(hold, self._checkout_once, request, user_id, claim[0])
@@ -1,5 +1,22 @@
 import { createApi, fetchBaseQuery } from "@reduxjs/toolkit/query/react";
 
+// Cart writes all go through POST cart/batch/, which returns the new cart;
+// writing it into the cached `cart` query saves a refetch round trip.
+const cartBatch = (ops) => ({
+  url: "cart/batch/",
+  method: "POST",
+  body: { ops },
+});
+
+async function updateCartCache(_arg, { dispatch, queryFulfilled }) {
+  try {
+    const { data } = await queryFulfilled;
+    dispatch(api.util.upsertQueryData("cart", undefined, data));
+  } catch {
+    // failed request: the cached cart is still current
+  }
+}
+
 export const api = createApi({
   reducerPath: "api",
   baseQuery: fetchBaseQuery({
@@ -17,8 +34,9 @@ export const api = createApi({
   tagTypes: ["Cart", "Products", "Stats"],
   endpoints: (build) => ({
     addCart: build.mutation({
-      query: (body) => ({ url: "cart/items/", method: "POST", body }),
-      invalidatesTags: ["Cart"],
+      query: ({ product_id, quantity }) =>
+        cartBatch([{ op: "add", product_id, quantity }]),
+      onQueryStarted: updateCartCache,
     }),
     adminGenerate: build.mutation({
       query: () => ({ url: "admin/generate-discount/", method: "POST" }),
@@ -32,8 +50,18 @@ export const api = createApi({
       query: () => "cart/",
       providesTags: ["Cart"],
     }),
+    cartBatch: build.mutation({
+      query: (ops) => cartBatch(ops),
+      onQueryStarted: updateCartCache,
+    }),
     checkout: build.mutation({
-      query: (body) => ({ url: "checkout/", method: "POST", body }),
+      // idempotencyKey: reuse it when retrying the same checkout attempt
+      query: ({ idempotencyKey, ...body }) => ({
+        url: "checkout/",
+        method: "POST",
+        body,
+        headers: idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {},
+      }),
       invalidatesTags: ["Cart", "Stats"],
     }),
     products: build.query({
@@ -41,19 +69,13 @@ export const api = createApi({
       providesTags: ["Products"],
     }),
     removeCartItem: build.mutation({
-      query: (product_id) => ({
-        url: `cart/items/${product_id}/`,
-        method: "DELETE",
-      }),
-      invalidatesTags: ["Cart"],
+      query: (product_id) => cartBatch([{ op: "remove", product_id }]),
+      onQueryStarted: updateCartCache,
     }),
     setCartItem: build.mutation({
-      query: ({ product_id, quantity }) => ({
-        url: `cart/items/${product_id}/`,
-        method: "PUT",
-        body: { quantity },
-      }),
-      invalidatesTags: ["Cart"],
+      query: ({ product_id, quantity }) =>
+        cartBatch([{ op: "set", product_id, quantity }]),
+      onQueryStarted: updateCartCache,
     }),
   }),
 });
@@ -62,6 +84,7 @@ export const {
   useAddCartMutation,
   useAdminGenerateMutation,
   useAdminStatsQuery,
+  useCartBatchMutation,
   useCartQuery,
   useCheckoutMutation,
   useProductsQuery,
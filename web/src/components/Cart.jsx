@@ -4,7 +4,7 @@ import {
   useRemoveCartItemMutation,
   useSetCartItemMutation,
 } from "../app/api";
-import { useState } from "react";
+import { useRef, useState } from "react";
 
 export default function Cart() {
   const { data: cart, refetch } = useCartQuery();
@@ -17,6 +17,10 @@ export default function Cart() {
 
   const [code, setCode] = useState("");
 
+  // One key per checkout attempt: double clicks and retries share it, so
+  // at most one order is placed; a new key is drawn after a success.
+  const checkoutKey = useRef(crypto.randomUUID());
+
   if (!cart)
     return <div className="bg-white shadow rounded-xl p-4">Loading cart…</div>;
 
@@ -72,7 +76,11 @@ export default function Cart() {
               className="px-3 py-2 rounded bg-black text-white disabled:opacity-50"
               disabled={isLoading}
               onClick={async () => {
-                await checkout({ discount_code: code || undefined });
+                const result = await checkout({
+                  discount_code: code || undefined,
+                  idempotencyKey: checkoutKey.current,
+                });
+                if (!result.error) checkoutKey.current = crypto.randomUUID();
                 refetch();
                 setCode("");
               }}